@@ -1 +1 @@
-from .parsers import datetime_to_date_parser
+from .parsers import datetime_to_date_parser, datetime_to_date, FieldParser
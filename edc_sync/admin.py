@@ -5,6 +5,7 @@ from rest_framework.authtoken.admin import TokenAdmin
 
 from .admin_site import edc_sync_admin
 from .models import IncomingTransaction, OutgoingTransaction, Client, Server
+from .models import ProducerSyncSummary, SnapshotPosition
 
 # registering TokenAdmin with model Token fails
 # if you have not declared 'rest_framework.authtoken' in INSTALLED_APPS.
@@ -58,6 +59,32 @@ class OutgoingTransactionAdmin (admin.ModelAdmin):
     search_fields = ('tx_pk', 'tx', 'timestamp', 'error', 'id')
 
 
+@admin.register(ProducerSyncSummary, site=edc_sync_admin)
+class ProducerSyncSummaryAdmin (admin.ModelAdmin):
+
+    ordering = ('producer', )
+
+    list_display = (
+        'producer', 'pending_count', 'oldest_pending_timestamp',
+        'last_received_datetime', 'last_applied_datetime', 'error_count')
+
+    search_fields = ('producer', )
+
+    readonly_fields = list_display
+
+
+@admin.register(SnapshotPosition, site=edc_sync_admin)
+class SnapshotPositionAdmin (admin.ModelAdmin):
+
+    ordering = ('producer', )
+
+    list_display = ('producer', 'timestamp', 'snapshot_id', 'loaded_datetime')
+
+    search_fields = ('producer', 'snapshot_id')
+
+    readonly_fields = list_display
+
+
 class HostAdmin(admin.ModelAdmin):
 
     list_display = (
@@ -74,4 +101,5 @@ class ClientAdmin(HostAdmin):
 
 @admin.register(Server, site=edc_sync_admin)
 class ServerAdmin(HostAdmin):
-    pass
+
+    list_display = HostAdmin.list_display + ('max_bytes_per_second', 'batch_size')
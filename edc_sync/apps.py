@@ -1,5 +1,3 @@
-import sys
-
 from django.apps import AppConfig as DjangoAppConfig
 from django.conf import settings
 from django.core.management.color import color_style
@@ -18,15 +16,12 @@ class AppConfig(DjangoAppConfig):
     verbose_name = 'Data Synchronization'
     base_template_name = 'edc_base/base.html'
     custom_json_parsers = []
+    custom_field_parsers = []
     server_ip = settings.EDC_SYNC_SERVER_IP
     edc_sync_files_using = True
 
     # see edc_device for ROLE
 
     def ready(self):
-        from .signals import (
-            create_auth_token, serialize_on_post_delete,
-            serialize_m2m_on_save, serialize_on_save)
-        sys.stdout.write('Loading {} ...\n'.format(self.verbose_name))
+        from .signals import create_auth_token, enable_transaction_log_wal
         site_sync_models.autodiscover()
-        sys.stdout.write(' Done loading {}.\n'.format(self.verbose_name))
@@ -3,3 +3,6 @@ SERVER = 'Server'
 INSERT = 'I'
 UPDATE = 'U'
 DELETE = 'D'
+PRIORITY_HIGH = 2
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 0
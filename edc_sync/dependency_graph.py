@@ -0,0 +1,45 @@
+from django.apps import apps as django_apps
+
+
+def get_parent_models(model=None):
+    """Returns the set of models `model` refers to by FK or O2O,
+    not including itself.
+    """
+    return set(
+        field.related_model for field in model._meta.concrete_fields
+        if field.is_relation and field.related_model
+        and field.related_model is not model)
+
+
+def sort_by_dependency(models=None):
+    """Returns a list of models ordered parents first.
+
+    Only dependencies between the models given are considered. Ties
+    and cycles keep the order in which the models were given.
+    """
+    models = list(dict.fromkeys(models))
+    remaining = set(models)
+    ordered = []
+    while remaining:
+        ready = [model for model in models if model in remaining
+                 and not (get_parent_models(model) & remaining)]
+        if not ready:
+            # a cycle, take the first remaining model as is
+            ready = [model for model in models if model in remaining][:1]
+        for model in ready:
+            remaining.discard(model)
+            ordered.append(model)
+    return ordered
+
+
+def get_registered_models(registry=None):
+    """Returns a list of model classes for the labels in a
+    site_sync_models registry, ignoring labels that do not resolve.
+    """
+    models = []
+    for label in registry or {}:
+        try:
+            models.append(django_apps.get_model(label))
+        except (LookupError, ValueError):
+            pass
+    return models
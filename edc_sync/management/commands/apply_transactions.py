@@ -0,0 +1,63 @@
+import signal
+
+from django.core.management.base import BaseCommand
+from edc_device.constants import NODE_SERVER, CENTRAL_SERVER
+
+from edc_sync.transaction.apply_worker import ApplyWorker
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py apply_transactions --override_role=CentralServer
+
+    Stop with SIGTERM or Ctrl-C; the current chunk is finished first.
+    """
+
+    help = ('Applies incoming transactions continuously as they are '
+            'received.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk_size',
+            dest='chunk_size',
+            type=int,
+            default=None,
+            help=('Specify the number of transactions applied per loop.'),
+        )
+
+        parser.add_argument(
+            '--max_idle',
+            dest='max_idle',
+            type=float,
+            default=None,
+            help=('Specify the longest sleep in seconds when there is nothing to apply.'),
+        )
+
+        parser.add_argument(
+            '--using',
+            dest='using',
+            default=None,
+            help=('Specify the database to apply to.'),
+        )
+
+        parser.add_argument(
+            '--override_role',
+            dest='override_role',
+            default=None,
+            choices=[NODE_SERVER, CENTRAL_SERVER],
+            help=('Specify the device role if this device is not a server.'),
+        )
+
+    def handle(self, *args, **options):
+        worker = ApplyWorker(
+            using=options.get('using'),
+            chunk_size=options.get('chunk_size'),
+            max_idle=options.get('max_idle'),
+            override_role=options.get('override_role'))
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f'Apply worker {worker.name} started.')
+        worker.run()
+        self.stdout.write(
+            f'Apply worker {worker.name} stopped. Applied {worker.applied_count} '
+            f'transactions, {worker.error_count} errors.')
@@ -2,6 +2,7 @@ import logging
 
 from django.apps import apps as django_apps
 from django.core.management.base import BaseCommand
+from edc_sync.profiler import DeserializeProfiler
 from edc_sync.transaction import CustomTransactionDeserializer
 
 
@@ -13,6 +14,13 @@ class Command(BaseCommand):
     """Usage:
         python manage.py deserialize --batch=9835201711152020
             --model=label_lower --order_by=created,producer
+
+        python manage.py deserialize --producer=bcpp010 --profile
+            --cprofile=deserialize.prof
+
+        python manage.py deserialize --producer=bcpp010 --profile --memory
+
+        python manage.py deserialize --batch=9835201711152020 --dry_run
     """
 
     help = ('Deserialises transactions manually using '
@@ -36,8 +44,9 @@ class Command(BaseCommand):
         parser.add_argument(
             '--order_by',
             dest='order_by',
-            default='created',
-            help=('Specify a field to order by e.g timestamp or created.'),
+            default='-priority,created',
+            help=('Specify fields to order by e.g timestamp or created. '
+                  'Default drains higher priority lanes first.'),
         )
 
         parser.add_argument(
@@ -47,5 +56,67 @@ class Command(BaseCommand):
             help=('Specify a producer/client machine. e.g bcpp010'),
         )
 
+        parser.add_argument(
+            '--validate',
+            dest='validate',
+            action='store_true',
+            default=False,
+            help=('Validate payloads and FK references of all transactions '
+                  'first and do not apply any if one fails.'),
+        )
+
+        parser.add_argument(
+            '--dry_run',
+            dest='dry_run',
+            action='store_true',
+            default=False,
+            help=('Only validate and show the report.'),
+        )
+
+        parser.add_argument(
+            '--profile',
+            dest='profile',
+            action='store_true',
+            default=False,
+            help=('Show progress and a summary of time and queries '
+                  'per stage and per tx_name.'),
+        )
+
+        parser.add_argument(
+            '--memory',
+            dest='memory',
+            action='store_true',
+            default=False,
+            help=('With --profile, also trace memory per stage. Slows '
+                  'the run, so wall times are not comparable.'),
+        )
+
+        parser.add_argument(
+            '--cprofile',
+            dest='cprofile',
+            default=None,
+            help=('With --profile, dump cProfile stats to this file.'),
+        )
+
+        parser.add_argument(
+            '--tracemalloc',
+            dest='tracemalloc',
+            default=None,
+            help=('With --profile, dump a tracemalloc snapshot to this file. '
+                  'Implies --memory.'),
+        )
+
     def handle(self, *args, **options):
-        CustomTransactionDeserializer(**options)
+        if options.get('profile'):
+            with DeserializeProfiler(
+                    stdout=self.stdout,
+                    cprofile_path=options.get('cprofile'),
+                    tracemalloc_path=options.get('tracemalloc'),
+                    trace_memory=options.get('memory')) as profiler:
+                tx_deserializer = CustomTransactionDeserializer(
+                    profiler=profiler, **options)
+            self.stdout.write(profiler.summary())
+        else:
+            tx_deserializer = CustomTransactionDeserializer(**options)
+        if tx_deserializer.validation_result:
+            self.stdout.write(tx_deserializer.validation_result.report())
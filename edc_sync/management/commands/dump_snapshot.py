@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from edc_sync.transaction.snapshot import SnapshotWriter
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py dump_snapshot --filename=snapshot.edcsync
+    """
+
+    help = ('Writes the current state of the registered sync models and '
+            'the transactions it covers to a snapshot file, see '
+            'load_snapshot.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filename',
+            dest='filename',
+            default=None,
+            help=('Specify the snapshot file.'),
+        )
+
+        parser.add_argument(
+            '--using',
+            dest='using',
+            default=None,
+            help=('Specify the database alias to dump.'),
+        )
+
+    def handle(self, *args, **options):
+        if not options.get('filename'):
+            raise CommandError('Specify --filename.')
+        try:
+            header = SnapshotWriter(using=options.get('using')).dump(
+                filename=options.get('filename'))
+        except OSError as e:
+            raise CommandError(e) from e
+        for producer, timestamp in sorted(header['positions'].items()):
+            self.stdout.write(f'  {producer} {timestamp}')
+        self.stdout.write(
+            f'Wrote snapshot {header["snapshot_id"]} of '
+            f'{len(header["models"])} models.')
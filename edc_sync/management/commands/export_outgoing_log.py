@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from edc_sync.outgoing_log import get_outgoing_log
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py export_outgoing_log --export_path=/Volumes/BCPP --seal
+    """
+
+    help = ('Copies sealed segments of the outgoing log to the export '
+            'path. Requires the SegmentedFileBackend.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--export_path',
+            dest='export_path',
+            default=None,
+            help=('Specify the export path.'),
+        )
+
+        parser.add_argument(
+            '--seal',
+            dest='seal',
+            action='store_true',
+            default=False,
+            help=('Seal the open segment before exporting.'),
+        )
+
+    def handle(self, *args, **options):
+        outgoing_log = get_outgoing_log()
+        if not hasattr(outgoing_log, 'ship'):
+            raise CommandError(
+                f'Outgoing log backend {outgoing_log.__class__.__name__} '
+                'does not export segments. See EDC_SYNC_OUTGOING_LOG.')
+        if not options.get('export_path'):
+            raise CommandError('Specify --export_path.')
+        if options.get('seal'):
+            outgoing_log.seal()
+        shipped = outgoing_log.ship(export_path=options.get('export_path'))
+        for filename in shipped:
+            self.stdout.write(f'  {filename}')
+        self.stdout.write(f'Exported {len(shipped)} segments.')
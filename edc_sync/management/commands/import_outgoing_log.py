@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from edc_sync.outgoing_log import SegmentImporter
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py import_outgoing_log --import_path=/Volumes/BCPP
+    """
+
+    help = ('Saves the records of exported outgoing log segments as '
+            'incoming transactions.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--import_path',
+            dest='import_path',
+            default=None,
+            help=('Specify the path of the segment files.'),
+        )
+
+    def handle(self, *args, **options):
+        if not options.get('import_path'):
+            raise CommandError('Specify --import_path.')
+        importer = SegmentImporter(import_path=options.get('import_path'))
+        imported_count = importer.import_segments()
+        self.stdout.write(f'Imported {imported_count} incoming transactions.')
@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django_crypto_fields.constants import LOCAL_MODE
+from django_crypto_fields.cryptor import Cryptor
+
+from edc_sync.transaction.batch_file import BatchFileReader, BatchFileError
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py inspect_batch_file --filename=batch.edcsync
+            --tx_pk=<uuid> --decrypt
+    """
+
+    help = ('Shows the header of an indexed batch file and the records '
+            'matching tx_name and/or tx_pk without reading the whole file.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filename',
+            dest='filename',
+            default=None,
+            help=('Specify the batch file.'),
+        )
+
+        parser.add_argument(
+            '--tx_name',
+            dest='tx_name',
+            default=None,
+            help=('Show records of this model, e.g. app_label.model_name.'),
+        )
+
+        parser.add_argument(
+            '--tx_pk',
+            dest='tx_pk',
+            default=None,
+            help=('Show records of this model instance pk.'),
+        )
+
+        parser.add_argument(
+            '--decrypt',
+            dest='decrypt',
+            action='store_true',
+            default=False,
+            help=('Show the decrypted json of each record.'),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with BatchFileReader(options.get('filename')) as reader:
+                self.stdout.write(f'{json.dumps(reader.header)}, {len(reader)} records.')
+                if options.get('tx_name') or options.get('tx_pk'):
+                    for record in reader.find(
+                            tx_name=options.get('tx_name'),
+                            tx_pk=options.get('tx_pk')):
+                        self.stdout.write(
+                            f'{record.seq} {record.tx_name} {record.tx_pk} '
+                            f'{record.timestamp} {record.action}')
+                        if options.get('decrypt'):
+                            self.stdout.write(Cryptor().aes_decrypt(
+                                record.tx, LOCAL_MODE))
+        except (BatchFileError, OSError) as e:
+            raise CommandError(e) from e
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from edc_sync.transaction.batch_file import BatchFileError
+from edc_sync.transaction.snapshot import SnapshotLoader, SnapshotError
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py load_snapshot --filename=snapshot.edcsync
+        python manage.py apply_transactions
+    """
+
+    help = ('Loads a snapshot written by dump_snapshot into an empty '
+            'database. Incoming transactions covered by the snapshot '
+            'are then consumed without being applied.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filename',
+            dest='filename',
+            default=None,
+            help=('Specify the snapshot file.'),
+        )
+
+        parser.add_argument(
+            '--using',
+            dest='using',
+            default=None,
+            help=('Specify the database alias to load into.'),
+        )
+
+        parser.add_argument(
+            '--batch_size',
+            dest='batch_size',
+            type=int,
+            default=None,
+            help=('Rows per INSERT batch.'),
+        )
+
+    def handle(self, *args, **options):
+        if not options.get('filename'):
+            raise CommandError('Specify --filename.')
+        loader = SnapshotLoader(
+            using=options.get('using'), batch_size=options.get('batch_size'))
+        try:
+            header = loader.load(filename=options.get('filename'))
+        except (BatchFileError, SnapshotError, OSError) as e:
+            raise CommandError(e) from e
+        self.stdout.write(
+            f'Loaded snapshot {header["snapshot_id"]}: '
+            f'{loader.loaded_count} rows, {loader.covered_count} transactions covered.')
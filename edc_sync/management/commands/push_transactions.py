@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from edc_base.utils import get_utcnow
+from requests.exceptions import RequestException
+
+from edc_sync.models import Server
+from edc_sync.transaction.transaction_pusher import (
+    TransactionPusher, TransactionPusherError)
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py push_transactions --token=<token>
+            --hostname=central --batch_size=200
+    """
+
+    help = ('Pushes pending outgoing transactions to the server '
+            'in gzip compressed batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hostname',
+            dest='hostname',
+            default=None,
+            help=('Specify the server hostname. Default: first active Server.'),
+        )
+
+        parser.add_argument(
+            '--token',
+            dest='token',
+            default=None,
+            help=('Specify the API token of the user on the server.'),
+        )
+
+        parser.add_argument(
+            '--batch_size',
+            dest='batch_size',
+            type=int,
+            default=None,
+            help=('Specify a fixed number of transactions per request. '
+                  'Default: tuned to the link, starting from Server.batch_size.'),
+        )
+
+        parser.add_argument(
+            '--using',
+            dest='using',
+            default='default',
+            help=('Specify the database of the outgoing transactions.'),
+        )
+
+    def handle(self, *args, **options):
+        servers = Server.objects.filter(is_active=True)
+        if options.get('hostname'):
+            servers = servers.filter(hostname=options.get('hostname'))
+        server = servers.first()
+        if not server:
+            raise CommandError('No active Server found. See Server model.')
+        pusher = TransactionPusher.from_host(
+            host=server,
+            token=options.get('token'),
+            using=options.get('using'),
+            batch_size=options.get('batch_size'))
+        try:
+            pushed_count = pusher.push()
+        except (RequestException, TransactionPusherError) as e:
+            server.last_sync_status = str(e)[:250]
+            server.batch_size = pusher.batch_size
+            server.save()
+            raise CommandError(e) from e
+        server.last_sync_datetime = get_utcnow()
+        server.last_sync_status = f'Pushed {pushed_count}'
+        server.batch_size = pusher.batch_size
+        server.save()
+        self.stdout.write(f'Pushed {pushed_count} transactions to {server}.')
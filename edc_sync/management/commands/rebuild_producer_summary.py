@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from edc_sync.producer_summary import rebuild
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py rebuild_producer_summary
+    """
+
+    help = ('Rebuilds the producer sync summaries from the incoming '
+            'transactions. Run once after migrating or if incoming '
+            'transactions were changed outside of edc_sync.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--using',
+            dest='using',
+            default=None,
+            help=('Specify the database alias of the incoming transactions.'),
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild(using=options.get('using'))
+        self.stdout.write(f'Rebuilt summaries for {count} producers.')
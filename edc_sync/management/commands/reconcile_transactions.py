@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from requests.exceptions import RequestException
+
+from edc_sync.models import Server
+from edc_sync.reconciliation import Reconciler
+from edc_sync.transaction.transaction_pusher import TransactionPusher, TransactionPusherError
+
+
+class Command(BaseCommand):
+    """Usage:
+        python manage.py reconcile_transactions --token=<token>
+            --hostname=central
+    """
+
+    help = ('Compares outgoing transactions with those received by the '
+            'server and resends only the missing ones.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hostname',
+            dest='hostname',
+            default=None,
+            help=('Specify the server hostname. Default: first active Server.'),
+        )
+
+        parser.add_argument(
+            '--token',
+            dest='token',
+            default=None,
+            help=('Specify the API token of the user on the server.'),
+        )
+
+        parser.add_argument(
+            '--using',
+            dest='using',
+            default='default',
+            help=('Specify the database of the outgoing transactions.'),
+        )
+
+    def handle(self, *args, **options):
+        servers = Server.objects.filter(is_active=True)
+        if options.get('hostname'):
+            servers = servers.filter(hostname=options.get('hostname'))
+        server = servers.first()
+        if not server:
+            raise CommandError('No active Server found. See Server model.')
+        pusher = TransactionPusher.from_host(
+            host=server, token=options.get('token'), using=options.get('using'))
+        reconciler = Reconciler.from_host(host=server, pusher=pusher)
+        try:
+            sent = reconciler.resend()
+        except (RequestException, TransactionPusherError) as e:
+            raise CommandError(e) from e
+        self.stdout.write(
+            f'Resent {sent} transactions to {server} '
+            f'in {reconciler.round_trips} round trips.')
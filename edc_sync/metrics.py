@@ -0,0 +1,297 @@
+import threading
+
+from contextlib import contextmanager
+from time import monotonic, perf_counter
+
+from django.db.models.aggregates import Count
+
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join(
+        f'{name}="{escape(value)}"' for name, value in labels))
+
+
+class Metric:
+
+    """Base class for a metric with optional labels, for example:
+
+        counter.inc(model='edc_sync.testmodel')
+    """
+
+    metric_type = None
+
+    def __init__(self, name=None, help_text=None, labelnames=None):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames or [])
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(name={self.name!r})'
+
+    def get_key(self, labels):
+        return tuple((name, labels.get(name, '')) for name in self.labelnames)
+
+    def get(self, **labels):
+        return self.values.get(self.get_key(labels))
+
+    def clear(self):
+        with self.lock:
+            self.values = {}
+
+    def items(self):
+        """Returns a sorted copy of the values, safe to iterate
+        while other threads update them.
+        """
+        with self.lock:
+            return sorted(self.values.items())
+
+    def samples(self):
+        """Yields tuples of (name, labels, value).
+        """
+        for key, value in self.items():
+            yield self.name, key, value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {escape(self.help_text)}',
+                 f'# TYPE {self.name} {self.metric_type}']
+        for name, labels, value in self.samples():
+            lines.append(f'{name}{format_labels(labels)} {float(value)!r}')
+        return lines
+
+
+class Counter(Metric):
+
+    metric_type = 'counter'
+
+    def inc(self, amount=None, **labels):
+        key = self.get_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + (
+                1 if amount is None else amount)
+
+
+class Gauge(Metric):
+
+    metric_type = 'gauge'
+
+    def set(self, value=None, **labels):
+        with self.lock:
+            self.values[self.get_key(labels)] = value
+
+
+class Histogram(Metric):
+
+    metric_type = 'histogram'
+
+    def __init__(self, buckets=None, **kwargs):
+        super().__init__(**kwargs)
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+
+    def observe(self, value=None, **labels):
+        key = self.get_key(labels)
+        with self.lock:
+            counts, total, count = self.values.get(
+                key, ([0] * len(self.buckets), 0, 0))
+            counts = [n + 1 if value <= bucket else n
+                      for n, bucket in zip(counts, self.buckets)]
+            self.values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the time, in seconds, spent in the block.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def samples(self):
+        for key, (counts, total, count) in self.items():
+            for bucket, n in zip(self.buckets, counts):
+                yield f'{self.name}_bucket', key + (('le', repr(bucket)),), n
+            yield f'{self.name}_bucket', key + (('le', '+Inf'),), count
+            yield f'{self.name}_sum', key, total
+            yield f'{self.name}_count', key, count
+
+
+class MetricsRegistry:
+
+    """A registry of metrics rendered in the Prometheus text
+    exposition format.
+
+    Collectors are callables run before rendering to refresh
+    metrics that are read from the DB, e.g. queue depth.
+
+    Note: values are kept per process.
+    """
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self.registry = {}
+        self.collectors = []
+
+    def register(self, metric):
+        self.registry.update({metric.name: metric})
+        return metric
+
+    def counter(self, name, help_text, labelnames=None):
+        return self.register(
+            Counter(name=name, help_text=help_text, labelnames=labelnames))
+
+    def gauge(self, name, help_text, labelnames=None):
+        return self.register(
+            Gauge(name=name, help_text=help_text, labelnames=labelnames))
+
+    def histogram(self, name, help_text, labelnames=None, buckets=None):
+        return self.register(
+            Histogram(name=name, help_text=help_text, labelnames=labelnames,
+                      buckets=buckets))
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.registry.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+site_metrics = MetricsRegistry()
+
+serialize_seconds = site_metrics.histogram(
+    'edc_sync_serialize_seconds',
+    'Time to serialize a model instance to JSON.', ['model'])
+
+encrypt_seconds = site_metrics.histogram(
+    'edc_sync_encrypt_seconds',
+    'Time to encrypt a serialized model instance.', ['model'])
+
+outgoing_transactions_total = site_metrics.counter(
+    'edc_sync_outgoing_transactions_total',
+    'Outgoing transactions created.', ['model', 'action'])
+
+duplicate_transactions_total = site_metrics.counter(
+    'edc_sync_duplicate_transactions_total',
+    'Transactions skipped since their digest matches the last one '
+    'logged or applied.', ['model', 'stage'])
+
+decrypt_seconds = site_metrics.histogram(
+    'edc_sync_decrypt_seconds',
+    'Time to decrypt an incoming transaction.', ['model'])
+
+deserialize_seconds = site_metrics.histogram(
+    'edc_sync_deserialize_seconds',
+    'Time to decode, parse and deserialize an incoming transaction.', ['model'])
+
+save_seconds = site_metrics.histogram(
+    'edc_sync_save_seconds',
+    'Time to save a batch of deserialized instances of one model.', ['model'])
+
+delete_seconds = site_metrics.histogram(
+    'edc_sync_delete_seconds',
+    'Time to delete a batch of instances of one model.', ['model'])
+
+applied_transactions_total = site_metrics.counter(
+    'edc_sync_applied_transactions_total',
+    'Incoming transactions applied.', ['model', 'action'])
+
+apply_rows_per_second = site_metrics.gauge(
+    'edc_sync_apply_rows_per_second',
+    'Rows per second of the last deserialize run.')
+
+api_batch_size = site_metrics.histogram(
+    'edc_sync_api_batch_size',
+    'Number of transactions per API request.', ['resource', 'method'],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+
+incoming_pending = site_metrics.gauge(
+    'edc_sync_incoming_pending',
+    'Unconsumed incoming transactions per producer.', ['producer'])
+
+outgoing_pending = site_metrics.gauge(
+    'edc_sync_outgoing_pending',
+    'Outgoing transactions not yet consumed by the server per producer.',
+    ['producer'])
+
+
+class QueueDepthCollector:
+
+    """Refreshes the queue depth gauges.
+
+    Incoming depth is read from ProducerSyncSummary. The outgoing
+    queue is counted at most once per `interval` seconds per process
+    instead of on every scrape.
+    """
+
+    interval = 60
+
+    def __init__(self, interval=None):
+        self.interval = self.interval if interval is None else interval
+        self.collected = None
+
+    def __call__(self):
+        from .models import OutgoingTransaction, ProducerSyncSummary
+        incoming_pending.clear()
+        for producer, pending_count in ProducerSyncSummary.objects.values_list(
+                'producer', 'pending_count'):
+            incoming_pending.set(pending_count, producer=producer)
+        if self.collected is None or monotonic() - self.collected >= self.interval:
+            self.collected = monotonic()
+            outgoing_pending.clear()
+            for row in OutgoingTransaction.objects.filter(
+                    is_consumed_server=False).values(
+                        'producer').annotate(pending=Count('id')).order_by():
+                outgoing_pending.set(row['pending'], producer=row['producer'])
+
+
+collect_queue_depth = QueueDepthCollector()
+
+site_metrics.add_collector(collect_queue_depth)
+
+apply_worker_applied = site_metrics.gauge(
+    'edc_sync_apply_worker_applied',
+    'Transactions applied by an apply worker since it started.', ['worker'])
+
+apply_worker_rows_per_second = site_metrics.gauge(
+    'edc_sync_apply_worker_rows_per_second',
+    'Rows per second of the last chunk applied by an apply worker.', ['worker'])
+
+apply_worker_lag_seconds = site_metrics.gauge(
+    'edc_sync_apply_worker_lag_seconds',
+    'Seconds since the oldest transaction being applied was received.', ['worker'])
+
+
+def collect_apply_workers():
+    """Reads the stats the apply workers publish to the cache,
+    since they run in their own processes.
+    """
+    from .transaction.apply_worker import get_worker_stats
+    for gauge in [apply_worker_applied, apply_worker_rows_per_second,
+                  apply_worker_lag_seconds]:
+        gauge.clear()
+    for stats in get_worker_stats():
+        if not stats.get('stopped'):
+            apply_worker_applied.set(stats['applied'], worker=stats['worker'])
+            apply_worker_rows_per_second.set(
+                stats['rows_per_second'], worker=stats['worker'])
+            apply_worker_lag_seconds.set(stats['lag_seconds'], worker=stats['worker'])
+
+
+site_metrics.add_collector(collect_apply_workers)
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_sync', '0006_auto_20180125_0646'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incomingtransaction',
+            name='tx_digest',
+            field=models.CharField(blank=True, db_index=True, help_text='sha256 of the serialized instance excluding audit fields', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='outgoingtransaction',
+            name='tx_digest',
+            field=models.CharField(blank=True, db_index=True, help_text='sha256 of the serialized instance excluding audit fields', max_length=64, null=True),
+        ),
+    ]
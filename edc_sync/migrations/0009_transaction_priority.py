@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_sync', '0008_producersyncsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incomingtransaction',
+            name='priority',
+            field=models.IntegerField(default=1, help_text='Lane of the transaction, higher lanes are drained first'),
+        ),
+        migrations.AddField(
+            model_name='outgoingtransaction',
+            name='priority',
+            field=models.IntegerField(default=1, help_text='Lane of the transaction, higher lanes are drained first'),
+        ),
+        migrations.AddIndex(
+            model_name='incomingtransaction',
+            index=models.Index(fields=['priority', 'timestamp'], name='edc_sync_in_priority_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outgoingtransaction',
+            index=models.Index(fields=['priority', 'timestamp'], name='edc_sync_out_priority_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_sync', '0009_transaction_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='batch_size',
+            field=models.IntegerField(blank=True, help_text='Transactions per request, last tuned by the pusher.', null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='max_bytes_per_second',
+            field=models.IntegerField(blank=True, help_text='Cap on the bytes per second sent to this host. Leave blank for no cap.', null=True),
+        ),
+        migrations.AddField(
+            model_name='server',
+            name='batch_size',
+            field=models.IntegerField(blank=True, help_text='Transactions per request, last tuned by the pusher.', null=True),
+        ),
+        migrations.AddField(
+            model_name='server',
+            name='max_bytes_per_second',
+            field=models.IntegerField(blank=True, help_text='Cap on the bytes per second sent to this host. Leave blank for no cap.', null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_sync', '0010_host_batch_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incomingtransaction',
+            name='claimed_by',
+            field=models.CharField(blank=True, help_text='Worker applying this transaction, see transaction.claims', max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='incomingtransaction',
+            name='claim_expires',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
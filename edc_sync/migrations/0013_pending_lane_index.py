@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_sync', '0012_snapshotposition'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='incomingtransaction',
+            name='edc_sync_in_priority_ts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='outgoingtransaction',
+            name='edc_sync_out_priority_ts_idx',
+        ),
+        migrations.AddIndex(
+            model_name='incomingtransaction',
+            index=models.Index(fields=['is_consumed', 'is_ignored', '-priority', 'timestamp'],
+                               name='edc_sync_in_pending_lane_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outgoingtransaction',
+            index=models.Index(fields=['is_consumed_server', '-priority', 'timestamp'],
+                               name='edc_sync_out_pending_lane_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_sync', '0013_pending_lane_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='client',
+            name='batch_size',
+        ),
+        migrations.RemoveField(
+            model_name='client',
+            name='max_bytes_per_second',
+        ),
+    ]
@@ -5,6 +5,7 @@ from django_crypto_fields.constants import LOCAL_MODE
 from django_crypto_fields.cryptor import Cryptor
 
 from .choices import ACTIONS
+from .constants import PRIORITY_NORMAL
 
 
 class TransactionModelMixin(models.Model):
@@ -14,6 +15,13 @@ class TransactionModelMixin(models.Model):
 
     tx = models.BinaryField()
 
+    tx_digest = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text='sha256 of the serialized instance excluding audit fields')
+
     tx_name = models.CharField(
         max_length=64)
 
@@ -33,6 +41,10 @@ class TransactionModelMixin(models.Model):
         max_length=50,
         db_index=True)
 
+    priority = models.IntegerField(
+        default=PRIORITY_NORMAL,
+        help_text='Lane of the transaction, higher lanes are drained first')
+
     consumed_datetime = models.DateTimeField(
         null=True,
         blank=True)
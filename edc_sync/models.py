@@ -24,12 +24,26 @@ class IncomingTransaction(TransactionModelMixin, SiteModelMixin, BaseUuidModel):
     is_self = models.BooleanField(
         default=False)
 
+    claimed_by = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        help_text='Worker applying this transaction, see transaction.claims')
+
+    claim_expires = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True)
+
     on_site = CurrentSiteManager()
 
     objects = models.Manager()
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [models.Index(
+            fields=['is_consumed', 'is_ignored', '-priority', 'timestamp'],
+            name='edc_sync_in_pending_lane_idx')]
 
 
 class OutgoingTransaction(TransactionModelMixin, SiteModelMixin, BaseUuidModel):
@@ -64,6 +78,76 @@ class OutgoingTransaction(TransactionModelMixin, SiteModelMixin, BaseUuidModel):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [models.Index(
+            fields=['is_consumed_server', '-priority', 'timestamp'],
+            name='edc_sync_out_pending_lane_idx')]
+
+
+class ProducerSyncSummary(BaseUuidModel):
+
+    """Counters of the incoming transactions of a producer, updated
+    on ingest and apply (see `edc_sync.producer_summary`) so reports
+    do not aggregate the queue.
+    """
+
+    producer = models.CharField(
+        max_length=200,
+        unique=True)
+
+    pending_count = models.IntegerField(
+        default=0,
+        help_text='Incoming transactions not yet consumed')
+
+    oldest_pending_timestamp = models.CharField(
+        max_length=50,
+        null=True,
+        blank=True)
+
+    last_received_datetime = models.DateTimeField(
+        null=True,
+        blank=True)
+
+    last_applied_datetime = models.DateTimeField(
+        null=True,
+        blank=True)
+
+    error_count = models.IntegerField(
+        default=0,
+        help_text='Transactions that failed to apply')
+
+    def __str__(self):
+        return f'{self.producer}: {self.pending_count} pending'
+
+    class Meta:
+        ordering = ['producer']
+
+
+class SnapshotPosition(BaseUuidModel):
+
+    """The timestamp of the last transaction of a producer covered
+    by the snapshot loaded into this database, for information. The
+    transactions covered are saved as consumed incoming transactions
+    (see `edc_sync.transaction.snapshot`).
+    """
+
+    producer = models.CharField(
+        max_length=200,
+        unique=True)
+
+    timestamp = models.CharField(
+        max_length=50)
+
+    snapshot_id = models.CharField(
+        max_length=36)
+
+    loaded_datetime = models.DateTimeField(
+        default=get_utcnow)
+
+    def __str__(self):
+        return f'{self.producer}: {self.timestamp}'
+
+    class Meta:
+        ordering = ['producer']
 
 
 class HostManager(models.Manager):
@@ -88,8 +172,21 @@ class Client(HostModelMixin, BaseUuidModel):
 class Server(HostModelMixin, BaseUuidModel):
 
     """A model to capture the attributes of the server.
+
+    `batch_size` and `max_bytes_per_second` are used by the pusher
+    (see TransactionPusher.from_host); pulls are not tuned.
     """
 
+    max_bytes_per_second = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text='Cap on the bytes per second sent to this host. Leave blank for no cap.')
+
+    batch_size = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text='Transactions per request, last tuned by the pusher.')
+
     objects = HostManager()
 
     class Meta:
@@ -130,5 +227,5 @@ class History(BaseUuidModel):
         unique_together = (('filename', 'hostname'),)
 
 
-if 'edc_sync' in settings.APP_NAME and 'makemigrations' not in sys.argv:
+if getattr(settings, 'EDC_SYNC_TEST_MODELS', False) and 'makemigrations' not in sys.argv:
     from .tests import models
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .backends import DatabaseBackend, SegmentedFileBackend, OutgoingLogError
+from .importer import SegmentImporter, save_incoming_transactions
+from .record import Record
+from .segment import Segment
+
+DEFAULT_BACKEND = 'edc_sync.outgoing_log.DatabaseBackend'
+
+_backends = {}
+
+
+def get_outgoing_log():
+    """Returns the outgoing log backend configured in settings
+    EDC_SYNC_OUTGOING_LOG, default: DatabaseBackend.
+    """
+    config = getattr(settings, 'EDC_SYNC_OUTGOING_LOG', None) or {}
+    backend = config.get('BACKEND', DEFAULT_BACKEND)
+    options = config.get('OPTIONS', {})
+    key = (backend, tuple(sorted(options.items())))
+    if key not in _backends:
+        _backends[key] = import_string(backend)(**options)
+    return _backends[key]
+
+
+def outgoing_transactions_or_raise():
+    """Raises OutgoingLogError if the outgoing log backend does not
+    save OutgoingTransaction rows. Push, the outgoing API and
+    reconciliation read those rows and would otherwise send nothing.
+    """
+    outgoing_log = get_outgoing_log()
+    if not getattr(outgoing_log, 'saves_outgoing_transactions', True):
+        raise OutgoingLogError(
+            f'Outgoing log backend {outgoing_log.__class__.__name__} does not '
+            'save OutgoingTransaction rows. Ship its segments with '
+            'export_outgoing_log instead. See EDC_SYNC_OUTGOING_LOG.')
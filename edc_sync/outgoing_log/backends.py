@@ -0,0 +1,336 @@
+import os
+import shutil
+import socket
+import threading
+
+from collections import OrderedDict
+from django.apps import apps as django_apps
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from ..constants import DELETE
+from ..routers import get_transaction_using
+from .record import Record
+from .segment import Segment
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class OutgoingLogError(Exception):
+    pass
+
+
+class AppendedDigests:
+
+    """Tracks the digest of the last transaction appended per
+    instance, None for a DELETE.
+
+    Appends made inside an atomic block are pending until it
+    commits and are dropped if it, or the savepoint they were made
+    in, rolls back. Committed digests are kept for the last
+    `max_size` instances appended by this process.
+    """
+
+    max_size = 10000
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or self.max_size
+        self.committed = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def pending(self, using=None):
+        if not hasattr(self.local, 'pending'):
+            self.local.pending = {}
+        return self.local.pending.setdefault(using, {})
+
+    def add(self, key=None, digest=None, using=None):
+        using = using or DEFAULT_DB_ALIAS
+        if not connections[using].in_atomic_block:
+            self.commit(key=key, digest=digest)
+            return
+
+        def on_commit():
+            entries = self.pending(using).get(key, [])
+            if (digest, on_commit) in entries:
+                entries.remove((digest, on_commit))
+            self.commit(key=key, digest=digest)
+
+        self.pending(using).setdefault(key, []).append((digest, on_commit))
+        transaction.on_commit(on_commit, using=using)
+
+    def commit(self, key=None, digest=None):
+        with self.lock:
+            self.committed.pop(key, None)
+            self.committed[key] = digest
+            while len(self.committed) > self.max_size:
+                self.committed.popitem(last=False)
+
+    def get(self, key=None, using=None):
+        """Returns a tuple of (found, digest).
+        """
+        using = using or DEFAULT_DB_ALIAS
+        entries = self.pending(using).get(key)
+        if entries:
+            callbacks = [func for _, func in connections[using].run_on_commit]
+            entries[:] = [(digest, func) for digest, func in entries
+                          if any(func is callback for callback in callbacks)]
+            if entries:
+                return True, entries[-1][0]
+        with self.lock:
+            if key in self.committed:
+                return True, self.committed[key]
+        return False, None
+
+
+class DatabaseBackend:
+
+    """The default outgoing log backend. Saves the
+    OutgoingTransaction model instance.
+
+    If the transaction log is in its own alias (see
+    EDC_SYNC_TRANSACTION_DATABASES), the instance is saved there once
+    the clinical transaction on `using` commits.
+    """
+
+    saves_outgoing_transactions = True
+
+    def __init__(self, **options):
+        self.options = options
+        self.appended_digests = AppendedDigests()
+
+    def append(self, outgoing_transaction=None, using=None):
+        transaction_using = get_transaction_using(using)
+        if transaction_using == using:
+            outgoing_transaction.save(force_insert=True, using=using)
+        else:
+            transaction.on_commit(
+                lambda: outgoing_transaction.save(
+                    force_insert=True, using=transaction_using),
+                using=using)
+        add_appended_digest(self.appended_digests, outgoing_transaction, using)
+        return outgoing_transaction
+
+    def last_digest(self, tx_name=None, tx_pk=None, using=None):
+        """Returns the digest of the last transaction appended for
+        the instance, including appends pending in the current
+        transaction on `using` (see `AppendedDigests`).
+
+        The log is only read for an instance not appended by this
+        process.
+        """
+        found, digest = self.appended_digests.get(
+            key=(tx_name, str(tx_pk)), using=using)
+        if found:
+            return digest
+        OutgoingTransaction = django_apps.get_model(
+            'edc_sync', 'OutgoingTransaction')
+        last = OutgoingTransaction.objects.using(
+            get_transaction_using(using)).filter(
+                tx_name=tx_name, tx_pk=tx_pk).order_by(
+                    '-timestamp').values_list('action', 'tx_digest').first()
+        return None if not last or last[0] == DELETE else last[1]
+
+
+class SegmentedFileBackend:
+
+    """An outgoing log backend that appends records to size-rotated
+    segment files instead of saving OutgoingTransaction rows.
+
+    Records are appended once the clinical transaction on `using`
+    commits. A segment is sealed once it reaches `segment_size`
+    bytes. Sealed segments are shipped whole with `ship`.
+
+    Segment filenames start with `producer`, default: the hostname,
+    so several producers can export to the same medium. The next
+    sequence number is kept in `next_seq_filename` so numbering
+    continues after every segment has been shipped.
+
+    Nothing is pushed, pulled or reconciled over the REST API with
+    this backend, see `outgoing_transactions_or_raise`.
+
+    Configure in settings:
+        EDC_SYNC_OUTGOING_LOG = {
+            'BACKEND': 'edc_sync.outgoing_log.SegmentedFileBackend',
+            'OPTIONS': {'path': '/var/lib/edc_sync/outgoing',
+                        'segment_size': 8388608}}
+    """
+
+    segment_size = 8 * 1024 * 1024
+    lock_filename = '.lock'
+    next_seq_filename = '.next_seq'
+    saves_outgoing_transactions = False
+
+    def __init__(self, path=None, segment_size=None, fsync=None,
+                 producer=None, **options):
+        self.path = path
+        self.segment_size = segment_size or self.segment_size
+        self.fsync = True if fsync is None else fsync
+        self.producer = producer or socket.gethostname()
+        self.options = options
+        self.thread_lock = threading.Lock()
+        self.appended_digests = AppendedDigests()
+        os.makedirs(self.path, exist_ok=True)
+
+    def lock(self):
+        return FileLock(
+            os.path.join(self.path, self.lock_filename), self.thread_lock)
+
+    def segments(self):
+        """Returns the segments in the log path ordered by first
+        sequence number.
+        """
+        segments = [Segment.from_filename(path=self.path, filename=filename)
+                    for filename in os.listdir(self.path)]
+        return sorted(
+            [s for s in segments if s and s.producer in [self.producer, None]],
+            key=lambda s: s.first_seq)
+
+    def sealed_segments(self):
+        return [segment for segment in self.segments() if segment.sealed]
+
+    def open_segment(self):
+        segments = self.segments()
+        if segments and not segments[-1].sealed:
+            return segments[-1]
+        first_seq = max(
+            segments[-1].next_seq if segments else 0, self.read_next_seq())
+        return Segment(path=self.path, first_seq=first_seq, sealed=False,
+                       producer=self.producer)
+
+    def read_next_seq(self):
+        try:
+            with open(os.path.join(self.path, self.next_seq_filename)) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_next_seq(self, next_seq=None):
+        """Persists the sequence number of the next segment. Call
+        with the lock held.
+        """
+        if next_seq <= self.read_next_seq():
+            return
+        filename = os.path.join(self.path, self.next_seq_filename)
+        with open(f'{filename}.tmp', 'w') as f:
+            f.write(str(next_seq))
+            Segment.flush(f, fsync=self.fsync)
+        os.replace(f'{filename}.tmp', filename)
+
+    def seal_segment(self, segment=None):
+        segment.seal()
+        self.write_next_seq(segment.next_seq)
+
+    def append(self, outgoing_transaction=None, using=None):
+        record = Record.from_outgoing_transaction(outgoing_transaction)
+        transaction.on_commit(lambda: self.write(record), using=using)
+        add_appended_digest(self.appended_digests, outgoing_transaction, using)
+        return outgoing_transaction
+
+    def last_digest(self, tx_name=None, tx_pk=None, using=None):
+        """Returns the digest of the last transaction appended for
+        the instance by this process, if any (see `AppendedDigests`).
+        Segments are not searched by instance.
+        """
+        return self.appended_digests.get(
+            key=(tx_name, str(tx_pk)), using=using)[1]
+
+    def write(self, record=None):
+        """Appends a record to the open segment and seals the segment
+        if full. Returns the sequence number of the record.
+        """
+        data = record.encode()
+        with self.lock():
+            segment = self.open_segment()
+            record.seq = segment.append(data, fsync=self.fsync)
+            if segment.size >= self.segment_size:
+                self.seal_segment(segment)
+        return record.seq
+
+    def seal(self):
+        """Seals the open segment, if not empty.
+        """
+        with self.lock():
+            segment = self.open_segment()
+            if segment.count:
+                self.seal_segment(segment)
+
+    def records(self, using=None, from_seq=None):
+        """Yields records from sequence number `from_seq` across
+        segments.
+        """
+        from_seq = from_seq or 0
+        for segment in self.segments():
+            if segment.next_seq > from_seq:
+                yield from segment.records(from_seq=from_seq)
+
+    def ship(self, export_path=None, archive_path=None):
+        """Copies sealed segments and their index to `export_path`
+        and moves them to `archive_path`. Returns the list of
+        filenames shipped.
+
+        Raises OutgoingLogError instead of overwriting a file already
+        in `export_path` or `archive_path`.
+
+        `shutil.copyfile` uses `os.sendfile` where available, so
+        segments are copied without passing through user space.
+        """
+        archive_path = archive_path or os.path.join(self.path, 'shipped')
+        os.makedirs(archive_path, exist_ok=True)
+        shipped = []
+        with self.lock():
+            for segment in self.sealed_segments():
+                self.write_next_seq(segment.next_seq)
+                filenames = [segment.filename, segment.index_filename]
+                for path in [export_path, archive_path]:
+                    for filename in filenames:
+                        if os.path.exists(os.path.join(
+                                path, os.path.basename(filename))):
+                            raise OutgoingLogError(
+                                f'Segment {os.path.basename(filename)} '
+                                f'already exists in {path}.')
+                for filename in filenames:
+                    shutil.copyfile(filename, os.path.join(
+                        export_path, os.path.basename(filename)))
+                for filename in filenames:
+                    shutil.move(filename, os.path.join(
+                        archive_path, os.path.basename(filename)))
+                shipped.append(os.path.basename(segment.filename))
+        return shipped
+
+
+def add_appended_digest(appended_digests=None, outgoing_transaction=None,
+                        using=None):
+    appended_digests.add(
+        key=(outgoing_transaction.tx_name, str(outgoing_transaction.tx_pk)),
+        digest=(None if outgoing_transaction.action == DELETE
+                else outgoing_transaction.tx_digest),
+        using=using)
+
+
+class FileLock:
+
+    """Serializes appends across threads and, where `fcntl` is
+    available, across processes.
+    """
+
+    def __init__(self, filename=None, thread_lock=None):
+        self.filename = filename
+        self.thread_lock = thread_lock
+        self.f = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl:
+            self.f = open(self.filename, 'a')
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if self.f:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+            self.f.close()
+            self.f = None
+        self.thread_lock.release()
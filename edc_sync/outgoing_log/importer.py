@@ -0,0 +1,101 @@
+import os
+
+from django.apps import apps as django_apps
+from django.db import transaction
+
+from ..metrics import duplicate_transactions_total
+from ..producer_summary import update_received
+from ..queue_version import bump, INCOMING
+from ..transaction.digests import get_duplicate_transaction, get_last_digests, is_duplicate
+from .segment import Segment
+
+
+class SegmentImporter:
+
+    """Saves the records of shipped segment files as incoming
+    transactions, skipping records already received.
+
+    Usage:
+        SegmentImporter(import_path='/path/to/segments').import_segments()
+    """
+
+    batch_size = 500
+
+    def __init__(self, import_path=None, using=None, batch_size=None):
+        self.import_path = import_path
+        self.using = using
+        self.batch_size = batch_size or self.batch_size
+        self.imported_count = 0
+
+    def segments(self):
+        segments = [Segment.from_filename(path=self.import_path, filename=filename)
+                    for filename in os.listdir(self.import_path)]
+        return sorted([s for s in segments if s and s.sealed],
+                      key=lambda s: (s.producer or '', s.first_seq))
+
+    def import_segments(self):
+        """Imports all sealed segments in the import path and returns
+        the number of incoming transactions created.
+        """
+        for segment in self.segments():
+            batch = []
+            for record in segment.records():
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    self.save(batch)
+                    batch = []
+            self.save(batch)
+        return self.imported_count
+
+    def save(self, records=None):
+        self.imported_count += save_incoming_transactions(
+            records=records, using=self.using)
+
+
+def save_incoming_transactions(records=None, using=None):
+    """Saves records as incoming transactions, skipping those
+    already received, and returns the number saved.
+
+    Records with the same digest as the last transaction received
+    for the instance, if already applied, are recorded as ignored duplicates (see
+    `get_duplicate_transaction`) and not counted.
+    """
+    IncomingTransaction = django_apps.get_model(
+        'edc_sync', 'IncomingTransaction')
+    manager = IncomingTransaction.objects.using(using)
+    existing = set(str(pk) for pk in manager.filter(
+        pk__in=[record.id for record in records]).values_list('pk', flat=True))
+    last_digests = get_last_digests(
+        keys=[(record.tx_name, record.tx_pk) for record in records],
+        using=using, applied=True)
+    objs, duplicates = [], []
+    for record in records:
+        if record.id in existing:
+            continue
+        if is_duplicate(record.tx_name, record.tx_pk, record.tx_digest,
+                        record.action, last_digests):
+            duplicate_transactions_total.inc(model=record.tx_name, stage='ingest')
+            duplicates.append(get_duplicate_transaction(
+                id=record.id, tx_name=record.tx_name, tx_pk=record.tx_pk,
+                tx_digest=record.tx_digest, timestamp=record.timestamp,
+                producer=record.producer, action=record.action,
+                priority=record.priority))
+            continue
+        last_digests[(record.tx_name, str(record.tx_pk))] = None
+        objs.append(IncomingTransaction(
+            id=record.id,
+            tx=record.tx,
+            tx_name=record.tx_name,
+            tx_pk=record.tx_pk,
+            tx_digest=record.tx_digest,
+            timestamp=record.timestamp,
+            producer=record.producer,
+            action=record.action,
+            priority=record.priority,
+            is_consumed=False))
+    with transaction.atomic(using=manager.db):
+        manager.bulk_create(objs + duplicates)
+        update_received(objs, using=manager.db)
+    for producer in set(obj.producer for obj in objs):
+        bump(INCOMING, producer=producer)
+    return len(objs)
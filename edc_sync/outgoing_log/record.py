@@ -0,0 +1,79 @@
+import json
+import struct
+
+from uuid import uuid4
+
+from ..constants import PRIORITY_NORMAL
+
+
+LENGTH = struct.Struct('>I')
+META_LENGTH = struct.Struct('>H')
+
+
+class Record:
+
+    """An outgoing transaction as stored in a segment file.
+
+    The `tx` bytes are the AES encrypted json of the model instance,
+    as in OutgoingTransaction. Attribute names match
+    OutgoingTransaction so records can be given to the
+    OutgoingTransactionSerializer.
+    """
+
+    meta_fields = ['id', 'tx_name', 'tx_pk', 'tx_digest', 'timestamp',
+                   'producer', 'action', 'priority', 'using']
+
+    def __init__(self, tx=None, seq=None, **meta):
+        self.tx = bytes(tx)
+        self.seq = seq
+        for field in self.meta_fields:
+            setattr(self, field, meta.get(field))
+        self.id = self.id or str(uuid4())
+        self.priority = PRIORITY_NORMAL if self.priority is None else int(self.priority)
+        self.is_consumed_server = False
+        self.is_consumed_middleman = False
+        self.consumed_datetime = None
+        self.consumer = None
+        self.is_ignored = False
+        self.is_error = False
+        self.error = None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(seq={self.seq}, tx_name={self.tx_name!r})'
+
+    @property
+    def pk(self):
+        return self.id
+
+    @classmethod
+    def from_outgoing_transaction(cls, outgoing_transaction=None):
+        return cls(tx=outgoing_transaction.tx, **{
+            field: str(getattr(outgoing_transaction, field))
+            for field in cls.meta_fields
+            if getattr(outgoing_transaction, field) is not None})
+
+    def encode(self):
+        """Returns the record as bytes: the length of the rest of
+        the record, the length of the json metadata, the json
+        metadata and the tx bytes.
+        """
+        meta = json.dumps(
+            {field: getattr(self, field) for field in self.meta_fields}).encode()
+        return b''.join([
+            LENGTH.pack(META_LENGTH.size + len(meta) + len(self.tx)),
+            META_LENGTH.pack(len(meta)),
+            meta,
+            self.tx])
+
+    @classmethod
+    def decode(cls, buffer=None, offset=None, seq=None):
+        """Returns a tuple of (record, offset of the next record) for
+        the record at `offset` of a bytes-like buffer, e.g. an mmap.
+        """
+        length, = LENGTH.unpack_from(buffer, offset)
+        start = offset + LENGTH.size
+        meta_length, = META_LENGTH.unpack_from(buffer, start)
+        meta_start = start + META_LENGTH.size
+        meta = json.loads(bytes(buffer[meta_start:meta_start + meta_length]).decode())
+        tx = buffer[meta_start + meta_length:start + length]
+        return cls(tx=tx, seq=seq, **meta), start + length
@@ -0,0 +1,126 @@
+import mmap
+import os
+import struct
+
+from .record import Record
+
+
+OFFSET = struct.Struct('>Q')
+
+
+class Segment:
+
+    """A segment file of length-prefixed records and its index.
+
+    The index file holds the offset of each record in the segment
+    as an unsigned 64-bit integer, so the record with sequence
+    number `seq` is at index position `seq - first_seq`.
+
+    Open segments are named `<producer>-<first_seq>.log.open`, sealed
+    segments `<producer>-<first_seq>.log`. Index files are
+    `<producer>-<first_seq>.idx`. Segments written before the producer
+    was added to the name have no `<producer>-` prefix.
+    """
+
+    open_suffix = '.log.open'
+    sealed_suffix = '.log'
+    index_suffix = '.idx'
+
+    def __init__(self, path=None, first_seq=None, sealed=None, producer=None):
+        self.path = path
+        self.first_seq = first_seq
+        self.sealed = sealed
+        self.producer = producer
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(producer={self.producer}, '
+                f'first_seq={self.first_seq}, sealed={self.sealed})')
+
+    @classmethod
+    def from_filename(cls, path=None, filename=None):
+        for suffix, sealed in [(cls.open_suffix, False), (cls.sealed_suffix, True)]:
+            if filename.endswith(suffix):
+                producer, _, first_seq = filename[:-len(suffix)].rpartition('-')
+                if first_seq.isdigit():
+                    return cls(path=path, first_seq=int(first_seq),
+                               sealed=sealed, producer=producer or None)
+        return None
+
+    @property
+    def name(self):
+        if self.producer:
+            return f'{self.producer}-{self.first_seq:020d}'
+        return f'{self.first_seq:020d}'
+
+    @property
+    def filename(self):
+        suffix = self.sealed_suffix if self.sealed else self.open_suffix
+        return os.path.join(self.path, f'{self.name}{suffix}')
+
+    @property
+    def index_filename(self):
+        return os.path.join(self.path, f'{self.name}{self.index_suffix}')
+
+    @property
+    def size(self):
+        try:
+            return os.path.getsize(self.filename)
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def count(self):
+        try:
+            return os.path.getsize(self.index_filename) // OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def next_seq(self):
+        return self.first_seq + self.count
+
+    def append(self, data=None, fsync=None):
+        """Appends the encoded record and its offset, returns the
+        sequence number of the record.
+        """
+        seq = self.next_seq
+        with open(self.filename, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+            self.flush(f, fsync=fsync)
+        with open(self.index_filename, 'ab') as f:
+            f.write(OFFSET.pack(offset))
+            self.flush(f, fsync=fsync)
+        return seq
+
+    @staticmethod
+    def flush(f, fsync=None):
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
+    def seal(self):
+        filename = self.filename
+        self.sealed = True
+        os.rename(filename, self.filename)
+
+    def offsets(self):
+        with open(self.index_filename, 'rb') as f:
+            data = f.read()
+        return [offset for offset, in OFFSET.iter_unpack(data)]
+
+    def records(self, from_seq=None):
+        """Yields the records from sequence number `from_seq`,
+        reading the segment memory-mapped.
+        """
+        offsets = self.offsets()
+        position = max((from_seq or self.first_seq) - self.first_seq, 0)
+        if position >= len(offsets):
+            return
+        with open(self.filename, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                for index in range(position, len(offsets)):
+                    record, _ = Record.decode(
+                        buffer=buffer, offset=offsets[index],
+                        seq=self.first_seq + index)
+                    yield record
@@ -16,3 +16,45 @@ def datetime_to_date_parser(json_text, model=None, field=None):
                 json_data[0]['fields'][field] = fields[field][:10]
                 json_text = json.dumps(json_data, cls=DjangoJSONEncoder)
     return json_text
+
+
+def datetime_to_date(value):
+    """Returns the date part of a serialized datetime value.
+    """
+    return value[:10] if value else value
+
+
+class FieldParser:
+
+    """A parser for one field of one model.
+
+    Called with the already decoded `fields` dict of a serialized
+    model instance and updates the value of `field` in place.
+
+    Declare on the AppConfig, for example:
+
+        custom_field_parsers = [
+            FieldParser(model='my_app.mymodel', field='f2', func=datetime_to_date)]
+    """
+
+    def __init__(self, model=None, field=None, func=None):
+        self.model = model
+        self.field = field
+        self.func = func
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(model={self.model!r}, '
+                f'field={self.field!r}, func={self.func.__name__})')
+
+    def __call__(self, fields):
+        if self.field in fields:
+            fields[self.field] = self.func(fields[self.field])
+
+
+def get_parsers_by_model(field_parsers=None):
+    """Returns a dispatch table of {label_lower: [FieldParser, ...]}.
+    """
+    parsers_by_model = {}
+    for field_parser in field_parsers or []:
+        parsers_by_model.setdefault(field_parser.model, []).append(field_parser)
+    return parsers_by_model
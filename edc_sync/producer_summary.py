@@ -0,0 +1,157 @@
+import threading
+
+from contextlib import contextmanager
+
+from django.apps import apps as django_apps
+from django.db.models import Count, F, Max, Min, Q
+from edc_base.utils import get_utcnow
+
+
+_received = threading.local()
+
+
+def get_summary_model():
+    return django_apps.get_model('edc_sync', 'ProducerSyncSummary')
+
+
+def get_manager(using=None):
+    manager = get_summary_model().objects
+    return manager.using(using) if using else manager
+
+
+def get_oldest_pending_timestamp(producer=None, using=None):
+    """Returns the timestamp of the oldest unconsumed incoming
+    transaction of a producer or None.
+    """
+    IncomingTransaction = django_apps.get_model(
+        'edc_sync', 'IncomingTransaction')
+    manager = IncomingTransaction.objects.using(using) if using else IncomingTransaction.objects
+    return manager.filter(producer=producer, is_consumed=False).order_by(
+        'timestamp').values_list('timestamp', flat=True).first()
+
+
+def update_received(transactions=None, using=None):
+    """Updates the summaries for incoming transactions just saved.
+
+    `transactions` is a list of IncomingTransaction instances.
+    """
+    groups = {}
+    for transaction in transactions or []:
+        groups.setdefault(transaction.producer, []).append(transaction.timestamp)
+    manager = get_manager(using)
+    for producer, timestamps in groups.items():
+        oldest = min(timestamps)
+        manager.get_or_create(producer=producer)
+        manager.filter(producer=producer).update(
+            pending_count=F('pending_count') + len(timestamps),
+            last_received_datetime=get_utcnow())
+        manager.filter(
+            Q(oldest_pending_timestamp__isnull=True) | Q(oldest_pending_timestamp__gt=oldest),
+            producer=producer).update(oldest_pending_timestamp=oldest)
+
+
+def received(transaction=None, using=None):
+    """Updates the summary for a new pending incoming transaction,
+    see signal `update_received_on_save`, or defers the update to the
+    end of an enclosing `collect_received` block.
+    """
+    collected = getattr(_received, 'transactions', None)
+    if collected is None:
+        update_received([transaction], using=using)
+    else:
+        collected.setdefault(using, []).append(transaction)
+
+
+@contextmanager
+def collect_received():
+    """Collects the incoming transactions saved in the block and
+    updates the summaries once per database and producer at the end,
+    e.g. for a batch received in one request.
+    """
+    _received.transactions = {}
+    try:
+        yield
+        collected = _received.transactions
+    finally:
+        _received.transactions = None
+    for using, transactions in collected.items():
+        update_received(transactions, using=using)
+
+
+class SummaryUpdater:
+
+    """Collects the incoming transactions consumed or failed during
+    a deserialize run and updates the summaries on `save`.
+
+    Call `consumed` and `error` before the transaction's `is_error` is
+    changed: a consumed transaction that was in error, e.g. retried,
+    is taken off the error count and a transaction already in error
+    is not counted again.
+
+    Usage:
+        summary = SummaryUpdater()
+        summary.consumed(transaction)
+        summary.error(transaction)
+        summary.save()
+    """
+
+    def __init__(self):
+        self.consumed_counts = {}
+        self.error_counts = {}
+
+    def consumed(self, transaction=None):
+        key = (transaction._state.db, transaction.producer)
+        self.consumed_counts[key] = self.consumed_counts.get(key, 0) + 1
+        if transaction.is_error:
+            self.error_counts[key] = self.error_counts.get(key, 0) - 1
+
+    def error(self, transaction=None):
+        if not transaction.is_error:
+            key = (transaction._state.db, transaction.producer)
+            self.error_counts[key] = self.error_counts.get(key, 0) + 1
+
+    def save(self):
+        for key in set(self.consumed_counts) | set(self.error_counts):
+            using, producer = key
+            manager = get_manager(using)
+            manager.get_or_create(producer=producer)
+            consumed = self.consumed_counts.get(key, 0)
+            updates = dict(error_count=F('error_count') + self.error_counts.get(key, 0))
+            if consumed:
+                updates.update(
+                    pending_count=F('pending_count') - consumed,
+                    oldest_pending_timestamp=get_oldest_pending_timestamp(
+                        producer=producer, using=using),
+                    last_applied_datetime=get_utcnow())
+            manager.filter(producer=producer).update(**updates)
+        self.consumed_counts = {}
+        self.error_counts = {}
+
+
+def rebuild(using=None):
+    """Rebuilds the summaries from the incoming transactions, e.g.
+    after the transactions were changed outside of edc_sync, and
+    returns the number of producers.
+    """
+    IncomingTransaction = django_apps.get_model(
+        'edc_sync', 'IncomingTransaction')
+    queryset = IncomingTransaction.objects.using(using) if using else IncomingTransaction.objects
+    manager = get_manager(using)
+    rows = {row['producer']: row for row in queryset.values('producer').annotate(
+        received=Max('created'), applied=Max('consumed_datetime'))}
+    pending = {row['producer']: row for row in queryset.filter(
+        is_consumed=False).values('producer').annotate(
+            pending=Count('id'), oldest=Min('timestamp'))}
+    errors = {row['producer']: row['errors'] for row in queryset.filter(
+        is_error=True, is_consumed=False).values('producer').annotate(errors=Count('id'))}
+    manager.exclude(producer__in=list(rows)).delete()
+    for producer, row in rows.items():
+        manager.update_or_create(
+            producer=producer,
+            defaults=dict(
+                pending_count=pending.get(producer, {}).get('pending', 0),
+                oldest_pending_timestamp=pending.get(producer, {}).get('oldest'),
+                last_received_datetime=row['received'],
+                last_applied_datetime=row['applied'],
+                error_count=errors.get(producer, 0)))
+    return len(rows)
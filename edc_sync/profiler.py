@@ -0,0 +1,164 @@
+import cProfile
+import sys
+import tracemalloc
+
+from contextlib import contextmanager, ExitStack
+from time import perf_counter
+
+from django.db import connections
+
+
+class Stats:
+
+    def __init__(self):
+        self.seconds = 0
+        self.queries = 0
+        self.memory = 0
+        self.count = 0
+
+    def add(self, seconds=None, queries=None, memory=None):
+        self.seconds += seconds
+        self.queries += queries
+        self.memory += memory
+        self.count += 1
+
+    def merge(self, other):
+        self.seconds += other.seconds
+        self.queries += other.queries
+        self.memory += other.memory
+        self.count += other.count
+
+
+class DeserializeProfiler:
+
+    """Profiles a deserialize run by stage and tx_name.
+
+    Records wall time and query count per stage and per tx_name,
+    reports live rows/sec progress and optionally dumps a cProfile
+    and/or a tracemalloc snapshot.
+
+    Allocated memory (net, from tracemalloc) is only recorded if
+    `trace_memory` or `tracemalloc_path`, since tracing slows every
+    stage and skews the wall times.
+
+    Usage:
+        with DeserializeProfiler() as profiler:
+            tx_deserializer = TransactionDeserializer(profiler=profiler)
+            ...
+        print(profiler.summary())
+    """
+
+    progress_interval = 1.0
+
+    def __init__(self, stdout=None, cprofile_path=None, tracemalloc_path=None,
+                 top=None, trace_memory=None):
+        self.stdout = stdout or sys.stdout
+        self.cprofile_path = cprofile_path
+        self.tracemalloc_path = tracemalloc_path
+        self.trace_memory = bool(trace_memory or tracemalloc_path)
+        self.top = top or 20
+        self.stats = {}
+        self.queries = 0
+        self.rows = 0
+        self.start = None
+        self.elapsed = None
+        self.last_progress = None
+        self.cprofile = None
+        self.exit_stack = None
+
+    def __enter__(self):
+        self.exit_stack = ExitStack()
+        for connection in connections.all():
+            self.exit_stack.enter_context(
+                connection.execute_wrapper(self.count_query))
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.exit_stack.callback(tracemalloc.stop)
+        if self.cprofile_path:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.start = perf_counter()
+        self.last_progress = self.start
+        return self
+
+    def __exit__(self, *args):
+        self.elapsed = perf_counter() - self.start
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_path)
+        if self.tracemalloc_path:
+            tracemalloc.take_snapshot().dump(self.tracemalloc_path)
+        self.exit_stack.close()
+        if self.rows:
+            self.write('\n')
+
+    def write(self, text):
+        try:
+            self.stdout.write(text, ending='')
+        except TypeError:
+            self.stdout.write(text)
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def stage(self, name=None, tx_name=None):
+        start = perf_counter()
+        queries = self.queries
+        memory = self.traced_memory()
+        try:
+            yield
+        finally:
+            self.stats.setdefault((name, tx_name), Stats()).add(
+                seconds=perf_counter() - start,
+                queries=self.queries - queries,
+                memory=self.traced_memory() - memory)
+
+    def traced_memory(self):
+        return tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+
+    def progress(self, rows=None):
+        """Writes rows and rows/sec at most once per `progress_interval`.
+        """
+        self.rows = rows
+        now = perf_counter()
+        if now - self.last_progress >= self.progress_interval:
+            self.last_progress = now
+            self.write(
+                f'\r  {rows} rows, {rows / (now - self.start):.1f} rows/sec ')
+            self.stdout.flush()
+
+    def by_stage(self):
+        totals = {}
+        for (name, _), stats in self.stats.items():
+            totals.setdefault(name, Stats()).merge(stats)
+        return totals
+
+    def by_tx_name(self):
+        totals = {}
+        for (_, tx_name), stats in self.stats.items():
+            totals.setdefault(tx_name, Stats()).merge(stats)
+        return totals
+
+    def summary(self):
+        """Returns the ranked summary as text.
+        """
+        rate = self.rows / self.elapsed if self.elapsed else 0
+        lines = [
+            f'Deserialized {self.rows} rows in {self.elapsed:.2f}s '
+            f'({rate:.1f} rows/sec), {self.queries} queries.', '']
+        row_format = '{:<50} {:>10} {:>8} {:>10} {:>12}'
+        for title, totals in [('stage', self.by_stage()),
+                              ('tx_name', self.by_tx_name())]:
+            lines.append(row_format.format(
+                title, 'seconds', 'calls', 'queries', 'memory (KB)'))
+            ranked = sorted(
+                totals.items(), key=lambda item: item[1].seconds, reverse=True)
+            for key, stats in ranked[:self.top]:
+                lines.append(row_format.format(
+                    str(key), f'{stats.seconds:.3f}', stats.count,
+                    stats.queries,
+                    f'{stats.memory / 1024:.1f}' if self.trace_memory else '-'))
+            lines.append('')
+        return '\n'.join(lines)
@@ -0,0 +1,72 @@
+from time import monotonic, time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'edc_sync.progress'
+RUNNING = 'running'
+FINISHED = 'finished'
+
+
+def get_key(job=None):
+    return f'{KEY_PREFIX}.{job}'
+
+
+def get_progress(job=None):
+    """Returns the last progress published for a job, or None.
+    """
+    return cache.get(get_key(job))
+
+
+class ProgressReporter:
+
+    """Publishes per-host counts, bytes and rates of a running job,
+    e.g. a push or a deserialize run, to the cache for the progress
+    stream (see ProgressStreamView).
+
+    Writes to the cache at most once per `interval` seconds.
+
+    Usage:
+        progress = ProgressReporter(job='deserialize')
+        progress.add(host='bcpp010-default', count=1, bytes=1024)
+        progress.finish()
+    """
+
+    interval = 1.0
+    timeout = 60 * 60
+
+    def __init__(self, job=None, interval=None):
+        self.job = job
+        self.interval = self.interval if interval is None else interval
+        self.started = time()
+        self.start = monotonic()
+        self.hosts = {}
+        self.status = RUNNING
+        self.last_published = None
+        self.publish()
+
+    def add(self, host=None, count=None, bytes=None):
+        stats = self.hosts.setdefault(host, dict(count=0, bytes=0))
+        stats['count'] += count or 0
+        stats['bytes'] += bytes or 0
+        if monotonic() - self.last_published >= self.interval:
+            self.publish()
+
+    def finish(self):
+        self.status = FINISHED
+        self.publish()
+
+    def as_dict(self):
+        elapsed = monotonic() - self.start
+        hosts = {}
+        for host, stats in self.hosts.items():
+            hosts[host] = dict(
+                stats,
+                count_per_second=stats['count'] / elapsed if elapsed else 0,
+                bytes_per_second=stats['bytes'] / elapsed if elapsed else 0)
+        return dict(
+            job=self.job, status=self.status, started=self.started,
+            elapsed=elapsed, hosts=hosts)
+
+    def publish(self):
+        self.last_published = monotonic()
+        cache.set(get_key(self.job), self.as_dict(), timeout=self.timeout)
@@ -0,0 +1,32 @@
+from django.core.cache import cache
+
+OUTGOING = 'outgoing'
+INCOMING = 'incoming'
+
+KEY_PREFIX = 'edc_sync.queue_version'
+
+
+def get_key(kind=None, producer=None):
+    return f'{KEY_PREFIX}.{kind}.{producer}' if producer else f'{KEY_PREFIX}.{kind}'
+
+
+def get_version(kind=None, producer=None):
+    """Returns the version of the queue of transactions of `kind`,
+    of a producer if given, that changes whenever the queue changes.
+    """
+    return cache.get(get_key(kind, producer), 0)
+
+
+def bump(kind=None, producer=None):
+    """Increments the version of the queue and of the queue of
+    the producer.
+    """
+    keys = [get_key(kind)]
+    if producer:
+        keys.append(get_key(kind, producer))
+    for key in keys:
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, timeout=None)
@@ -0,0 +1,171 @@
+import hashlib
+import socket
+
+from django.apps import apps as django_apps
+from django.db.models import Q
+
+from .outgoing_log import outgoing_transactions_or_raise
+
+
+def get_key(timestamp=None, tx_pk=None):
+    return f'{timestamp}:{tx_pk}'
+
+
+class MerkleTree:
+
+    """A hash tree over the transactions of one producer.
+
+    Levels are prefixes of the transaction timestamp ('%Y%m%d%H%M%S%f'):
+    the root (''), year, month, day and hour. The leaves of an hour
+    bucket are the transaction keys, 'timestamp:tx_pk', which are the
+    same on producer and server.
+    """
+
+    prefix_lengths = (0, 4, 6, 8, 10)
+
+    def __init__(self, keys=None):
+        """`keys` is an iterable of (timestamp, tx_pk).
+        """
+        self.leaf_length = self.prefix_lengths[-1]
+        self.buckets = {}
+        for timestamp, tx_pk in keys or []:
+            self.buckets.setdefault(
+                timestamp[:self.leaf_length], []).append(get_key(timestamp, tx_pk))
+        for bucket in self.buckets.values():
+            bucket.sort()
+        self.hashes = {}
+        self.tree = {}
+        for prefix, bucket in self.buckets.items():
+            self.hashes[prefix] = self.digest(bucket)
+        for length in reversed(self.prefix_lengths[:-1]):
+            for prefix in [p for p in self.hashes if len(p) == self.next_length(length)]:
+                self.tree.setdefault(prefix[:length], {}).update(
+                    {prefix: self.hashes[prefix]})
+            for parent, children in self.tree.items():
+                if len(parent) == length:
+                    self.hashes[parent] = self.digest(
+                        [f'{child}:{children[child]}' for child in sorted(children)])
+
+    @classmethod
+    def from_queryset(cls, queryset=None):
+        return cls(keys=(
+            (timestamp, str(tx_pk)) for timestamp, tx_pk in
+            queryset.values_list('timestamp', 'tx_pk').iterator()))
+
+    @staticmethod
+    def digest(lines):
+        return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+    def next_length(self, length):
+        return self.prefix_lengths[self.prefix_lengths.index(length) + 1]
+
+    def is_leaf(self, prefix):
+        return len(prefix) == self.leaf_length
+
+    def children(self, prefix=None):
+        """Returns a dict of {child prefix: hash} or, for an hour
+        bucket, the list of transaction keys.
+        """
+        prefix = prefix or ''
+        if self.is_leaf(prefix):
+            return self.buckets.get(prefix, [])
+        return self.tree.get(prefix, {})
+
+
+def get_server_tree(producer=None, prefixes=None):
+    """Returns the tree of the incoming transactions of a producer,
+    limited to the given prefixes.
+    """
+    IncomingTransaction = django_apps.get_model('edc_sync', 'IncomingTransaction')
+    queryset = IncomingTransaction.objects.filter(producer=producer)
+    prefixes = [p for p in prefixes or [] if p]
+    if prefixes:
+        q = Q()
+        for prefix in prefixes:
+            q |= Q(timestamp__startswith=prefix)
+        queryset = queryset.filter(q)
+    return MerkleTree.from_queryset(queryset)
+
+
+class Reconciler:
+
+    """Compares the producer's outgoing transactions with the
+    server's incoming transactions top-down, one round trip per
+    tree level, and resends only those missing on the server.
+
+    The server's tree includes the duplicates it accepted but did not
+    apply, see `get_duplicate_transaction`.
+
+    Usage:
+        pusher = TransactionPusher.from_host(host=server, token='...')
+        reconciler = Reconciler.from_host(host=server, pusher=pusher)
+        reconciler.resend()
+    """
+
+    url_template = 'http://{hostname}:{port}/edc_sync/api/reconcile/'
+
+    def __init__(self, url=None, pusher=None, producer=None):
+        OutgoingTransaction = django_apps.get_model(
+            'edc_sync', 'OutgoingTransaction')
+        outgoing_transactions_or_raise()
+        self.url = url
+        self.pusher = pusher
+        self.producer = producer or self.get_producer()
+        self.queryset = OutgoingTransaction.objects.using(
+            self.pusher.using).filter(producer=self.producer)
+        self.round_trips = 0
+
+    @classmethod
+    def from_host(cls, host=None, **kwargs):
+        return cls(url=cls.url_template.format(
+            hostname=host.hostname, port=host.port), **kwargs)
+
+    def get_producer(self):
+        return f'{socket.gethostname()}-{self.pusher.using}'
+
+    def get_remote_children(self, prefixes=None):
+        self.round_trips += 1
+        response = self.pusher.session.get(
+            self.url, params={'producer': self.producer, 'prefix': prefixes},
+            timeout=self.pusher.timeout)
+        response.raise_for_status()
+        return response.json().get('nodes', {})
+
+    def missing(self):
+        """Returns a list of transaction keys missing on the server.
+        """
+        tree = MerkleTree.from_queryset(self.queryset)
+        missing = []
+        frontier = ['']
+        while frontier:
+            remote = self.get_remote_children(frontier)
+            next_frontier = []
+            for prefix in frontier:
+                if tree.is_leaf(prefix):
+                    missing.extend(
+                        set(tree.children(prefix)) - set(remote.get(prefix) or []))
+                else:
+                    remote_children = remote.get(prefix) or {}
+                    for child, digest in tree.children(prefix).items():
+                        if remote_children.get(child) != digest:
+                            next_frontier.append(child)
+            frontier = next_frontier
+        return sorted(missing)
+
+    def resend(self):
+        """Resends the transactions missing on the server and returns
+        the number sent.
+        """
+        missing = self.missing()
+        sent = 0
+        index = 0
+        while index < len(missing):
+            keys = set(missing[index:index + self.pusher.batch_size])
+            index += len(keys)
+            batch = [obj for obj in self.queryset.filter(
+                tx_pk__in=[key.split(':')[1] for key in keys])
+                if get_key(obj.timestamp, obj.tx_pk) in keys]
+            accepted = self.pusher.send(batch)
+            self.pusher.consume(accepted)
+            sent += len(accepted)
+        return sent
@@ -0,0 +1,65 @@
+from django.conf import settings
+
+
+TRANSACTION_MODELS = [
+    'outgoingtransaction', 'incomingtransaction', 'producersyncsummary',
+    'snapshotposition']
+
+
+def get_transaction_databases():
+    """Returns the settings dictionary of {clinical alias: transaction
+    log alias}, e.g.
+
+        EDC_SYNC_TRANSACTION_DATABASES = {'default': 'transactions'}
+
+    Aliases not in the dictionary keep their transactions in the
+    same database.
+    """
+    return getattr(settings, 'EDC_SYNC_TRANSACTION_DATABASES', None) or {}
+
+
+def get_transaction_using(using=None):
+    """Returns the alias of the transaction log for the given
+    clinical alias.
+    """
+    using = using or 'default'
+    return get_transaction_databases().get(using, using)
+
+
+def is_transaction_model(app_label=None, model_name=None):
+    return app_label == 'edc_sync' and model_name in TRANSACTION_MODELS
+
+
+class TransactionRouter:
+
+    """A database router that puts OutgoingTransaction,
+    IncomingTransaction, ProducerSyncSummary and SnapshotPosition in
+    the alias of the transaction log, see
+    EDC_SYNC_TRANSACTION_DATABASES.
+
+    Add to settings:
+        DATABASE_ROUTERS = ['edc_sync.routers.TransactionRouter']
+
+    The transaction log aliases also get the `sites` tables since
+    the transaction models refer to Site.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_transaction_model(model._meta.app_label, model._meta.model_name):
+            return get_transaction_databases().get('default')
+        return None
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        databases = get_transaction_databases()
+        log_only = set(databases.values()) - set(databases)
+        if is_transaction_model(app_label, model_name):
+            return db in databases.values() or db not in databases
+        elif db in log_only:
+            return app_label == 'sites'
+        return None
@@ -4,6 +4,7 @@ from edc_rest.binary_field import BinaryField
 from edc_rest.serializers import BaseModelSerializerMixin
 
 from .choices import ACTIONS
+from .constants import PRIORITY_NORMAL
 from .models import IncomingTransaction, OutgoingTransaction
 
 
@@ -18,6 +19,11 @@ class BaseTransactionSerializer(BaseModelSerializerMixin, serializers.Serializer
 
     tx_pk = serializers.UUIDField()
 
+    tx_digest = serializers.CharField(
+        max_length=64,
+        allow_null=True,
+        required=False)
+
     producer = serializers.CharField(max_length=200)
 
     action = serializers.ChoiceField(
@@ -26,6 +32,9 @@ class BaseTransactionSerializer(BaseModelSerializerMixin, serializers.Serializer
     timestamp = serializers.CharField(
         max_length=50)
 
+    priority = serializers.IntegerField(
+        default=PRIORITY_NORMAL)
+
     consumed_datetime = serializers.DateTimeField(
         allow_null=True,
         default=None)
@@ -120,6 +120,21 @@ DATABASES = {
     },
 }
 
+DATABASE_ROUTERS = ['edc_sync.routers.TransactionRouter']
+
+# excludes the benchmark tests unless run with --tag=benchmark
+TEST_RUNNER = 'edc_sync.tests.runner.TestRunner'
+
+# e.g. {'default': 'transactions'} to keep Outgoing/IncomingTransaction
+# in their own database
+EDC_SYNC_TRANSACTION_DATABASES = {}
+
+# see edc_sync.throttling.DEFAULT_INGEST_LIMITS
+EDC_SYNC_INGEST_LIMITS = {}
+
+# load the models in edc_sync.tests.models, for this test project only
+EDC_SYNC_TEST_MODELS = True
+
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
 
@@ -198,6 +213,16 @@ REST_FRAMEWORK = {
 }
 LOGGING = LOGGING
 
+# The ingest limits, queue versions and progress are kept in the cache.
+# With more than one server process the cache must be shared, e.g.
+# 'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+# 'LOCATION': '127.0.0.1:11211'. The local memory cache is per process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 
 EDC_SYNC_SERVER_IP = None
 EDC_SYNC_FILES_USER = None
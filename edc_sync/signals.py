@@ -1,8 +1,13 @@
+from django.db.backends.signals import connection_created
 from django.db.models.signals import post_save, m2m_changed, post_delete
 from django.dispatch import receiver
 from edc_base.site_models import SiteModelNotRegistered
 from rest_framework.authtoken.models import Token
 
+from .models import IncomingTransaction, OutgoingTransaction
+from .producer_summary import received
+from .queue_version import bump, INCOMING, OUTGOING
+from .routers import get_transaction_databases
 from .site_sync_models import site_sync_models
 
 
@@ -14,7 +19,40 @@ def create_auth_token(sender, instance, raw, created, **kwargs):
             sender.objects.create(user=instance)
 
 
-@receiver(m2m_changed, weak=False, dispatch_uid='serialize_m2m_on_save')
+@receiver(post_save, sender=OutgoingTransaction, dispatch_uid='bump_outgoing_on_save')
+@receiver(post_delete, sender=OutgoingTransaction, dispatch_uid='bump_outgoing_on_delete')
+def bump_outgoing_queue_version(sender, instance, **kwargs):
+    bump(OUTGOING, producer=instance.producer)
+
+
+@receiver(post_save, sender=IncomingTransaction, dispatch_uid='bump_incoming_on_save')
+@receiver(post_delete, sender=IncomingTransaction, dispatch_uid='bump_incoming_on_delete')
+def bump_incoming_queue_version(sender, instance, **kwargs):
+    bump(INCOMING, producer=instance.producer)
+
+
+@receiver(post_save, sender=IncomingTransaction, dispatch_uid='update_received_on_save')
+def update_received_on_save(sender, instance, raw, created, using, **kwargs):
+    """Counts a new pending incoming transaction in the producer's
+    summary, however it was received, e.g. by edc_sync_files.
+    """
+    if created and not raw and not instance.is_consumed and not instance.is_ignored:
+        received(instance, using=using)
+
+
+@receiver(connection_created, dispatch_uid='enable_transaction_log_wal')
+def enable_transaction_log_wal(sender, connection, **kwargs):
+    """Puts an SQLite transaction log alias in WAL mode so appends
+    do not block readers.
+    """
+    databases = get_transaction_databases()
+    log_only = set(databases.values()) - set(databases)
+    if connection.vendor == 'sqlite' and connection.alias in log_only:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+
+
 def serialize_m2m_on_save(sender, action, instance, using, **kwargs):
     """ Part of the serialize transaction process that ensures m2m are
     serialized correctly.
@@ -28,7 +66,6 @@ def serialize_m2m_on_save(sender, action, instance, using, **kwargs):
             wrapped_instance.to_outgoing_transaction(using, created=True)
 
 
-@receiver(post_save, weak=False, dispatch_uid='serialize_on_save')
 def serialize_on_save(sender, instance, raw, created, using, **kwargs):
     """ Serialize the model instance as an OutgoingTransaction.
     """
@@ -41,7 +78,6 @@ def serialize_on_save(sender, instance, raw, created, using, **kwargs):
             wrapped_instance.to_outgoing_transaction(using, created=created)
 
 
-@receiver(post_delete, weak=False, dispatch_uid="serialize_on_post_delete")
 def serialize_on_post_delete(sender, instance, using, **kwargs):
     """Creates a serialized OutgoingTransaction when
     a model instance is deleted.
@@ -53,3 +89,31 @@ def serialize_on_post_delete(sender, instance, using, **kwargs):
     else:
         wrapped_instance.to_outgoing_transaction(
             using, created=False, deleted=True)
+
+
+def connect_sync_receivers(model=None):
+    """Connects the serialize receivers to a registered model, its
+    historical model and the through models of its m2m fields.
+
+    Receivers are connected per sender so saves of models that are
+    not registered, e.g. auth or sessions, do not call them. Connecting
+    twice is a no-op (dispatch_uid).
+    """
+    senders = [model]
+    try:
+        senders.append(model.history.model)
+    except AttributeError:
+        pass
+    for sender in senders:
+        label_lower = sender._meta.label_lower
+        post_save.connect(
+            serialize_on_save, sender=sender, weak=False,
+            dispatch_uid=f'serialize_on_save.{label_lower}')
+        post_delete.connect(
+            serialize_on_post_delete, sender=sender, weak=False,
+            dispatch_uid=f'serialize_on_post_delete.{label_lower}')
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        m2m_changed.connect(
+            serialize_m2m_on_save, sender=through, weak=False,
+            dispatch_uid=f'serialize_m2m_on_save.{through._meta.label_lower}')
@@ -1,5 +1,14 @@
+import sys
+
+from importlib import import_module
+from importlib.util import find_spec
+
+from django.apps import apps as django_apps
 from edc_base.site_models import SiteModels
 
+from .constants import PRIORITY_LOW, PRIORITY_NORMAL
+from .dependency_graph import get_parent_models, get_registered_models, sort_by_dependency
+
 
 class SiteSyncModelError(Exception):
     pass
@@ -13,10 +22,107 @@ class SiteSyncModels(SiteModels):
     module_name = 'sync_models'
     register_historical = True
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.derived_history_models = set()
+        self.declared_priorities = {}
+        self._priorities = None
+
     @property
     def wrapper_cls(self):
         from .sync_model import SyncModel
         return SyncModel
 
+    def register(self, models=None, wrapper_cls=None, derive_history=None,
+                 priority=None):
+        """Registers models and connects the serialize receivers
+        to each registered model.
+
+        If `derive_history`, producers do not send the history rows
+        of inserts and updates of these models; the server derives
+        them when applying (see `transaction.derived_history`).
+
+        `priority` is the lane of the transactions of these models,
+        e.g. PRIORITY_HIGH, see `get_priority`.
+        """
+        if not self.registry:
+            self.derived_history_models = set()
+            self.declared_priorities = {}
+        registered = set(self.registry)
+        super().register(models=models, wrapper_cls=wrapper_cls)
+        if derive_history:
+            self.derived_history_models.update(
+                model.lower() for model in models or [])
+        if priority is not None:
+            self.declared_priorities.update(
+                {model.lower(): priority for model in models or []})
+        self._priorities = None
+        from .signals import connect_sync_receivers
+        for model in get_registered_models(
+                [label for label in self.registry if label not in registered]):
+            connect_sync_receivers(model)
+
+    def autodiscover(self, module_name=None):
+        """Imports the `sync_models` module of each installed app
+        that has one.
+
+        Apps without the module are skipped without attempting the
+        import. Nothing is written to stdout.
+        """
+        module_name = module_name or self.module_name
+        for app_config in django_apps.get_app_configs():
+            name = f'{app_config.name}.{module_name}'
+            if name in sys.modules:
+                continue
+            try:
+                spec = find_spec(name)
+            except ImportError:
+                spec = None
+            if spec:
+                import_module(name)
+
+    def derives_history(self, model=None):
+        """Returns True if the history of `model`, or of the model
+        of historical model `model`, is derived by the server.
+        """
+        model = getattr(model, 'instance_type', model)
+        return model._meta.label_lower in self.derived_history_models
+
+    def get_priorities(self, models=None):
+        """Returns a dictionary of {label_lower: priority} for the
+        registered models.
+
+        Models default to PRIORITY_NORMAL and historical models to
+        PRIORITY_LOW. A model is raised to the highest priority of
+        the models that refer to it so that a lane never depends on
+        a lower lane.
+        """
+        priorities = {}
+        for model in models:
+            default = PRIORITY_LOW if hasattr(model, 'instance_type') else PRIORITY_NORMAL
+            priorities[model] = self.declared_priorities.get(
+                model._meta.label_lower, default)
+        for model in reversed(sort_by_dependency(models)):
+            for parent in get_parent_models(model):
+                if parent in priorities:
+                    priorities[parent] = max(priorities[parent], priorities[model])
+        return {model._meta.label_lower: priority for model, priority in priorities.items()}
+
+    @property
+    def priorities(self):
+        """Returns the priorities of the registered models, computed
+        on first use after a registration.
+        """
+        if self._priorities is None:
+            self._priorities = self.get_priorities(
+                get_registered_models(self.registry))
+        return self._priorities
+
+    def get_priority(self, tx_name=None):
+        """Returns the lane of the transactions of a model given
+        its label_lower. Higher lanes are drained first.
+        """
+        return self.priorities.get(tx_name, PRIORITY_NORMAL)
+
 
 site_sync_models = SiteSyncModels()
@@ -188,15 +188,29 @@ function getNextPendingFile() {
 	});
 }
 
+var pollingHosts = {};
+
 function updateFromHost( host ) {
-	var url = host + '/edc_sync/api/transaction-count/';
+	/* Shows the pending transaction count of host and keeps it current,
+	polling host once however often this is called. */
+	if ( !pollingHosts[ host ] ) {
+		pollingHosts[ host ] = true;
+		pollHost( host );
+	}
+}
+
+function pollHost( host, etag ) {
+	/* Once the count is shown, the request sends its ETag and waits up to
+	25 seconds on host for the queue to change (see QueueVersionMixin). */
+	var url = host + '/edc_sync/api/transaction-count/?wait=25';
 	ajTransactionCount = $.ajax({
 		url: url,
 		type: 'GET',
 		dataType: 'json',
 		processData: false,
+		headers: etag ? { 'If-None-Match': etag } : {},
 	});
-	ajTransactionCount.done( function ( data ) {
+	ajTransactionCount.done( function ( data, textStatus, jqXHR ) {
 		if ( data != null ) {
 			$( '#id-pending-transactions').text(' ' + data.outgoingtransaction_count);
 			$( '#id-pending-transactions-middleman').text(' '+ data.outgoingtransaction_count);
@@ -206,7 +220,12 @@ function updateFromHost( host ) {
 			} else {
 				$( '#btn-sync' ).removeClass( 'btn-warning' ).addClass( 'btn-default' );
 			}
-		} 
+		}
+		var nextEtag = jqXHR.getResponseHeader( 'ETag' ) || etag;
+		setTimeout( function() { pollHost( host, nextEtag ); }, 1000 );
+	});
+	ajTransactionCount.fail( function () {
+		pollingHosts[ host ] = false;
 	});
 }
 
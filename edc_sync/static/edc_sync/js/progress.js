@@ -0,0 +1,70 @@
+function edcSyncProgressReady(jobs, progressUrl) {
+	/* Show the counts and rates per host of each job (see ProgressStreamView).
+
+	Polls the JSON progress of all jobs and, while a job is running, opens
+	one progress stream for all of them. The stream is closed as soon as no
+	job is running, then polling resumes. */
+	var jobs = JSON.parse( jobs );
+	var query = $.param( { job: jobs }, true );
+	var idleInterval = 10000;
+	$.each( jobs, function( index, job ) {
+		$( '#id-nav-pill-progress' ).append(
+			'<li id="' + getProgressId( job ) + '" class="list-group-item"><strong>' + job +
+			'</strong> <span class="badge">waiting</span><ul class="list-unstyled"></ul></li>' );
+	});
+	if ( !jobs.length ) {
+		return;
+	};
+
+	function poll() {
+		$.getJSON( progressUrl + '?format=json&' + query ).done( function( data ) {
+			if ( updateProgress( data ) && typeof EventSource !== 'undefined' ) {
+				stream();
+			} else {
+				setTimeout( poll, idleInterval );
+			};
+		}).fail( function() {
+			setTimeout( poll, idleInterval );
+		});
+	}
+
+	function stream() {
+		var source = new EventSource( progressUrl + '?' + query );
+		var close = function() {
+			source.close();
+			setTimeout( poll, idleInterval );
+		};
+		source.onmessage = function( e ) {
+			updateProgress( JSON.parse( e.data ) );
+		};
+		source.addEventListener( 'idle', close );
+		source.onerror = close;
+	}
+
+	poll();
+}
+
+function getProgressId( job ) {
+	return 'id-progress-' + job.replace( /[^a-zA-Z0-9]/g, '-' );
+}
+
+function updateProgress( data ) {
+	/* Updates the jobs in data, {job: progress}, and returns true if
+	any is running. */
+	var running = false;
+	$.each( data, function( job, progress ) {
+		if ( !progress ) {
+			return;
+		};
+		var jobId = getProgressId( job );
+		running = running || progress.status === 'running';
+		$( '#' + jobId + ' .badge' ).text( progress.status );
+		var hosts = $( '#' + jobId + ' ul' ).empty();
+		$.each( progress.hosts, function( host, stats ) {
+			hosts.append( $( '<li></li>' ).text(
+				host + ': ' + stats.count + ' (' + stats.count_per_second.toFixed( 1 ) + '/s, ' +
+				( stats.bytes_per_second / 1024 ).toFixed( 1 ) + ' KB/s)' ) );
+		});
+	});
+	return running;
+}
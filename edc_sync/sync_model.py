@@ -8,7 +8,11 @@ from django.db.models.fields import UUIDField
 from django_crypto_fields.constants import LOCAL_MODE
 
 from .constants import INSERT, UPDATE, DELETE
-from .transaction import serialize
+from .metrics import serialize_seconds, encrypt_seconds, outgoing_transactions_total
+from .metrics import duplicate_transactions_total
+from .outgoing_log import get_outgoing_log
+from .site_sync_models import site_sync_models
+from .transaction import serialize, get_digest
 
 
 class SyncNaturalKeyMissing(Exception):
@@ -33,12 +37,18 @@ class SyncModel:
     edc_sync.signals for synchronization.
     """
 
+    # fields that change on every save and are not part of the digest
+    digest_exclude_fields = [
+        'modified', 'user_modified', 'hostname_modified', 'device_modified',
+        'revision', 'history_date']
+
     def __init__(self, instance):
         try:
             self.is_serialized = settings.ALLOW_MODEL_SERIALIZATION
         except AttributeError:
             self.is_serialized = True
         self.instance = instance
+        self.tx_digest = None
         self.has_sync_historical_manager_or_raise()
         self.has_natural_key_or_raise()
         self.has_get_by_natural_key_or_raise()
@@ -106,9 +116,29 @@ class SyncModel:
         return [field for field in self.instance._meta.fields
                 if field.primary_key][0]
 
+    @property
+    def is_derived_history(self):
+        """Returns True if the instance is an insert or update
+        history row the server derives.
+        """
+        return bool(
+            hasattr(self.instance.__class__, 'instance_type')
+            and getattr(self.instance, 'history_type', None) != '-'
+            and site_sync_models.derives_history(self.instance.__class__))
+
     def to_outgoing_transaction(self, using, created=None, deleted=None):
         """ Serialize the model instance to an AES encrypted json object
         and saves the json object to the OutgoingTransaction model.
+
+        The OutgoingTransaction is appended to the outgoing log
+        backend, see EDC_SYNC_OUTGOING_LOG.
+
+        An update is not logged if its digest matches that of the
+        last transaction appended for the instance, including one
+        still pending in the current transaction (a no-op save).
+
+        Insert and update history rows of models registered with
+        `derive_history` are not logged, the server derives them.
         """
         OutgoingTransaction = django_apps.get_model(
             'edc_sync', 'OutgoingTransaction')
@@ -121,21 +151,46 @@ class SyncModel:
             timestamp_datetime = get_utcnow()
             action = DELETE
         outgoing_transaction = None
+        if self.is_derived_history:
+            return None
         if self.is_serialized:
             hostname = socket.gethostname()
-            outgoing_transaction = OutgoingTransaction.objects.using(using).create(
-                tx_name=self.instance._meta.label_lower,
-                tx_pk=getattr(self.instance, self.primary_key_field.name),
-                tx=self.encrypted_json(),
+            json = self.serialized_json()
+            tx_name = self.instance._meta.label_lower
+            tx_pk = getattr(self.instance, self.primary_key_field.name)
+            outgoing_log = get_outgoing_log()
+            if action == UPDATE and self.tx_digest == outgoing_log.last_digest(
+                    tx_name=tx_name, tx_pk=tx_pk, using=using):
+                duplicate_transactions_total.inc(model=tx_name, stage='produce')
+                return None
+            outgoing_transaction = OutgoingTransaction(
+                tx_name=tx_name,
+                tx_pk=tx_pk,
+                tx=self.encrypted_json(json),
+                tx_digest=self.tx_digest,
                 timestamp=timestamp_datetime.strftime('%Y%m%d%H%M%S%f'),
                 producer=f'{hostname}-{using}',
                 action=action,
+                priority=site_sync_models.get_priority(tx_name),
                 using=using)
+            outgoing_log.append(outgoing_transaction, using=using)
+            outgoing_transactions_total.inc(model=str(self), action=action)
         return outgoing_transaction
 
-    def encrypted_json(self):
-        """Returns an encrypted json serialized from self.
+    def serialized_json(self):
+        """Returns the json serialized from self and sets `tx_digest`
+        from it.
+        """
+        with serialize_seconds.time(model=str(self)):
+            json = serialize(objects=[self.instance])
+            self.tx_digest = get_digest(json, exclude_fields=self.digest_exclude_fields)
+        return json
+
+    def encrypted_json(self, json=None):
+        """Returns the encrypted json, serialized from self if not
+        given, see `serialized_json`.
         """
-        json = serialize(objects=[self.instance])
-        encrypted_json = Cryptor().aes_encrypt(json, LOCAL_MODE)
+        json = self.serialized_json() if json is None else json
+        with encrypt_seconds.time(model=str(self)):
+            encrypted_json = Cryptor().aes_encrypt(json, LOCAL_MODE)
         return encrypted_json
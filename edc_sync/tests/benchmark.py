@@ -0,0 +1,236 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from time import perf_counter
+
+import django
+
+from django.contrib.auth.models import User
+from django.db import connections
+from edc_base.utils import get_utcnow
+from edc_device.constants import NODE_SERVER
+from edc_sync_files.transaction import TransactionImporter, TransactionExporter
+
+from ..metrics import decrypt_seconds, deserialize_seconds, save_seconds
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..site_sync_models import site_sync_models
+from ..transaction import TransactionDeserializer
+from .models import TestModel, TestModelDates, TestModelWide
+from .models import TestModelWithFkProtected, TestModelWithManyFks
+
+
+class SyncBenchmark:
+
+    """Times each stage of the sync pipeline for `n` synthetic
+    records per scenario using the `client` and `default` DBs.
+
+    Stages are:
+        create: model instances and their outgoing transactions
+            (via signals) on `client`;
+        export: outgoing transactions to a batch file;
+        ingest: the batch file as incoming transactions;
+        apply: incoming transactions on `default`. Split into
+            decrypt, deserialize and save from the metrics
+            histograms.
+
+    `unregistered_save` times saves of a model that is not
+    registered with site_sync_models (auth.user) for the sync
+    overhead on the rest of the EDC.
+
+    `startup` times `django.setup()` in a fresh interpreter and
+    lists the slowest imports of edc_sync modules (`-X importtime`),
+    see `run_startup`.
+
+    Usage:
+        results = SyncBenchmark(n=1000).run()
+        SyncBenchmark.write(results, 'benchmark.json')
+    """
+
+    sync_models = [
+        'edc_sync.testmodel',
+        'edc_sync.testmodeldates',
+        'edc_sync.testmodelwide',
+        'edc_sync.testmodelwithfkprotected',
+        'edc_sync.testmodelwithmanyfks']
+
+    scenarios = ['simple', 'wide', 'fk_heavy']
+
+    def __init__(self, n=None, export_path=None, scenarios=None):
+        self.n = n or 100
+        self.export_path = export_path or os.path.join(
+            tempfile.gettempdir(), 'benchmark')
+        if not os.path.exists(self.export_path):
+            os.mkdir(self.export_path)
+        self.scenarios = scenarios or self.scenarios
+
+    def run(self):
+        """Returns a dictionary of results per scenario and stage.
+        """
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(self.sync_models)
+        results = dict(
+            n=self.n,
+            python=platform.python_version(),
+            django=django.get_version(),
+            vendor=connections['default'].vendor,
+            timestamp=get_utcnow().isoformat(),
+            scenarios={})
+        for scenario in self.scenarios:
+            self.clear()
+            results['scenarios'][scenario] = self.run_scenario(
+                getattr(self, f'create_{scenario}'))
+        results['unregistered_save'] = self.run_unregistered_save()
+        results['startup'] = self.run_startup()
+        return results
+
+    def run_scenario(self, create):
+        stages = {}
+        with self.timer(stages, 'create') as stage:
+            create()
+            stage['rows'] = OutgoingTransaction.objects.using(
+                'client').filter(is_consumed_server=False).count()
+        with self.timer(stages, 'export') as stage:
+            batch = TransactionExporter(
+                export_path=self.export_path, using='client').export_batch()
+            stage['rows'] = stages['create']['rows']
+        with self.timer(stages, 'ingest') as stage:
+            batch = TransactionImporter(
+                import_path=self.export_path).import_batch(filename=batch.filename)
+            stage['rows'] = len(batch.saved_transactions)
+        histograms = dict(
+            decrypt=decrypt_seconds,
+            deserialize=deserialize_seconds,
+            save=save_seconds)
+        before = {name: self.total(histogram)
+                  for name, histogram in histograms.items()}
+        with self.timer(stages, 'apply') as stage:
+            tx_deserializer = TransactionDeserializer(
+                override_role=NODE_SERVER, allow_self=True)
+            tx_deserializer.deserialize_transactions(
+                transactions=batch.saved_transactions)
+            stage['rows'] = tx_deserializer.consumed_count
+        for name, histogram in histograms.items():
+            seconds = self.total(histogram) - before[name]
+            stages[f'apply.{name}'] = self.stage_result(
+                seconds, stages['apply']['rows'])
+        return stages
+
+    def run_unregistered_save(self):
+        User.objects.using('client').filter(username__startswith='bm').delete()
+        start = perf_counter()
+        for i in range(self.n):
+            User.objects.using('client').create(username=f'bm{i}')
+        seconds = perf_counter() - start
+        User.objects.using('client').filter(username__startswith='bm').delete()
+        result = self.stage_result(seconds, self.n)
+        result.update(seconds_per_save=seconds / self.n)
+        return result
+
+    def run_startup(self, settings_module=None, top=None):
+        """Returns the seconds taken by `django.setup()` in a new
+        interpreter, the edc_sync modules it imported and the `top`
+        slowest of them by cumulative import time.
+        """
+        script = (
+            'from time import perf_counter\n'
+            'start = perf_counter()\n'
+            'import django\n'
+            'django.setup()\n'
+            'print(perf_counter() - start)\n')
+        env = dict(os.environ)
+        env['DJANGO_SETTINGS_MODULE'] = (
+            settings_module or env.get('DJANGO_SETTINGS_MODULE') or 'edc_sync.settings')
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True)
+        imports = []
+        for line in completed.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith('import time:'):
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            if name.split('.')[0] == 'edc_sync' and cumulative.strip().isdigit():
+                imports.append((name, int(cumulative) / 1e6))
+        imports.sort(key=lambda item: item[1], reverse=True)
+        return dict(
+            seconds=float(completed.stdout.split()[-1]),
+            modules=[name for name, _ in imports],
+            slowest=[dict(module=name, seconds=seconds)
+                     for name, seconds in imports[:top or 10]])
+
+    def timer(self, stages, name):
+        return StageTimer(stages, name)
+
+    @staticmethod
+    def stage_result(seconds, rows):
+        return dict(
+            seconds=seconds,
+            rows=rows,
+            rows_per_second=rows / seconds if seconds else None)
+
+    @staticmethod
+    def total(histogram):
+        return sum(total for _, total, _ in histogram.values.values())
+
+    @staticmethod
+    def write(results, path):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    def clear(self):
+        for using in ['client', 'default']:
+            OutgoingTransaction.objects.using(using).all().delete()
+            IncomingTransaction.objects.using(using).all().delete()
+            for model in [TestModelWithManyFks, TestModelWithFkProtected,
+                          TestModelWide, TestModelDates, TestModel]:
+                model.objects.using(using).all().delete()
+                if hasattr(model, 'history'):
+                    model.history.using(using).all().delete()
+
+    def create_simple(self):
+        for i in range(self.n):
+            TestModel.objects.using('client').create(f1=f's{i}')
+
+    def create_wide(self):
+        values = {f'f{i}': 'x' * 25 for i in range(2, 21)}
+        values.update({f'i{i}': i for i in range(1, 6)})
+        values.update({f'd{i}': get_utcnow() for i in range(1, 6)})
+        for i in range(self.n):
+            TestModelWide.objects.using('client').create(f1=f'w{i}', **values)
+
+    def create_fk_heavy(self):
+        for i in range(self.n):
+            test_model = TestModel.objects.using('client').create(f1=f'p{i}')
+            TestModelWithManyFks.objects.using('client').create(
+                f1=f'c{i}',
+                test_model=test_model,
+                test_model_dates=TestModelDates.objects.using(
+                    'client').create(f1=f'd{i}'),
+                test_model_wide=TestModelWide.objects.using(
+                    'client').create(f1=f'w{i}'),
+                test_model_with_fk=TestModelWithFkProtected.objects.using(
+                    'client').create(f1=f'f{i}', test_model=test_model))
+
+
+class StageTimer:
+
+    def __init__(self, stages, name):
+        self.stages = stages
+        self.name = name
+        self.stage = {}
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self.stage
+
+    def __exit__(self, *args):
+        seconds = perf_counter() - self.start
+        self.stages[self.name] = SyncBenchmark.stage_result(
+            seconds, self.stage.get('rows', 0))
@@ -139,3 +139,98 @@ class TestModelWithM2m(BaseUuidModel):
 
     def natural_key(self):
         return (self.f1,)
+
+
+class TestModelWide(BaseUuidModel):
+    """A test model with many fields.
+    """
+
+    f1 = models.CharField(max_length=25, unique=True)
+
+    f2 = models.CharField(max_length=25, null=True)
+
+    f3 = models.CharField(max_length=25, null=True)
+
+    f4 = models.CharField(max_length=25, null=True)
+
+    f5 = models.CharField(max_length=25, null=True)
+
+    f6 = models.CharField(max_length=25, null=True)
+
+    f7 = models.CharField(max_length=25, null=True)
+
+    f8 = models.CharField(max_length=25, null=True)
+
+    f9 = models.CharField(max_length=25, null=True)
+
+    f10 = models.CharField(max_length=25, null=True)
+
+    f11 = models.CharField(max_length=25, null=True)
+
+    f12 = models.CharField(max_length=25, null=True)
+
+    f13 = models.CharField(max_length=25, null=True)
+
+    f14 = models.CharField(max_length=25, null=True)
+
+    f15 = models.CharField(max_length=25, null=True)
+
+    f16 = models.CharField(max_length=25, null=True)
+
+    f17 = models.CharField(max_length=25, null=True)
+
+    f18 = models.CharField(max_length=25, null=True)
+
+    f19 = models.CharField(max_length=25, null=True)
+
+    f20 = models.CharField(max_length=25, null=True)
+
+    i1 = models.IntegerField(null=True)
+
+    i2 = models.IntegerField(null=True)
+
+    i3 = models.IntegerField(null=True)
+
+    i4 = models.IntegerField(null=True)
+
+    i5 = models.IntegerField(null=True)
+
+    d1 = models.DateTimeField(null=True)
+
+    d2 = models.DateTimeField(null=True)
+
+    d3 = models.DateTimeField(null=True)
+
+    d4 = models.DateTimeField(null=True)
+
+    d5 = models.DateTimeField(null=True)
+
+    objects = TestModelManager()
+
+    history = HistoricalRecords()
+
+    def natural_key(self):
+        return (self.f1,)
+
+
+class TestModelWithManyFks(BaseUuidModel):
+    """A test model with several foreign keys.
+    """
+
+    f1 = models.CharField(max_length=25, unique=True)
+
+    test_model = models.ForeignKey(TestModel, on_delete=PROTECT)
+
+    test_model_dates = models.ForeignKey(TestModelDates, on_delete=PROTECT)
+
+    test_model_wide = models.ForeignKey(TestModelWide, on_delete=PROTECT)
+
+    test_model_with_fk = models.ForeignKey(
+        TestModelWithFkProtected, on_delete=PROTECT)
+
+    objects = TestModelManager()
+
+    history = HistoricalRecords()
+
+    def natural_key(self):
+        return (self.f1,)
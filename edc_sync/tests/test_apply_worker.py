@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, tag
+from django.urls import reverse
+from edc_device.constants import NODE_SERVER
+
+from ..metrics import site_metrics
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..site_sync_models import site_sync_models
+from ..progress import get_progress, FINISHED, RUNNING
+from ..transaction.apply_worker import ApplyWorker, get_progress_job, get_worker_stats
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel
+from .test_push import ClientSession
+
+
+class TestApplyWorker(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        cache.clear()
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        TestModel.objects.using('client').create(f1='model1')
+        TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            session=ClientSession(User.objects.create(username='erik'))).push()
+        self.worker = ApplyWorker(override_role=NODE_SERVER, allow_self=True)
+
+    def test_apply_chunk(self):
+        self.assertEqual(self.worker.apply_chunk(), 2)
+        self.assertFalse(IncomingTransaction.objects.filter(is_consumed=False).exists())
+        self.assertTrue(TestModel.objects.filter(f1='model1').exists())
+        self.assertGreaterEqual(self.worker.lag_seconds, 0)
+
+    def test_idle(self):
+        self.worker.apply_chunk()
+        self.assertEqual(self.worker.apply_chunk(), 0)
+        self.assertEqual(self.worker.lag_seconds, 0)
+
+    def test_bad_transaction_flagged_as_error(self):
+        IncomingTransaction.objects.filter(
+            tx_name='edc_sync.testmodel').update(tx=b'not encrypted')
+        self.worker.apply_chunk()
+        self.assertEqual(self.worker.error_count, 1)
+        self.assertTrue(IncomingTransaction.objects.get(
+            tx_name='edc_sync.testmodel').is_error)
+        self.assertEqual(self.worker.apply_chunk(), 0)
+
+    def test_run_stops(self):
+        self.worker.chunk_size = 1
+        apply_chunk = self.worker.apply_chunk
+
+        def apply_chunk_and_stop():
+            applied = apply_chunk()
+            if not applied:
+                self.worker.stop()
+            return applied
+
+        self.worker.apply_chunk = apply_chunk_and_stop
+        self.worker.run()
+        self.assertEqual(self.worker.applied_count, 2)
+
+    def test_progress_per_run(self):
+        """Asserts the worker's progress job runs across chunks and
+        finishes when the worker stops.
+        """
+        self.worker.chunk_size = 1
+        self.worker.progress.interval = 0
+        job = get_progress_job(self.worker.name)
+        self.worker.apply_chunk()
+        self.worker.apply_chunk()
+        progress = get_progress(job)
+        self.assertEqual(progress.get('status'), RUNNING)
+        self.assertEqual(sum(stats['count'] for stats in progress['hosts'].values()), 2)
+        self.assertIsNone(get_progress('deserialize'))
+        self.worker.stop()
+        self.worker.run()
+        self.assertEqual(get_progress(job).get('status'), FINISHED)
+
+    def test_stats_published(self):
+        self.worker.apply_chunk()
+        self.worker.publish()
+        stats = get_worker_stats()
+        self.assertEqual(stats[0].get('applied'), 2)
+        self.assertIn(
+            f'edc_sync_apply_worker_applied{{worker="{self.worker.name}"}} 2.0',
+            site_metrics.render())
@@ -0,0 +1,71 @@
+import os
+import tempfile
+
+from django.test import TestCase, tag
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..outgoing_log import Record
+from ..site_sync_models import site_sync_models
+from ..transaction.batch_file import BatchFileWriter, BatchFileReader
+from ..transaction.batch_file import BatchFileImporter, BatchFileError
+from .models import TestModel
+
+
+class TestBatchFile(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(tempfile.mkdtemp(), 'batch.edcsync')
+        with BatchFileWriter(self.filename, header={'batch_id': '1'},
+                             block_size=200) as writer:
+            for i in range(20):
+                writer.add(Record(
+                    tx=f'cipher{i}'.encode(), tx_name='edc_sync.testmodel',
+                    tx_pk=f'pk{i}', timestamp=f'201701011000000000{i:02d}',
+                    producer='host-default', action='I'))
+
+    def test_header_and_index(self):
+        with BatchFileReader(self.filename) as reader:
+            self.assertEqual(reader.header, {'batch_id': '1'})
+            self.assertEqual(len(reader), 20)
+            self.assertGreater(len(set(entry[3] for entry in reader.index)), 1)
+
+    def test_find(self):
+        with BatchFileReader(self.filename) as reader:
+            records = reader.find(tx_pk='pk13')
+            self.assertEqual([r.tx for r in records], [b'cipher13'])
+            self.assertEqual(records[0].seq, 13)
+
+    def test_records_from_position(self):
+        with BatchFileReader(self.filename) as reader:
+            self.assertEqual(
+                [r.tx_pk for r in reader.records(start=18)], ['pk18', 'pk19'])
+
+    def test_invalid_file(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'[{"tx": "..."}]')
+        self.assertRaises(BatchFileError, BatchFileReader(self.filename).__enter__)
+
+
+class TestBatchFileImport(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        self.filename = os.path.join(tempfile.mkdtemp(), 'batch.edcsync')
+
+    def test_import(self):
+        for i in range(3):
+            TestModel.objects.using('client').create(f1=f'model{i}')
+        outgoing = OutgoingTransaction.objects.using('client').all()
+        with BatchFileWriter(self.filename) as writer:
+            for obj in outgoing:
+                writer.add(obj)
+        importer = BatchFileImporter()
+        self.assertEqual(importer.import_batch_file(self.filename), 6)
+        self.assertEqual(
+            set(str(pk) for pk in IncomingTransaction.objects.values_list('pk', flat=True)),
+            set(str(obj.pk) for obj in outgoing))
+        self.assertEqual(importer.import_batch_file(self.filename), 0)
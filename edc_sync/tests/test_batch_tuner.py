@@ -0,0 +1,137 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import TestCase, tag
+from django.urls import reverse
+from requests.exceptions import Timeout
+
+from ..models import OutgoingTransaction, IncomingTransaction, Server
+from ..site_sync_models import site_sync_models
+from ..transaction.batch_tuner import BatchSizeTuner, Throttle
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel
+from .test_push import ClientSession
+
+
+class FlakySession(ClientSession):
+    """Times out on the first `failures` requests.
+    """
+
+    def __init__(self, user, failures=None):
+        super().__init__(user)
+        self.failures = failures or 0
+
+    def post(self, url, data=None, timeout=None):
+        if self.failures:
+            self.failures -= 1
+            raise Timeout()
+        return super().post(url, data=data, timeout=timeout)
+
+
+class BadGatewaySession(FlakySession):
+    """Answers 502 to the first `failures` requests.
+    """
+
+    def post(self, url, data=None, timeout=None):
+        if self.failures:
+            self.failures -= 1
+            response = HttpResponse(status=502)
+            response.raise_for_status = lambda: None
+            return response
+        return super().post(url, data=data, timeout=timeout)
+
+
+class TestBatchSizeTuner(TestCase):
+
+    def test_increases_below_target(self):
+        tuner = BatchSizeTuner(batch_size=100, target_seconds=5)
+        tuner.completed(seconds=1, size=100, bytes=10000)
+        self.assertEqual(tuner.batch_size, 100 + tuner.step)
+        self.assertEqual(tuner.bytes_per_second, 10000)
+
+    def test_not_increased_by_partial_batch(self):
+        tuner = BatchSizeTuner(batch_size=100, target_seconds=5)
+        tuner.completed(seconds=1, size=20, bytes=2000)
+        self.assertEqual(tuner.batch_size, 100)
+
+    def test_decreases_above_target(self):
+        tuner = BatchSizeTuner(batch_size=100, target_seconds=5)
+        tuner.completed(seconds=10, size=100, bytes=10000)
+        self.assertEqual(tuner.batch_size, 50)
+
+    def test_decreases_on_failure(self):
+        tuner = BatchSizeTuner(batch_size=15)
+        tuner.failed()
+        self.assertEqual(tuner.batch_size, tuner.min_batch_size)
+        self.assertEqual(tuner.failures, 1)
+
+    def test_fixed(self):
+        tuner = BatchSizeTuner(batch_size=100, fixed=True)
+        tuner.failed()
+        tuner.completed(seconds=1, size=100, bytes=10000)
+        self.assertEqual(tuner.batch_size, 100)
+
+
+class TestThrottle(TestCase):
+
+    def test_waits_for_cap(self):
+        now, slept = [0.0], []
+        throttle = Throttle(
+            max_bytes_per_second=1000, clock=lambda: now[0], sleep=slept.append)
+        throttle.wait()
+        throttle.sent(2000, started=0.0)
+        now[0] = 0.5
+        throttle.wait()
+        self.assertEqual(slept, [1.5])
+
+    def test_no_cap(self):
+        slept = []
+        throttle = Throttle(sleep=slept.append)
+        throttle.sent(2000, started=0.0)
+        throttle.wait()
+        self.assertEqual(slept, [])
+
+
+class TestAdaptivePush(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        self.user = User.objects.create(username='erik')
+        for i in range(5):
+            TestModel.objects.using('client').create(f1=f'model{i}')
+
+    def test_from_host(self):
+        server = Server.objects.create(
+            hostname='central', port=8000, batch_size=40, max_bytes_per_second=5000)
+        pusher = TransactionPusher.from_host(host=server, token='token')
+        self.assertEqual(pusher.batch_size, 40)
+        self.assertFalse(pusher.tuner.fixed)
+        self.assertEqual(pusher.throttle.max_bytes_per_second, 5000)
+
+    def test_retries_smaller_after_timeout(self):
+        pusher = TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            initial_batch_size=40, session=FlakySession(self.user, failures=1))
+        self.assertEqual(pusher.push(), 10)
+        self.assertEqual(pusher.tuner.failures, 1)
+        self.assertEqual(pusher.batch_size, 20)
+
+    def test_gives_up_after_max_retries(self):
+        pusher = TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            session=FlakySession(self.user, failures=10))
+        self.assertRaises(Timeout, pusher.push)
+        self.assertEqual(IncomingTransaction.objects.count(), 0)
+
+    def test_retries_smaller_after_server_error(self):
+        pusher = TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            initial_batch_size=40, session=BadGatewaySession(self.user, failures=1))
+        self.assertEqual(pusher.push(), 10)
+        self.assertEqual(pusher.tuner.failures, 1)
+        self.assertEqual(pusher.batch_size, 20)
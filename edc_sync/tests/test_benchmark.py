@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from django.test import TestCase, tag
+
+from .benchmark import SyncBenchmark
+
+
+@tag('benchmark')
+class TestBenchmark(TestCase):
+
+    """Runs the sync pipeline benchmark.
+
+    Set EDC_SYNC_BENCHMARK_N for the number of records per scenario
+    and EDC_SYNC_BENCHMARK_OUTPUT for the path of the JSON results, e.g.
+
+        EDC_SYNC_BENCHMARK_N=5000 EDC_SYNC_BENCHMARK_OUTPUT=0.2.26.json \
+            python manage.py test edc_sync --tag=benchmark
+    """
+
+    multi_db = True
+
+    def test_benchmark(self):
+        n = int(os.environ.get('EDC_SYNC_BENCHMARK_N', 25))
+        output = os.environ.get(
+            'EDC_SYNC_BENCHMARK_OUTPUT',
+            os.path.join(tempfile.gettempdir(), 'edc_sync_benchmark.json'))
+        results = SyncBenchmark(n=n).run()
+        SyncBenchmark.write(results, output)
+        for stages in results['scenarios'].values():
+            self.assertEqual(stages['create']['rows'], stages['ingest']['rows'])
+            self.assertEqual(stages['ingest']['rows'], stages['apply']['rows'])
+        self.assertEqual(results['unregistered_save']['rows'], n)
+        self.assertIn('edc_sync.apps', results['startup']['modules'])
+
+    def test_startup(self):
+        startup = SyncBenchmark().run_startup()
+        self.assertGreater(startup['seconds'], 0)
+        self.assertIn('edc_sync.models', startup['modules'])
+        self.assertLessEqual(len(startup['slowest']), 10)
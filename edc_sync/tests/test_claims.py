@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, tag
+from django.urls import reverse
+from edc_base.utils import get_utcnow
+from edc_device.constants import NODE_SERVER
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..site_sync_models import site_sync_models
+from ..transaction.apply_worker import ApplyWorker
+from ..transaction.claims import Claimer, DEFERRED
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel, TestModelWithFkProtected
+from .test_push import ClientSession
+
+
+class TestClaims(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        test_model = TestModel.objects.using('client').create(f1='model1')
+        test_model.f2 = 'changed'
+        test_model.save(using='client')
+        TestModel.objects.using('client').create(f1='model2')
+        TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            session=ClientSession(User.objects.create(username='erik'))).push()
+
+    def test_claims_all_transactions_of_tx_pk(self):
+        first = IncomingTransaction.objects.filter(
+            tx_name='edc_sync.testmodel').order_by('timestamp').first()
+        claimed = Claimer(name='worker1').claim(limit=1)
+        self.assertEqual(
+            set(claimed.values_list('tx_pk', flat=True)), {first.tx_pk})
+        self.assertEqual(
+            claimed.count(), IncomingTransaction.objects.filter(tx_pk=first.tx_pk).count())
+
+    def test_workers_do_not_share_tx_pk(self):
+        claimed1 = set(Claimer(name='worker1').claim(limit=1).values_list('pk', flat=True))
+        claimed2 = set(Claimer(name='worker2').claim(limit=100).values_list('pk', flat=True))
+        self.assertTrue(claimed1)
+        self.assertTrue(claimed2)
+        self.assertFalse(claimed1 & claimed2)
+        self.assertEqual(len(claimed1 | claimed2), IncomingTransaction.objects.count())
+
+    def test_expired_lease_reclaimed(self):
+        Claimer(name='worker1').claim()
+        self.assertFalse(Claimer(name='worker2').claim().exists())
+        IncomingTransaction.objects.update(claim_expires=get_utcnow() - timedelta(seconds=1))
+        self.assertEqual(
+            Claimer(name='worker2').claim().count(), IncomingTransaction.objects.count())
+
+    def test_release(self):
+        claimer = Claimer(name='worker1')
+        claimer.claim()
+        claimer.release()
+        self.assertFalse(IncomingTransaction.objects.filter(claimed_by__isnull=False).exists())
+
+    def test_worker_skips_claimed(self):
+        Claimer(name='other').claim()
+        worker = ApplyWorker(override_role=NODE_SERVER, allow_self=True)
+        self.assertEqual(worker.apply_chunk(), 0)
+        self.assertFalse(IncomingTransaction.objects.filter(is_consumed=True).exists())
+
+    def test_two_workers_apply_once(self):
+        worker1 = ApplyWorker(override_role=NODE_SERVER, allow_self=True, chunk_size=1)
+        worker2 = ApplyWorker(override_role=NODE_SERVER, allow_self=True, chunk_size=1)
+        worker2.claimer.name = worker2.name = 'worker2'
+        while worker1.apply_chunk() + worker2.apply_chunk():
+            pass
+        self.assertEqual(
+            worker1.applied_count + worker2.applied_count, IncomingTransaction.objects.count())
+        self.assertEqual(TestModel.objects.get(f1='model1').f2, 'changed')
+
+    def test_quarantined_tx_pk_not_claimed(self):
+        """Asserts the later transactions of a tx_pk with a transaction
+        in error are not claimed.
+        """
+        first = IncomingTransaction.objects.filter(
+            tx_name='edc_sync.testmodel').order_by('timestamp').first()
+        IncomingTransaction.objects.filter(pk=first.pk).update(is_error=True)
+        claimed = Claimer(name='worker1').claim()
+        self.assertNotIn(first.tx_pk, set(claimed.values_list('tx_pk', flat=True)))
+        self.assertTrue(claimed.exists())
+        claimed = Claimer(name='worker2', retry_errors=True).claim()
+        self.assertEqual(
+            claimed.filter(tx_pk=first.tx_pk).count(),
+            IncomingTransaction.objects.filter(tx_pk=first.tx_pk).count())
+
+    def test_claim_capped_at_limit(self):
+        """Asserts a claim does not take the other transactions of
+        its tx_pks past `limit`.
+        """
+        first, update, second = IncomingTransaction.objects.filter(
+            tx_name='edc_sync.testmodel').order_by('timestamp')
+        IncomingTransaction.objects.filter(pk=update.pk).update(
+            timestamp=str(int(second.timestamp) + 1))
+        claimed = Claimer(name='worker1').claim(limit=2)
+        self.assertEqual(set(claimed.values_list('pk', flat=True)), {first.pk, update.pk})
+
+    def test_renew(self):
+        claimer = Claimer(name='worker1', lease_seconds=300)
+        claimer.claim()
+        IncomingTransaction.objects.update(claim_expires=get_utcnow() + timedelta(seconds=1))
+        claimer.renew()
+        self.assertFalse(IncomingTransaction.objects.filter(
+            claimed_by='worker1',
+            claim_expires__lt=get_utcnow() + timedelta(seconds=200)).exists())
+
+    def test_missing_reference_deferred(self):
+        """Asserts a child applied before its parent is deferred, not
+        flagged as an error, and applied once the parent is.
+        """
+        OutgoingTransaction.objects.using('client').update(is_consumed_server=True)
+        TestModelWithFkProtected.objects.using('client').create(
+            f1='f1', test_model=TestModel.objects.using('client').get(f1='model2'))
+        TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            session=ClientSession(User.objects.get(username='erik'))).push()
+        Claimer(name='other').claim(queryset=IncomingTransaction.objects.exclude(
+            tx_name__startswith='edc_sync.testmodelwithfkprotected'))
+        worker = ApplyWorker(override_role=NODE_SERVER, allow_self=True)
+        worker.apply_chunk()
+        child = IncomingTransaction.objects.get(tx_name='edc_sync.testmodelwithfkprotected')
+        self.assertFalse(child.is_error)
+        self.assertFalse(child.is_consumed)
+        self.assertEqual(child.claimed_by, DEFERRED)
+        self.assertEqual(worker.error_count, 0)
+        Claimer(name='other').release()
+        IncomingTransaction.objects.filter(claimed_by=DEFERRED).update(
+            claim_expires=get_utcnow() - timedelta(seconds=1))
+        while worker.apply_chunk():
+            pass
+        self.assertTrue(TestModelWithFkProtected.objects.filter(f1='f1').exists())
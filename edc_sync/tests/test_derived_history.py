@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+from django.test import TestCase, tag
+from edc_device.constants import NODE_SERVER
+from edc_sync_files.transaction import TransactionImporter, TransactionExporter
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..site_sync_models import site_sync_models
+from ..transaction import TransactionDeserializer
+from ..transaction.derived_history import get_history_id
+from .models import TestModel
+
+
+class TestDerivedHistory(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'], derive_history=True)
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        self.export_path = os.path.join(tempfile.gettempdir(), 'export')
+        if not os.path.exists(self.export_path):
+            os.mkdir(self.export_path)
+        self.tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+
+    def sync(self):
+        batch = TransactionExporter(
+            export_path=self.export_path, using='client').export_batch()
+        batch = TransactionImporter(import_path=self.export_path).import_batch(
+            filename=batch.filename)
+        self.tx_deserializer.deserialize_transactions(
+            transactions=batch.saved_transactions)
+
+    def test_history_rows_not_sent(self):
+        TestModel.objects.using('client').create(f1='model1')
+        self.assertEqual(
+            [obj.tx_name for obj in OutgoingTransaction.objects.using('client').all()],
+            ['edc_sync.testmodel'])
+
+    def test_history_derived_on_apply(self):
+        test_model = TestModel.objects.using('client').create(f1='model1')
+        self.sync()
+        transaction = IncomingTransaction.objects.get(tx_name='edc_sync.testmodel')
+        history = TestModel.history.get(id=test_model.pk)
+        self.assertEqual(history.history_id, get_history_id(transaction))
+        self.assertEqual(history.history_type, '+')
+        self.assertEqual(history.f1, 'model1')
+        test_model.f2 = 'changed'
+        test_model.save(using='client')
+        self.sync()
+        self.assertEqual(
+            list(TestModel.history.filter(id=test_model.pk).order_by(
+                'history_date').values_list('history_type', 'f2')),
+            [('+', None), ('~', 'changed')])
+
+    def test_not_registered_for_derived_history(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        self.assertFalse(site_sync_models.derives_history(TestModel))
@@ -3,19 +3,23 @@ import os
 import tempfile
 
 from copy import copy
+from unittest.mock import patch
 from django.apps import apps as django_apps
 from django.core.serializers.base import DeserializationError
+from django.db import IntegrityError
 from django.test import TestCase, tag
 from edc_base.utils import get_utcnow
 from edc_device.constants import NODE_SERVER
-from edc_sync import datetime_to_date_parser
+from edc_sync import datetime_to_date_parser, datetime_to_date, FieldParser
 from edc_sync_files.transaction import TransactionImporter, TransactionExporter
 from faker import Faker
 
+from ..constants import DELETE
 from ..models import OutgoingTransaction, IncomingTransaction
 from ..site_sync_models import site_sync_models
 from ..sync_model import SyncModel
 from ..transaction import TransactionDeserializer, TransactionDeserializerError
+from ..transaction.transaction_deserializer import bulk_save
 from .models import TestModel, TestModelWithFkProtected, TestModelWithM2m, M2m, TestModelDates
 
 
@@ -196,6 +200,82 @@ class TestDeserializer2(TestCase):
         else:
             self.fail('TestModel unexpectedly exists')
 
+    def test_deleted_with_fk_from_client(self):
+        """Asserts child and parent deleted in one batch are deleted
+        children first.
+        """
+        test_model = TestModel.objects.using('client').create(f1='model1')
+        test_model_with_fk = TestModelWithFkProtected.objects.using(
+            'client').create(f1='f1', test_model=test_model)
+        tx_exporter = TransactionExporter(
+            export_path=self.export_path, using='client')
+        batch = tx_exporter.export_batch()
+        tx_importer = TransactionImporter(import_path=self.import_path)
+        batch = tx_importer.import_batch(filename=batch.filename)
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        tx_deserializer.deserialize_transactions(
+            transactions=batch.saved_transactions)
+        test_model_with_fk.delete()
+        test_model.delete()
+        batch = tx_exporter.export_batch()
+        batch = tx_importer.import_batch(filename=batch.filename)
+        tx_deserializer.deserialize_transactions(
+            transactions=batch.saved_transactions)
+        self.assertFalse(TestModelWithFkProtected.objects.filter(f1='f1').exists())
+        self.assertFalse(TestModel.objects.filter(f1='model1').exists())
+
+    def test_deleted_then_reinserted_with_same_natural_key(self):
+        """Asserts a DELETE is applied before a later insert of
+        another instance with the same natural key.
+        """
+        test_model = TestModel.objects.using('client').create(f1='model1')
+        tx_exporter = TransactionExporter(
+            export_path=self.export_path, using='client')
+        batch = tx_exporter.export_batch()
+        tx_importer = TransactionImporter(import_path=self.import_path)
+        batch = tx_importer.import_batch(filename=batch.filename)
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        tx_deserializer.deserialize_transactions(
+            transactions=batch.saved_transactions)
+        test_model.delete()
+        reinserted = TestModel.objects.using('client').create(f1='model1')
+        batch = tx_exporter.export_batch()
+        batch = tx_importer.import_batch(filename=batch.filename)
+        tx_deserializer.deserialize_transactions(
+            transactions=batch.saved_transactions)
+        self.assertEqual(TestModel.objects.get(f1='model1').pk, reinserted.pk)
+        self.assertFalse(IncomingTransaction.objects.filter(is_error=True).exists())
+
+    def test_deleted_protected_is_quarantined(self):
+        """Asserts a DELETE of an instance referred to by a protected
+        FK is flagged as an error and not applied.
+        """
+        test_model = TestModel.objects.using('client').create(f1='model1')
+        test_model_pk = test_model.pk
+        tx_exporter = TransactionExporter(
+            export_path=self.export_path, using='client')
+        batch = tx_exporter.export_batch()
+        tx_importer = TransactionImporter(import_path=self.import_path)
+        batch = tx_importer.import_batch(filename=batch.filename)
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        tx_deserializer.deserialize_transactions(
+            transactions=batch.saved_transactions)
+        TestModelWithFkProtected.objects.create(
+            f1='f1', test_model=TestModel.objects.get(f1='model1'))
+        test_model.delete()
+        batch = tx_exporter.export_batch()
+        batch = tx_importer.import_batch(filename=batch.filename)
+        tx_deserializer.deserialize_transactions(
+            transactions=batch.saved_transactions)
+        self.assertTrue(TestModel.objects.filter(f1='model1').exists())
+        transaction = IncomingTransaction.objects.get(
+            tx_pk=test_model_pk, action=DELETE)
+        self.assertTrue(transaction.is_error)
+        self.assertFalse(transaction.is_consumed)
+
     def test_dont_allow_saved_on_self(self):
         """Asserts cannot save on self by default.
         """
@@ -252,6 +332,51 @@ class TestDeserializer2(TestCase):
             self.fail('TestModel unexpectedly does not exists')
         self.assertEqual(test_model, obj.test_model)
 
+    def test_deserialized_insert_and_update_in_one_batch(self):
+        """Asserts the last version of an instance is saved when
+        the batch has an insert and update for the same pk.
+        """
+        test_model = TestModel.objects.using('client').create(f1='model1')
+        test_model.f2 = 'updated'
+        test_model.save(using='client')
+        TestModel.objects.using('client').create(f1='model2')
+        tx_exporter = TransactionExporter(
+            export_path=self.export_path, using='client')
+        batch = tx_exporter.export_batch()
+        tx_importer = TransactionImporter(import_path=self.import_path)
+        batch = tx_importer.import_batch(filename=batch.filename)
+        tx_deserializer = TransactionDeserializer(
+            allow_self=True, override_role=NODE_SERVER, batch_size=2)
+        tx_deserializer.deserialize_transactions(
+            transactions=batch.saved_transactions)
+        self.assertEqual(TestModel.objects.get(f1='model1').f2, 'updated')
+        self.assertEqual(TestModel.objects.filter(f1='model2').count(), 1)
+        for transaction in batch.saved_transactions:
+            self.assertTrue(transaction.is_consumed)
+
+    def test_bulk_save_writes_parents_first(self):
+        """Asserts a child buffered before its new parent is written
+        after it.
+        """
+        test_model = TestModel(f1='model1')
+        child = TestModelWithFkProtected(f1='f1', test_model=test_model)
+        with patch('edc_sync.transaction.transaction_deserializer.upsert',
+                   return_value=True) as upsert:
+            bulk_save(objects=[(child, None), (test_model, None)], using='default')
+        self.assertEqual(
+            [call[1]['model'] for call in upsert.call_args_list],
+            [TestModel, TestModelWithFkProtected])
+
+    def test_bulk_save_unique_clash_raises(self):
+        """Asserts a new instance with the natural key of another
+        is not written over it.
+        """
+        existing = TestModel.objects.create(f1='model1', f2='existing')
+        with self.assertRaises(IntegrityError):
+            bulk_save(objects=[(TestModel(f1='model1', f2='new'), None)],
+                      using='default')
+        self.assertEqual(TestModel.objects.get(pk=existing.pk).f2, 'existing')
+
     def test_deserialized_with_history(self):
         """Asserts correctly deserialized model with history.
         """
@@ -376,3 +501,18 @@ class TestDeserializer3(TestCase):
                 transactions=[self.obj])
         except DeserializationError:
             self.fail('DeserializationError unexpectedly raised')
+
+    def test_custom_field_parser_declared_in_apps_fixes_date(self):
+        app_config = django_apps.get_app_config('edc_sync')
+        app_config.custom_field_parsers = [
+            FieldParser(model='edc_sync.testmodeldates', field='f2',
+                        func=datetime_to_date)]
+        django_apps.app_configs['edc_sync'] = app_config
+        tx_deserializer = TransactionDeserializer(
+            allow_self=True, override_role=NODE_SERVER)
+        try:
+            tx_deserializer.deserialize_transactions(
+                transactions=[self.obj])
+        except DeserializationError:
+            self.fail('DeserializationError unexpectedly raised')
+        self.assertEqual(TestModelDates.objects.get().f2, self.date.date())
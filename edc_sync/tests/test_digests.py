@@ -0,0 +1,133 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, tag
+from django.urls import reverse
+from edc_device.constants import NODE_SERVER
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..outgoing_log.backends import AppendedDigests
+from ..site_sync_models import site_sync_models
+from ..transaction import TransactionDeserializer, get_digest
+from ..transaction.digests import get_last_digests
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel
+from .test_push import ClientSession
+
+
+class TestDigests(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+
+    def test_digest_ignores_excluded_fields(self):
+        json_text = '[{"model": "a.b", "pk": "1", "fields": {"f1": "x", "modified": "%s"}}]'
+        self.assertEqual(
+            get_digest(json_text % '1', exclude_fields=['modified']),
+            get_digest(json_text % '2', exclude_fields=['modified']))
+        self.assertNotEqual(get_digest(json_text % '1'), get_digest(json_text % '2'))
+
+    def test_repeated_push_not_saved_twice(self):
+        TestModel.objects.using('client').create(f1='model1')
+        pusher = TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            session=ClientSession(User.objects.create(username='erik')))
+        pusher.push()
+        OutgoingTransaction.objects.using('client').update(is_consumed_server=False)
+        pusher.push()
+        self.assertEqual(IncomingTransaction.objects.count(), 2)
+        self.assertFalse(OutgoingTransaction.objects.using('client').filter(
+            is_consumed_server=False).exists())
+
+    def receive(self, outgoing_transaction=None, tx_digest=None):
+        """Returns an outgoing transaction saved as an incoming one.
+        """
+        return IncomingTransaction.objects.create(
+            tx=outgoing_transaction.tx, tx_name=outgoing_transaction.tx_name,
+            tx_pk=outgoing_transaction.tx_pk, tx_digest=tx_digest,
+            timestamp=outgoing_transaction.timestamp,
+            producer=outgoing_transaction.producer,
+            action=outgoing_transaction.action)
+
+    def test_duplicate_not_applied(self):
+        TestModel.objects.using('client').create(f1='model1')
+        outgoing_transaction = OutgoingTransaction.objects.using('client').get(
+            tx_name='edc_sync.testmodel')
+        self.assertTrue(outgoing_transaction.tx_digest)
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        tx_deserializer.deserialize_transactions(transactions=[self.receive(
+            outgoing_transaction, tx_digest=outgoing_transaction.tx_digest)])
+        self.assertEqual(tx_deserializer.consumed_count, 1)
+        duplicate = self.receive(
+            outgoing_transaction, tx_digest=outgoing_transaction.tx_digest)
+        tx_deserializer.deserialize_transactions(
+            transactions=IncomingTransaction.objects.filter(pk=duplicate.pk))
+        self.assertEqual(tx_deserializer.skipped_count, 1)
+        self.assertEqual(tx_deserializer.consumed_count, 0)
+        duplicate.refresh_from_db()
+        self.assertTrue(duplicate.is_consumed)
+
+    def test_without_digest_applied(self):
+        """Asserts a transaction without a digest, e.g. from a producer
+        older than tx_digest, is never taken for a duplicate.
+        """
+        TestModel.objects.using('client').create(f1='model1')
+        outgoing_transaction = OutgoingTransaction.objects.using('client').get(
+            tx_name='edc_sync.testmodel')
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        tx_deserializer.deserialize_transactions(
+            transactions=[self.receive(outgoing_transaction)])
+        tx_deserializer.deserialize_transactions(
+            transactions=[self.receive(outgoing_transaction)])
+        self.assertEqual(tx_deserializer.skipped_count, 0)
+        self.assertEqual(tx_deserializer.consumed_count, 1)
+
+    def test_last_digests_one_row_per_instance(self):
+        TestModel.objects.using('client').create(f1='model1')
+        outgoing_transaction = OutgoingTransaction.objects.using('client').get(
+            tx_name='edc_sync.testmodel')
+        key = (outgoing_transaction.tx_name, str(outgoing_transaction.tx_pk))
+        first = self.receive(outgoing_transaction, tx_digest='a')
+        IncomingTransaction.objects.filter(pk=first.pk).update(is_consumed=True)
+        last = self.receive(outgoing_transaction, tx_digest='b')
+        IncomingTransaction.objects.filter(pk=last.pk).update(
+            timestamp=str(int(first.timestamp) + 1))
+        self.assertEqual(get_last_digests(keys=[key]), {key: 'b'})
+        self.assertEqual(get_last_digests(keys=[key], applied=True), {key: None})
+        self.assertEqual(get_last_digests(keys=[key], is_consumed=True), {key: 'a'})
+
+    def test_revert_in_one_transaction_logged(self):
+        """Asserts A -> B -> A in one atomic block logs every change.
+        """
+        with transaction.atomic(using='client'):
+            test_model = TestModel.objects.using('client').create(f1='model1')
+            test_model.f2 = 'changed'
+            test_model.save(using='client')
+            test_model.f2 = None
+            test_model.save(using='client')
+            test_model.save(using='client')
+        self.assertEqual(OutgoingTransaction.objects.using('client').filter(
+            tx_name='edc_sync.testmodel').count(), 3)
+
+    def test_appended_digests_dropped_on_rollback(self):
+        appended_digests = AppendedDigests()
+        key = ('edc_sync.testmodel', '1')
+        with transaction.atomic(using='client'):
+            appended_digests.add(key=key, digest='a', using='client')
+            try:
+                with transaction.atomic(using='client'):
+                    appended_digests.add(key=key, digest='b', using='client')
+                    self.assertEqual(
+                        appended_digests.get(key=key, using='client'), (True, 'b'))
+                    raise ValueError
+            except ValueError:
+                pass
+            self.assertEqual(
+                appended_digests.get(key=key, using='client'), (True, 'a'))
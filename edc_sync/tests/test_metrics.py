@@ -0,0 +1,60 @@
+from django.test import TestCase, tag
+from django.urls import reverse
+
+from ..metrics import Counter, Histogram, MetricsRegistry
+from ..metrics import outgoing_transactions_total, collect_queue_depth
+from ..site_sync_models import site_sync_models
+from .models import TestModel
+
+
+class TestMetrics(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+
+    def test_counter_renders(self):
+        registry = MetricsRegistry()
+        counter = registry.register(Counter(
+            name='test_total', help_text='A counter.', labelnames=['model']))
+        counter.inc(model='edc_sync.testmodel')
+        counter.inc(model='edc_sync.testmodel')
+        self.assertIn(
+            'test_total{model="edc_sync.testmodel"} 2.0', registry.render())
+
+    def test_histogram_renders(self):
+        registry = MetricsRegistry()
+        histogram = registry.register(Histogram(
+            name='test_seconds', help_text='A histogram.', buckets=[0.1, 1.0]))
+        histogram.observe(0.5)
+        text = registry.render()
+        self.assertIn('test_seconds_bucket{le="0.1"} 0.0', text)
+        self.assertIn('test_seconds_bucket{le="1.0"} 1.0', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 1.0', text)
+        self.assertIn('test_seconds_count 1.0', text)
+
+    def test_outgoing_transaction_counted(self):
+        before = outgoing_transactions_total.get(
+            model='edc_sync.testmodel', action='I') or 0
+        TestModel.objects.using('client').create(f1='model1')
+        self.assertEqual(
+            outgoing_transactions_total.get(
+                model='edc_sync.testmodel', action='I'), before + 1)
+
+    def test_metrics_view(self):
+        TestModel.objects.create(f1='model1')
+        collect_queue_depth.collected = None
+        response = self.client.get(reverse('edc_sync:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'edc_sync_outgoing_pending{producer=', response.content)
+
+    def test_samples_copied_under_lock(self):
+        counter = Counter(name='test_total', help_text='A counter.', labelnames=['model'])
+        counter.inc(model='a')
+        samples = counter.samples()
+        next(samples)
+        counter.inc(model='b')
+        self.assertEqual(list(samples), [])
@@ -0,0 +1,119 @@
+import os
+import tempfile
+
+from django.test import TestCase, TransactionTestCase, tag, override_settings
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..outgoing_log import SegmentedFileBackend, SegmentImporter, Record
+from ..outgoing_log import get_outgoing_log, OutgoingLogError
+from ..transaction.transaction_pusher import TransactionPusher
+from ..site_sync_models import site_sync_models
+from .models import TestModel
+
+
+class TestSegmentedFileBackend(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.backend = SegmentedFileBackend(
+            path=self.path, segment_size=200, fsync=False)
+
+    def record(self, i):
+        return Record(
+            tx=f'cipher{i}'.encode(), tx_name='edc_sync.testmodel',
+            tx_pk='d0b9ef9c-5f4b-4f0b-8e2b-5c1e2f9c2c2d',
+            timestamp=f'2017010110000000000{i}', producer='host-default',
+            action='I', using='default')
+
+    def test_write_and_read_in_order(self):
+        seqs = [self.backend.write(self.record(i)) for i in range(5)]
+        self.assertEqual(seqs, [0, 1, 2, 3, 4])
+        self.assertEqual(
+            [r.tx for r in self.backend.records()],
+            [f'cipher{i}'.encode() for i in range(5)])
+        self.assertEqual(
+            [r.seq for r in self.backend.records(from_seq=3)], [3, 4])
+
+    def test_segments_rotate_by_size(self):
+        for i in range(5):
+            self.backend.write(self.record(i))
+        self.assertGreater(len(self.backend.sealed_segments()), 1)
+        segments = self.backend.segments()
+        self.assertEqual(
+            [s.first_seq for s in segments[1:]],
+            [s.next_seq for s in segments[:-1]])
+
+    def test_ship_sealed_segments(self):
+        for i in range(5):
+            self.backend.write(self.record(i))
+        self.backend.seal()
+        export_path = tempfile.mkdtemp()
+        shipped = self.backend.ship(export_path=export_path)
+        self.assertTrue(shipped)
+        self.assertFalse(self.backend.sealed_segments())
+        for filename in shipped:
+            self.assertTrue(os.path.exists(os.path.join(export_path, filename)))
+
+    def test_ship_twice_does_not_overwrite(self):
+        export_path = tempfile.mkdtemp()
+        shipped = []
+        for i in range(2):
+            self.backend.write(self.record(i))
+            self.backend.seal()
+            shipped.extend(self.backend.ship(export_path=export_path))
+        self.assertEqual(len(shipped), 2)
+        self.assertEqual(len(set(shipped)), 2)
+        self.assertEqual(self.backend.open_segment().first_seq, 2)
+        importer = SegmentImporter(import_path=export_path)
+        self.assertEqual(
+            [s.first_seq for s in importer.segments()], [0, 1])
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.path, 'shipped'))), 4)
+
+    def test_segment_filenames_include_producer(self):
+        export_path = tempfile.mkdtemp()
+        other = SegmentedFileBackend(
+            path=tempfile.mkdtemp(), segment_size=200, fsync=False,
+            producer='host-other')
+        for backend in [self.backend, other]:
+            backend.write(self.record(0))
+            backend.seal()
+            backend.ship(export_path=export_path)
+        self.assertEqual(len(os.listdir(export_path)), 4)
+        self.assertIn('host-other-00000000000000000000.log',
+                      os.listdir(export_path))
+
+
+class TestSegmentedFileBackendSync(TransactionTestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        self.path = tempfile.mkdtemp()
+
+    def test_export_import(self):
+        with override_settings(EDC_SYNC_OUTGOING_LOG={
+                'BACKEND': 'edc_sync.outgoing_log.SegmentedFileBackend',
+                'OPTIONS': {'path': self.path}}):
+            TestModel.objects.using('client').create(f1='model1')
+            self.assertFalse(OutgoingTransaction.objects.using('client').exists())
+            outgoing_log = get_outgoing_log()
+            outgoing_log.seal()
+            export_path = tempfile.mkdtemp()
+            outgoing_log.ship(export_path=export_path)
+        importer = SegmentImporter(import_path=export_path)
+        self.assertEqual(importer.import_segments(), 2)
+        self.assertEqual(IncomingTransaction.objects.filter(
+            tx_name='edc_sync.testmodel').count(), 1)
+        self.assertEqual(SegmentImporter(import_path=export_path).import_segments(), 0)
+
+    def test_push_rejected(self):
+        with override_settings(EDC_SYNC_OUTGOING_LOG={
+                'BACKEND': 'edc_sync.outgoing_log.SegmentedFileBackend',
+                'OPTIONS': {'path': self.path}}):
+            self.assertRaises(
+                OutgoingLogError, TransactionPusher,
+                url='http://localhost:8000', using='client')
@@ -2,7 +2,8 @@ from django.core import serializers
 from django.test import TestCase, tag
 
 from ..transaction import deserialize
-from ..parsers import datetime_to_date_parser
+from ..parsers import datetime_to_date_parser, datetime_to_date, FieldParser
+from ..parsers import get_parsers_by_model
 from .models import TestModelDates
 
 
@@ -46,3 +47,29 @@ class TestParsers(TestCase):
         obj = TestModelDates.objects.create()
         json_text = serializers.serialize('json', [obj])
         self.assertEqual(json_text, datetime_to_date_parser(json_text))
+
+    def test_field_parser(self):
+        fields = {'f2': '2017-01-01T10:10:10.000Z', 'f3': '2017-01-01T10:10:10.000Z'}
+        FieldParser(
+            model='edc_sync.testmodeldates', field='f2', func=datetime_to_date)(fields)
+        self.assertEqual(fields['f2'], '2017-01-01')
+        self.assertEqual(fields['f3'], '2017-01-01T10:10:10.000Z')
+
+    def test_field_parser_with_null(self):
+        fields = {'f2': None}
+        FieldParser(
+            model='edc_sync.testmodeldates', field='f2', func=datetime_to_date)(fields)
+        self.assertIsNone(fields['f2'])
+
+    def test_field_parser_with_bad_fieldname(self):
+        fields = {'f2': '2017-01-01T10:10:10.000Z'}
+        FieldParser(
+            model='edc_sync.testmodeldates', field='blah', func=datetime_to_date)(fields)
+        self.assertEqual(fields, {'f2': '2017-01-01T10:10:10.000Z'})
+
+    def test_parsers_by_model(self):
+        field_parser = FieldParser(
+            model='edc_sync.testmodeldates', field='f2', func=datetime_to_date)
+        parsers_by_model = get_parsers_by_model([field_parser])
+        self.assertEqual(parsers_by_model, {'edc_sync.testmodeldates': [field_parser]})
+        self.assertIsNone(parsers_by_model.get('edc_sync.testmodel'))
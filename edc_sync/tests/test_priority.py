@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, tag
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..constants import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+from ..models import OutgoingTransaction
+from ..site_sync_models import site_sync_models
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel, TestModelDates, TestModelWithFkProtected
+
+
+class TestPriority(TestCase):
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel', 'edc_sync.testmodeldates'])
+        site_sync_models.register(
+            ['edc_sync.testmodelwithfkprotected'], priority=PRIORITY_HIGH)
+
+    def test_priorities(self):
+        self.assertEqual(
+            site_sync_models.get_priority('edc_sync.testmodelwithfkprotected'), PRIORITY_HIGH)
+        self.assertEqual(
+            site_sync_models.get_priority('edc_sync.testmodeldates'), PRIORITY_NORMAL)
+        self.assertEqual(
+            site_sync_models.get_priority('edc_sync.historicaltestmodel'), PRIORITY_LOW)
+
+    def test_parent_raised_to_child_priority(self):
+        self.assertEqual(
+            site_sync_models.get_priority('edc_sync.testmodel'), PRIORITY_HIGH)
+
+    def test_outgoing_transaction_priority(self):
+        TestModelDates.objects.create(f1='model1')
+        self.assertEqual(
+            OutgoingTransaction.objects.get(tx_name='edc_sync.testmodeldates').priority,
+            PRIORITY_NORMAL)
+
+    def test_pending_drains_higher_lanes_first(self):
+        TestModelDates.objects.create(f1='model1')
+        test_model = TestModel.objects.create(f1='model1')
+        TestModelWithFkProtected.objects.create(f1='model1', test_model=test_model)
+        pending = TransactionPusher(url='http://server').pending
+        self.assertEqual(
+            [obj.tx_name for obj in pending][:2],
+            ['edc_sync.testmodel', 'edc_sync.testmodelwithfkprotected'])
+        self.assertEqual(
+            [obj.priority for obj in pending],
+            sorted([obj.priority for obj in pending], reverse=True))
+
+    def test_lane_depth(self):
+        TestModelDates.objects.create(f1='model1')
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create(username='erik'))
+        response = client.get(reverse('edc_sync:transaction-count'))
+        self.assertEqual(
+            response.data.get('outgoingtransaction_lanes'),
+            {PRIORITY_NORMAL: 1})
@@ -0,0 +1,97 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, tag
+from django.urls import reverse
+from edc_device.constants import NODE_SERVER
+
+from ..models import OutgoingTransaction, IncomingTransaction, ProducerSyncSummary
+from ..producer_summary import rebuild
+from ..site_sync_models import site_sync_models
+from ..transaction import TransactionDeserializer
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel
+from .test_push import ClientSession
+
+
+class TestProducerSummary(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        TestModel.objects.using('client').create(f1='model1')
+        self.pusher = TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            session=ClientSession(User.objects.create(username='erik')))
+
+    def test_updated_on_ingest(self):
+        self.pusher.push()
+        summary = ProducerSyncSummary.objects.get()
+        oldest = IncomingTransaction.objects.order_by('timestamp').first()
+        self.assertEqual(summary.producer, oldest.producer)
+        self.assertEqual(summary.pending_count, 2)
+        self.assertEqual(summary.oldest_pending_timestamp, oldest.timestamp)
+        self.assertIsNotNone(summary.last_received_datetime)
+        self.assertIsNone(summary.last_applied_datetime)
+
+    def test_updated_on_apply(self):
+        self.pusher.push()
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        tx_deserializer.deserialize_transactions(
+            transactions=IncomingTransaction.objects.filter(
+                is_consumed=False).order_by('timestamp'))
+        summary = ProducerSyncSummary.objects.get()
+        self.assertEqual(summary.pending_count, 0)
+        self.assertIsNone(summary.oldest_pending_timestamp)
+        self.assertIsNotNone(summary.last_applied_datetime)
+        self.assertEqual(summary.error_count, 0)
+
+    def test_updated_on_save(self):
+        """Asserts transactions saved outside of the ingest views,
+        e.g. by edc_sync_files, are counted.
+        """
+        self.pusher.push()
+        transaction = IncomingTransaction.objects.order_by('timestamp').first()
+        IncomingTransaction.objects.create(
+            tx=transaction.tx, tx_name=transaction.tx_name, tx_pk=transaction.tx_pk,
+            timestamp=transaction.timestamp, producer=transaction.producer,
+            action=transaction.action)
+        self.assertEqual(ProducerSyncSummary.objects.get().pending_count, 3)
+
+    def test_error_count_decremented_on_retry(self):
+        self.pusher.push()
+        IncomingTransaction.objects.filter(tx_name='edc_sync.testmodel').update(
+            tx=b'not encrypted')
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        transaction = IncomingTransaction.objects.get(tx_name='edc_sync.testmodel')
+        tx_deserializer.quarantine(transaction, 'bad payload')
+        tx_deserializer.quarantine(transaction, 'bad payload')
+        tx_deserializer.summary.save()
+        self.assertEqual(ProducerSyncSummary.objects.get().error_count, 1)
+        tx_deserializer.consume(transaction)
+        tx_deserializer.summary.save()
+        summary = ProducerSyncSummary.objects.get()
+        self.assertEqual(summary.error_count, 0)
+        self.assertEqual(summary.pending_count, 1)
+        self.assertFalse(IncomingTransaction.objects.get(pk=transaction.pk).is_error)
+        rebuild()
+        self.assertEqual(ProducerSyncSummary.objects.get().error_count, 0)
+
+    def test_rebuild(self):
+        self.pusher.push()
+        ProducerSyncSummary.objects.all().delete()
+        self.assertEqual(rebuild(), 1)
+        self.assertEqual(ProducerSyncSummary.objects.get().pending_count, 2)
+
+    def test_report_reads_summary(self):
+        self.pusher.push()
+        User.objects.create_user(username='reporter', password='pass')
+        self.client.login(username='reporter', password='pass')
+        response = self.client.get(reverse('edc_sync:sync-report'))
+        self.assertEqual(
+            [row.pending_count for row in response.context['object_list']], [2])
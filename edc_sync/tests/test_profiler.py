@@ -0,0 +1,48 @@
+from io import StringIO
+
+from django.test import TestCase, tag
+
+from ..models import OutgoingTransaction
+from ..profiler import DeserializeProfiler
+from ..site_sync_models import site_sync_models
+from .models import TestModel
+
+
+class TestProfiler(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+
+    def test_stage_records_time_and_queries(self):
+        with DeserializeProfiler(stdout=StringIO()) as profiler:
+            with profiler.stage('save', 'edc_sync.testmodel'):
+                TestModel.objects.create(f1='model1')
+        stats = profiler.by_tx_name()['edc_sync.testmodel']
+        self.assertEqual(stats.count, 1)
+        self.assertGreater(stats.seconds, 0)
+        self.assertGreaterEqual(stats.queries, 2)
+        self.assertEqual(profiler.by_stage()['save'].queries, stats.queries)
+
+    def test_summary_ranks_by_time(self):
+        with DeserializeProfiler(stdout=StringIO()) as profiler:
+            with profiler.stage('decrypt', 'edc_sync.testmodel'):
+                pass
+            with profiler.stage('save', 'edc_sync.testmodel'):
+                OutgoingTransaction.objects.count()
+        summary = profiler.summary()
+        self.assertLess(summary.index('save'), summary.index('decrypt'))
+
+    def test_memory_traced_only_if_asked(self):
+        with DeserializeProfiler(stdout=StringIO()) as profiler:
+            with profiler.stage('save', 'edc_sync.testmodel'):
+                [object() for _ in range(1000)]
+        self.assertEqual(profiler.by_stage()['save'].memory, 0)
+        with DeserializeProfiler(stdout=StringIO(), trace_memory=True) as profiler:
+            with profiler.stage('save', 'edc_sync.testmodel'):
+                objects = [object() for _ in range(1000)]
+        self.assertGreater(profiler.by_stage()['save'].memory, 0)
+        self.assertTrue(objects)
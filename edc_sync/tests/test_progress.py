@@ -0,0 +1,69 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, tag
+from django.urls import reverse
+
+from ..progress import ProgressReporter, get_progress, FINISHED, RUNNING
+from ..views import ProgressStreamView
+
+
+class TestProgress(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reporter(self):
+        progress = ProgressReporter(job='push', interval=0)
+        progress.add(host='server:8000', count=10, bytes=1000)
+        progress.add(host='server:8000', count=5, bytes=500)
+        data = get_progress('push')
+        self.assertEqual(data.get('status'), RUNNING)
+        self.assertEqual(data['hosts']['server:8000']['count'], 15)
+        self.assertEqual(data['hosts']['server:8000']['bytes'], 1500)
+        self.assertGreater(data['hosts']['server:8000']['count_per_second'], 0)
+
+    def test_reporter_throttled(self):
+        progress = ProgressReporter(job='push', interval=60)
+        progress.add(host='server:8000', count=10, bytes=1000)
+        self.assertEqual(get_progress('push').get('hosts'), {})
+        progress.finish()
+        self.assertEqual(get_progress('push')['hosts']['server:8000']['count'], 10)
+
+    def test_stream_events(self):
+        progress = ProgressReporter(job='deserialize')
+        progress.add(host='bcpp010-default', count=1, bytes=100)
+        progress.finish()
+        view = ProgressStreamView(poll_interval=0, max_duration=1)
+        events = list(view.events(['deserialize', 'push']))
+        self.assertEqual(len(events), 2)
+        data = json.loads(events[0][len('data: '):])
+        self.assertEqual(list(data), ['deserialize'])
+        self.assertEqual(data['deserialize'].get('status'), FINISHED)
+        self.assertEqual(data['deserialize']['hosts']['bcpp010-default']['count'], 1)
+        self.assertTrue(events[1].startswith('event: idle'))
+
+    def test_stream_ends_when_no_job_running(self):
+        view = ProgressStreamView(poll_interval=0, max_duration=60)
+        events = list(view.events(['push']))
+        self.assertEqual(events, ['event: idle\ndata: {}\n\n'])
+
+    def test_stream_response(self):
+        User.objects.create_user(username='erik', password='pass')
+        self.client.login(username='erik', password='pass')
+        ProgressReporter(job='push').finish()
+        response = self.client.get(reverse('edc_sync:progress'), {'job': 'push'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn(b'"status": "finished"', b''.join(response.streaming_content))
+
+    def test_json_response(self):
+        User.objects.create_user(username='erik', password='pass')
+        self.client.login(username='erik', password='pass')
+        ProgressReporter(job='push')
+        response = self.client.get(
+            reverse('edc_sync:progress'),
+            {'job': ['push', 'deserialize'], 'format': 'json'})
+        data = response.json()
+        self.assertEqual(data['push'].get('status'), RUNNING)
+        self.assertIsNone(data['deserialize'])
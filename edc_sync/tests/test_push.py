@@ -0,0 +1,101 @@
+import gzip
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, tag
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..queue_version import get_version, OUTGOING
+from ..site_sync_models import site_sync_models
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel
+
+
+class ClientSession:
+    """A requests.Session-like wrapper of the DRF test client.
+    """
+
+    def __init__(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.requests = 0
+
+    def post(self, url, data=None, timeout=None):
+        self.requests += 1
+        response = self.client.post(
+            url, data=data, content_type='application/json',
+            HTTP_CONTENT_ENCODING='gzip')
+        response.raise_for_status = lambda: None
+        response.json = lambda: json.loads(response.content.decode())
+        response.headers = dict(response.items())
+        return response
+
+
+class TestPush(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        self.user = User.objects.create(username='erik')
+        self.url = reverse('edc_sync:incomingtransaction-batch')
+
+    def test_batch_view_accepts_gzip(self):
+        TestModel.objects.using('client').create(f1='model1')
+        outgoing = OutgoingTransaction.objects.using('client').all()
+        pusher = TransactionPusher(
+            url=self.url, using='client', session=ClientSession(self.user))
+        accepted = pusher.post(list(outgoing))
+        self.assertEqual(
+            sorted(accepted), sorted(str(obj.pk) for obj in outgoing))
+        self.assertEqual(IncomingTransaction.objects.count(), outgoing.count())
+
+    def test_batch_view_keeps_producer_pk(self):
+        """Asserts a batch sent again after a lost response is not
+        saved twice.
+        """
+        TestModel.objects.using('client').create(f1='model1')
+        outgoing = list(OutgoingTransaction.objects.using('client').all())
+        pusher = TransactionPusher(
+            url=self.url, using='client', session=ClientSession(self.user))
+        pusher.post(outgoing)
+        accepted = pusher.post(outgoing)
+        self.assertEqual(
+            sorted(accepted), sorted(str(obj.pk) for obj in outgoing))
+        self.assertEqual(
+            sorted(str(pk) for pk in IncomingTransaction.objects.values_list('pk', flat=True)),
+            sorted(str(obj.pk) for obj in outgoing))
+
+    def test_batch_view_requires_authentication(self):
+        response = APIClient().post(
+            self.url, data=gzip.compress(b'[]'), content_type='application/json',
+            HTTP_CONTENT_ENCODING='gzip')
+        self.assertIn(response.status_code, [401, 403])
+
+    def test_push_in_batches(self):
+        for i in range(5):
+            TestModel.objects.using('client').create(f1=f'model{i}')
+        session = ClientSession(self.user)
+        pusher = TransactionPusher(
+            url=self.url, using='client', batch_size=3, session=session)
+        self.assertEqual(pusher.push(), 10)
+        self.assertEqual(session.requests, 4)
+        self.assertFalse(OutgoingTransaction.objects.using('client').filter(
+            is_consumed_server=False).exists())
+        self.assertEqual(IncomingTransaction.objects.count(), 10)
+
+    def test_push_bumps_producer_queue_version(self):
+        TestModel.objects.using('client').create(f1='model1')
+        producer = OutgoingTransaction.objects.using('client').first().producer
+        cache.clear()
+        pusher = TransactionPusher(
+            url=self.url, using='client', session=ClientSession(self.user))
+        pusher.push()
+        self.assertGreater(get_version(OUTGOING, producer), 0)
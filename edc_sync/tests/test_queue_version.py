@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.test import TestCase, tag
+from django.urls import reverse
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from ..models import OutgoingTransaction
+from ..queue_version import bump, get_version, OUTGOING
+from ..site_sync_models import site_sync_models
+from .models import TestModel
+
+
+class TestQueueVersion(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        self.client = APIClient()
+        self.url = reverse('edc_sync:transaction-count')
+
+    def test_bump(self):
+        bump(OUTGOING, producer='host-default')
+        bump(OUTGOING, producer='host-default')
+        self.assertEqual(get_version(OUTGOING), 2)
+        self.assertEqual(get_version(OUTGOING, 'host-default'), 2)
+        self.assertEqual(get_version(OUTGOING, 'other-default'), 0)
+
+    def test_bumped_on_save(self):
+        TestModel.objects.create(f1='model1')
+        self.assertEqual(get_version(OUTGOING), OutgoingTransaction.objects.count())
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        TestModel.objects.create(f1='model1')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data.get('outgoingtransaction_count'), 2)
+
+    def test_long_poll_times_out(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(
+            self.url, {'wait': '0.1'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_filtered_by_producer(self):
+        TestModel.objects.create(f1='model1')
+        producer = OutgoingTransaction.objects.first().producer
+        OutgoingTransaction.objects.filter(
+            pk=OutgoingTransaction.objects.first().pk).update(producer='other-default')
+        self.client.force_authenticate(user=User.objects.create(username='erik'))
+        url = reverse('edc_sync:outgoingtransaction-list')
+        response = self.client.get(url, {'producer': 'other-default'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tx['producer'] for tx in response.data], ['other-default'])
+        response = self.client.get(url, {'producer': producer})
+        self.assertEqual(len(response.data), OutgoingTransaction.objects.count() - 1)
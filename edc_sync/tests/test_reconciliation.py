@@ -0,0 +1,130 @@
+import json
+
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, tag
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..reconciliation import MerkleTree, Reconciler
+from ..site_sync_models import site_sync_models
+from ..transaction.transaction_pusher import TransactionPusher, TransactionPusherThrottled
+from .models import TestModel
+
+
+class ClientSession:
+    """A requests.Session-like wrapper of the DRF test client.
+    """
+
+    def __init__(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+
+    def wrap(self, response):
+        response.raise_for_status = lambda: None
+        response.json = lambda: json.loads(response.content.decode())
+        response.headers = dict(response.items())
+        return response
+
+    def get(self, url, params=None, timeout=None):
+        return self.wrap(self.client.get(url, data=params))
+
+    def post(self, url, data=None, timeout=None):
+        return self.wrap(self.client.post(
+            url, data=data, content_type='application/json',
+            HTTP_CONTENT_ENCODING='gzip'))
+
+
+class TestMerkleTree(TestCase):
+
+    keys = [
+        ('20170101100000000001', 'a'),
+        ('20170101100000000002', 'b'),
+        ('20170102110000000001', 'c'),
+        ('20170301090000000001', 'd')]
+
+    def test_same_keys_same_root(self):
+        self.assertEqual(
+            MerkleTree(self.keys).hashes[''],
+            MerkleTree(list(reversed(self.keys))).hashes[''])
+
+    def test_missing_key_changes_path_only(self):
+        tree = MerkleTree(self.keys)
+        other = MerkleTree(self.keys[:-1])
+        self.assertNotEqual(tree.hashes[''], other.hashes[''])
+        self.assertEqual(tree.hashes['201701'], other.hashes['201701'])
+        self.assertNotIn('201703', other.hashes)
+
+    def test_leaf_children_are_keys(self):
+        tree = MerkleTree(self.keys)
+        self.assertEqual(
+            tree.children('2017010110'),
+            ['20170101100000000001:a', '20170101100000000002:b'])
+        self.assertEqual(list(tree.children('')), ['2017'])
+
+
+class TestReconciliation(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        self.user = User.objects.create(username='erik')
+        self.session = ClientSession(self.user)
+        self.pusher = TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'),
+            using='client', session=self.session)
+        for i in range(3):
+            TestModel.objects.using('client').create(f1=f'model{i}')
+        self.pusher.push()
+        self.reconciler = Reconciler(
+            url=reverse('edc_sync:reconcile'), pusher=self.pusher)
+
+    def test_nothing_missing(self):
+        self.assertEqual(self.reconciler.missing(), [])
+        self.assertEqual(self.reconciler.round_trips, 1)
+
+    def test_resends_only_missing(self):
+        outgoing = OutgoingTransaction.objects.using('client').first()
+        IncomingTransaction.objects.filter(tx_pk=outgoing.tx_pk).delete()
+        self.assertEqual(
+            self.reconciler.missing(),
+            [f'{outgoing.timestamp}:{outgoing.tx_pk}'])
+        self.assertEqual(self.reconciler.resend(), 1)
+        self.assertEqual(IncomingTransaction.objects.count(), 6)
+        self.assertEqual(self.reconciler.missing(), [])
+
+    def test_duplicates_accepted_at_ingest_not_missing(self):
+        outgoing = OutgoingTransaction.objects.using('client').filter(
+            tx_name='edc_sync.testmodel').first()
+        outgoing.pk = None
+        outgoing.id = None
+        outgoing.action = 'U'
+        outgoing.timestamp = f'{int(outgoing.timestamp) + 1}'
+        outgoing.is_consumed_server = False
+        outgoing.save(using='client')
+        self.pusher.push()
+        self.assertTrue(IncomingTransaction.objects.get(pk=outgoing.pk).is_ignored)
+        self.assertEqual(self.reconciler.missing(), [])
+
+    def test_resend_retries_when_throttled(self):
+        outgoing = OutgoingTransaction.objects.using('client').first()
+        IncomingTransaction.objects.filter(tx_pk=outgoing.tx_pk).delete()
+        post = self.pusher.post
+        responses = [TransactionPusherThrottled(retry_after=1)]
+
+        def throttled_once(batch):
+            if responses:
+                raise responses.pop()
+            return post(batch)
+
+        with patch.object(self.pusher, 'post', side_effect=throttled_once):
+            with patch.object(self.pusher.throttle, 'sleep') as sleep:
+                self.assertEqual(self.reconciler.resend(), 1)
+        sleep.assert_called_once_with(1)
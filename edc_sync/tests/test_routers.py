@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, tag, override_settings
+
+from ..models import OutgoingTransaction
+from ..routers import TransactionRouter, get_transaction_using
+from ..site_sync_models import site_sync_models
+from .models import TestModel
+
+
+@override_settings(EDC_SYNC_TRANSACTION_DATABASES={'default': 'server'})
+class TestTransactionRouter(TestCase):
+
+    def setUp(self):
+        self.router = TransactionRouter()
+
+    def test_get_transaction_using(self):
+        self.assertEqual(get_transaction_using('default'), 'server')
+        self.assertEqual(get_transaction_using('client'), 'client')
+
+    def test_db_for_write(self):
+        self.assertEqual(self.router.db_for_write(OutgoingTransaction), 'server')
+        self.assertIsNone(self.router.db_for_write(TestModel))
+
+    def test_allow_migrate(self):
+        self.assertTrue(self.router.allow_migrate(
+            'server', 'edc_sync', 'outgoingtransaction'))
+        self.assertFalse(self.router.allow_migrate(
+            'default', 'edc_sync', 'outgoingtransaction'))
+        self.assertFalse(self.router.allow_migrate(
+            'server', 'edc_sync', 'testmodel'))
+        self.assertTrue(self.router.allow_migrate('server', 'sites', 'site'))
+        self.assertIsNone(self.router.allow_migrate(
+            'client', 'edc_sync', 'testmodel'))
+
+
+@override_settings(EDC_SYNC_TRANSACTION_DATABASES={'client': 'server'})
+class TestTransactionLogOnCommit(TransactionTestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+
+    def test_written_to_log_alias(self):
+        TestModel.objects.using('client').create(f1='model1')
+        self.assertFalse(OutgoingTransaction.objects.using('client').exists())
+        self.assertTrue(OutgoingTransaction.objects.using('server').filter(
+            tx_name='edc_sync.testmodel').exists())
+
+    def test_written_on_commit(self):
+        with transaction.atomic(using='client'):
+            TestModel.objects.using('client').create(f1='model1')
+            self.assertFalse(OutgoingTransaction.objects.using('server').exists())
+        self.assertTrue(OutgoingTransaction.objects.using('server').exists())
+
+    def test_not_written_on_rollback(self):
+        try:
+            with transaction.atomic(using='client'):
+                TestModel.objects.using('client').create(f1='model1')
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertFalse(OutgoingTransaction.objects.using('server').exists())
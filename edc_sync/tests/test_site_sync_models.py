@@ -1,3 +1,8 @@
+import io
+
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
 from django.contrib.auth.models import User
 from django.test import TestCase, tag
 from edc_base.site_models import SiteModelAlreadyRegistered, SiteModelNotRegistered
@@ -48,3 +53,26 @@ class TestSiteSyncModels(TestCase):
         self.assertRaises(
             AttributeError,
             site_sync_models.get_wrapped_instance)
+
+    def test_unregistered_model_save_skips_receivers(self):
+        with patch.object(site_sync_models, 'get_wrapped_instance') as get_wrapped:
+            User.objects.create(username='erik')
+        get_wrapped.assert_not_called()
+
+    def test_registered_model_save_calls_receivers(self):
+        with patch.object(site_sync_models, 'get_wrapped_instance') as get_wrapped:
+            TestModel.objects.create(f1='model1')
+        get_wrapped.assert_called()
+
+    def test_register_connects_new_models_only(self):
+        with patch('edc_sync.signals.connect_sync_receivers') as connect:
+            site_sync_models.register(models=['edc_sync.testmodeldates'])
+        self.assertEqual(
+            [call[0][0]._meta.label_lower for call in connect.call_args_list],
+            ['edc_sync.testmodeldates'])
+
+    def test_autodiscover_is_quiet(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            site_sync_models.autodiscover()
+        self.assertEqual(stdout.getvalue(), '')
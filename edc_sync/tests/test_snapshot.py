@@ -0,0 +1,122 @@
+import os
+import socket
+import tempfile
+
+from django.contrib.auth.models import User
+from django.db.models import Max
+from django.test import TestCase, tag
+from django.urls import reverse
+from edc_device.constants import NODE_SERVER
+
+from ..models import OutgoingTransaction, IncomingTransaction, SnapshotPosition
+from ..site_sync_models import site_sync_models
+from ..transaction import TransactionDeserializer
+from ..transaction.batch_file import BatchFileReader, BatchFileWriter
+from ..transaction.snapshot import SnapshotWriter, SnapshotLoader, SnapshotError
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel
+from .test_push import ClientSession
+
+
+class TestSnapshot(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        TestModel.objects.using('client').create(f1='model1')
+        self.producer = f'{socket.gethostname()}-client'
+        self.filename = os.path.join(tempfile.mkdtemp(), 'snapshot.edcsync')
+
+    def push(self):
+        TransactionPusher(
+            url=reverse('edc_sync:incomingtransaction-batch'), using='client',
+            session=ClientSession(User.objects.create(username='erik'))).push()
+
+    def test_dump(self):
+        header = SnapshotWriter(using='client').dump(filename=self.filename)
+        self.assertEqual(
+            header['positions'][self.producer],
+            OutgoingTransaction.objects.using('client').aggregate(
+                timestamp=Max('timestamp'))['timestamp'])
+        self.assertIn('edc_sync.testmodel', header['models'])
+        with BatchFileReader(self.filename) as reader:
+            self.assertEqual(reader.header['snapshot_id'], header['snapshot_id'])
+            records = reader.find(tx_name='edc_sync.testmodel')
+            self.assertEqual(len([record for record in records if record.tx]), 1)
+            self.assertEqual(
+                set(record.id for record in records if not record.tx),
+                set(str(pk) for pk in OutgoingTransaction.objects.using('client').filter(
+                    tx_name='edc_sync.testmodel').values_list('pk', flat=True)))
+
+    def test_load(self):
+        SnapshotWriter(using='client').dump(filename=self.filename)
+        loader = SnapshotLoader(using='default')
+        header = loader.load(filename=self.filename)
+        self.assertEqual(loader.loaded_count, 2)
+        self.assertEqual(loader.covered_count, 2)
+        self.assertTrue(TestModel.objects.filter(f1='model1').exists())
+        self.assertFalse(OutgoingTransaction.objects.filter(
+            tx_name='edc_sync.testmodel').exists())
+        self.assertEqual(
+            SnapshotPosition.objects.get(producer=self.producer).timestamp,
+            header['positions'][self.producer])
+
+    def test_applies_only_transactions_after_snapshot(self):
+        SnapshotWriter(using='client').dump(filename=self.filename)
+        TestModel.objects.using('client').create(f1='model2')
+        SnapshotLoader(using='default').load(filename=self.filename)
+        self.push()
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        self.assertEqual(IncomingTransaction.objects.count(), 4)
+        tx_deserializer.deserialize_transactions(
+            transactions=IncomingTransaction.objects.filter(
+                is_consumed=False).order_by('timestamp'))
+        self.assertEqual(tx_deserializer.skipped_count, 0)
+        self.assertEqual(tx_deserializer.consumed_count, 2)
+        self.assertEqual(TestModel.objects.count(), 2)
+
+    def test_applies_late_transactions_older_than_snapshot(self):
+        """Asserts a transaction not covered by the snapshot is
+        applied even if older than the last one covered, e.g. from
+        a lower lane or a file import that arrives late.
+        """
+        header = SnapshotWriter(using='client').dump(filename=self.filename)
+        TestModel.objects.using('client').create(f1='model2')
+        OutgoingTransaction.objects.using('client').filter(
+            timestamp__gt=header['positions'][self.producer]).update(
+                timestamp='20000101000000000000')
+        SnapshotLoader(using='default').load(filename=self.filename)
+        self.push()
+        tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+        tx_deserializer.deserialize_transactions(
+            transactions=IncomingTransaction.objects.filter(
+                is_consumed=False).order_by('timestamp'))
+        self.assertEqual(tx_deserializer.consumed_count, 2)
+        self.assertTrue(TestModel.objects.filter(f1='model2').exists())
+
+    def test_consumes_received_transactions_covered_by_snapshot(self):
+        self.push()
+        SnapshotWriter(using='client').dump(filename=self.filename)
+        SnapshotLoader(using='default').load(filename=self.filename)
+        self.assertFalse(IncomingTransaction.objects.filter(is_consumed=False).exists())
+
+    def test_load_into_non_empty_database(self):
+        SnapshotWriter(using='client').dump(filename=self.filename)
+        SnapshotLoader(using='default').load(filename=self.filename)
+        self.assertRaises(
+            SnapshotError,
+            SnapshotLoader(using='default').load, filename=self.filename)
+
+    def test_not_a_snapshot(self):
+        with BatchFileWriter(self.filename, header={'batch_id': '1'}):
+            pass
+        self.assertRaises(
+            SnapshotError,
+            SnapshotLoader(using='default').load, filename=self.filename)
@@ -156,6 +156,7 @@ class TestSync(TestCase):
     def test_creates_outgoing_on_change(self):
         with override_settings(DEVICE_ID='10'):
             test_model = TestModel.objects.using('client').create(f1='erik')
+            test_model.f2 = 'changed'
             test_model.save(using='client')
             with self.assertRaises(OutgoingTransaction.DoesNotExist):
                 try:
@@ -222,6 +223,7 @@ class TestSync(TestCase):
             [obj.tx_name for obj in OutgoingTransaction.objects.using(
                 'client').filter(action=UPDATE)],
             [])
+        test_model.f2 = 'changed'
         test_model.save(using='client')
         self.assertListEqual(
             [obj.tx_name for obj in OutgoingTransaction.objects.using(
@@ -235,3 +237,12 @@ class TestSync(TestCase):
             ['edc_sync.historicaltestmodel',
              'edc_sync.historicaltestmodel',
              'edc_sync.testmodel'])
+
+    def test_no_op_save_does_not_create_outgoing(self):
+        test_model = TestModel.objects.using('client').create(f1='erik')
+        test_model.save(using='client')
+        self.assertFalse(OutgoingTransaction.objects.using('client').filter(
+            tx_name='edc_sync.testmodel', action=UPDATE).exists())
+        self.assertTrue(OutgoingTransaction.objects.using('client').filter(
+            tx_name='edc_sync.testmodel', action=INSERT).exclude(
+                tx_digest=None).exists())
@@ -0,0 +1,119 @@
+import gzip
+import json
+import time
+
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, tag, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..site_sync_models import site_sync_models
+from ..throttling import TokenBucket, IngestConcurrencyLimit
+from ..transaction.transaction_pusher import TransactionPusher
+from .models import TestModel
+from .test_push import ClientSession
+
+
+class TestTokenBucket(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_consume(self):
+        now = [0.0]
+        bucket = TokenBucket(key='bcpp010-default', rate=10, burst=20, clock=lambda: now[0])
+        self.assertEqual(bucket.consume(15), 0)
+        self.assertEqual(bucket.consume(10), 0.5)
+        now[0] = 0.5
+        self.assertEqual(bucket.consume(10), 0)
+
+    def test_cost_capped_at_burst(self):
+        bucket = TokenBucket(key='bcpp010-default', rate=10, burst=20)
+        self.assertEqual(bucket.consume(50), 0)
+
+
+class TestIngestLimits(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        cache.clear()
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register(['edc_sync.testmodel'])
+        OutgoingTransaction.objects.using('client').all().delete()
+        IncomingTransaction.objects.all().delete()
+        self.user = User.objects.create(username='erik')
+        self.url = reverse('edc_sync:incomingtransaction-batch')
+
+    def post(self, records):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        return client.post(
+            self.url, data=gzip.compress(json.dumps(records).encode()),
+            content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+
+    @override_settings(EDC_SYNC_INGEST_LIMITS={'RATE': 0.001, 'BURST': 1})
+    def test_rate_per_user(self):
+        records = [{'producer': 'bcpp010-default'}]
+        self.assertEqual(self.post(records).status_code, 200)
+        response = self.post(records)
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response['Retry-After'])
+        self.assertEqual(self.post([{'producer': 'bcpp011-default'}]).status_code, 429)
+        self.user = User.objects.create(username='other')
+        self.assertEqual(self.post(records).status_code, 200)
+
+    def test_concurrency_timeout_refreshed(self):
+        slot = IngestConcurrencyLimit(limit=2)
+        slot.timeout = 1
+        self.assertTrue(slot.acquire())
+        slot.timeout = 300
+        self.assertTrue(slot.acquire())
+        time.sleep(1.5)
+        self.assertEqual(cache.get(IngestConcurrencyLimit.key), 2)
+
+    def test_concurrency_timeout_refreshed_without_touch(self):
+        """Asserts the counter is set again where the cache has no
+        `touch`, e.g. on Django 2.0.
+        """
+        slot = IngestConcurrencyLimit(limit=2)
+        with patch('edc_sync.throttling.cache', spec=['add', 'incr', 'set', 'decr']) as mock_cache:
+            mock_cache.incr.return_value = 1
+            self.assertTrue(slot.acquire())
+        mock_cache.set.assert_called_with(
+            IngestConcurrencyLimit.key, 1, timeout=slot.timeout)
+
+    @override_settings(EDC_SYNC_INGEST_LIMITS={'CONCURRENCY': 1})
+    def test_concurrency(self):
+        slot = IngestConcurrencyLimit(limit=1)
+        self.assertTrue(slot.acquire())
+        self.assertEqual(self.post([]).status_code, 429)
+        slot.release()
+        self.assertEqual(self.post([]).status_code, 200)
+        self.assertEqual(cache.get(IngestConcurrencyLimit.key), 0)
+
+    def test_limits_published(self):
+        response = APIClient().get(reverse('edc_sync:ingest-limits'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('rate', response.data)
+        self.assertEqual(response.data.get('apply_queue_depth'), 0)
+
+    @override_settings(EDC_SYNC_INGEST_LIMITS={'CONCURRENCY': 1})
+    def test_pusher_honours_429(self):
+        TestModel.objects.using('client').create(f1='model1')
+        IngestConcurrencyLimit(limit=1).acquire()
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            IngestConcurrencyLimit(limit=1).release()
+
+        pusher = TransactionPusher(
+            url=self.url, using='client', session=ClientSession(self.user))
+        pusher.throttle.sleep = sleep
+        self.assertEqual(pusher.push(), 2)
+        self.assertEqual(slept, [1])
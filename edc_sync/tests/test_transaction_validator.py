@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+from django.test import TestCase, tag
+from edc_device.constants import NODE_SERVER
+from edc_sync_files.transaction import TransactionImporter, TransactionExporter
+
+from ..models import OutgoingTransaction, IncomingTransaction
+from ..site_sync_models import site_sync_models
+from ..transaction import TransactionDeserializer, TransactionDeserializerError
+from ..transaction.transaction_validator import get_natural_key_fields
+from .models import TestModel, TestModelWithFkProtected
+
+
+class TestTransactionValidator(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        site_sync_models.registry = {}
+        site_sync_models.loaded = False
+        site_sync_models.register([
+            'edc_sync.testmodel', 'edc_sync.testmodelwithfkprotected'])
+        self.export_path = os.path.join(tempfile.gettempdir(), 'export')
+        if not os.path.exists(self.export_path):
+            os.mkdir(self.export_path)
+        IncomingTransaction.objects.all().delete()
+        OutgoingTransaction.objects.using('client').all().delete()
+        test_model = TestModel.objects.using('client').create(f1='model1')
+        TestModelWithFkProtected.objects.using('client').create(
+            f1='f1', test_model=test_model)
+        batch = TransactionExporter(
+            export_path=self.export_path, using='client').export_batch()
+        TransactionImporter(import_path=self.export_path).import_batch(
+            filename=batch.filename)
+        self.tx_deserializer = TransactionDeserializer(
+            override_role=NODE_SERVER, allow_self=True)
+
+    def test_natural_key_fields(self):
+        self.assertEqual(get_natural_key_fields(TestModel), ['f1'])
+
+    def test_valid(self):
+        result = self.tx_deserializer.validate(IncomingTransaction.objects.all())
+        self.assertTrue(result.is_valid, result.report())
+        self.assertEqual(result.count, 4)
+
+    def test_missing_parent(self):
+        IncomingTransaction.objects.filter(
+            tx_name__in=['edc_sync.testmodel', 'edc_sync.historicaltestmodel']).delete()
+        result = self.tx_deserializer.validate(IncomingTransaction.objects.all())
+        self.assertFalse(result.is_valid)
+        self.assertIn(('edc_sync.testmodel', ('model1',)), result.unresolved)
+
+    def test_parent_in_db(self):
+        TestModel.objects.create(f1='model1')
+        IncomingTransaction.objects.filter(
+            tx_name__in=['edc_sync.testmodel', 'edc_sync.historicaltestmodel']).delete()
+        result = self.tx_deserializer.validate(IncomingTransaction.objects.all())
+        self.assertTrue(result.is_valid, result.report())
+
+    def test_bad_payload(self):
+        transaction = IncomingTransaction.objects.filter(
+            tx_name='edc_sync.testmodel').first()
+        transaction.tx = b'not encrypted'
+        transaction.save()
+        result = self.tx_deserializer.validate(IncomingTransaction.objects.all())
+        self.assertIn(transaction, result.bad_payloads)
+
+    def test_validate_before_apply(self):
+        IncomingTransaction.objects.filter(
+            tx_name__in=['edc_sync.testmodel', 'edc_sync.historicaltestmodel']).delete()
+        self.assertRaises(
+            TransactionDeserializerError,
+            self.tx_deserializer.deserialize_transactions,
+            transactions=IncomingTransaction.objects.all(), validate=True)
+        self.assertFalse(TestModelWithFkProtected.objects.exists())
+        self.assertFalse(IncomingTransaction.objects.filter(is_consumed=True).exists())
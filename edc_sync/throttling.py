@@ -0,0 +1,190 @@
+import math
+import time
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = 'edc_sync.ingest'
+
+DEFAULT_INGEST_LIMITS = {
+    # transactions per second a producer may send, on average
+    'RATE': 100,
+    # transactions a producer may send at once after being idle
+    'BURST': 1000,
+    # ingest requests processed at the same time, all producers
+    'CONCURRENCY': 8,
+    # transactions per second assumed to be applied, for Retry-After
+    'APPLY_RATE': 200,
+    'MIN_RETRY_AFTER': 1,
+    'MAX_RETRY_AFTER': 300,
+}
+
+
+def get_ingest_limits():
+    """Returns the ingest limits, see setting EDC_SYNC_INGEST_LIMITS.
+    """
+    limits = dict(DEFAULT_INGEST_LIMITS)
+    limits.update(getattr(settings, 'EDC_SYNC_INGEST_LIMITS', None) or {})
+    return limits
+
+
+def get_apply_queue_depth():
+    """Returns the number of incoming transactions waiting to be
+    applied, from the producer summaries.
+    """
+    ProducerSyncSummary = django_apps.get_model('edc_sync', 'ProducerSyncSummary')
+    return ProducerSyncSummary.objects.aggregate(
+        depth=Sum('pending_count')).get('depth') or 0
+
+
+def get_retry_after(wait=None):
+    """Returns the seconds a producer should wait before retrying,
+    at least `wait` and at least the time to apply the current queue.
+    """
+    limits = get_ingest_limits()
+    seconds = max(wait or 0, get_apply_queue_depth() / limits['APPLY_RATE'])
+    return int(min(limits['MAX_RETRY_AFTER'],
+                   max(limits['MIN_RETRY_AFTER'], math.ceil(seconds))))
+
+
+class TokenBucket:
+
+    """A token bucket kept in the cache.
+
+    Updates are not atomic across processes; the bucket may
+    briefly over-admit under contention.
+    """
+
+    def __init__(self, key=None, rate=None, burst=None, clock=None):
+        self.key = f'{KEY_PREFIX}.bucket.{key}'
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock or time.time
+
+    def consume(self, cost=None):
+        """Takes `cost` tokens and returns 0 or, if there are not
+        enough tokens, takes none and returns the seconds until
+        there will be.
+        """
+        cost = min(cost, self.burst)
+        now = self.clock()
+        tokens, updated = cache.get(self.key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            cache.set(self.key, (tokens, now), timeout=None)
+            return (cost - tokens) / self.rate
+        cache.set(self.key, (tokens - cost, now), timeout=None)
+        return 0
+
+
+class ProducerRateThrottle(BaseThrottle):
+
+    """Limits the transactions per second POSTed by each
+    authenticated user (see TokenBucket). A request costs the number
+    of transactions it carries.
+
+    The bucket is keyed on the user, not on the `producer` of the
+    records, which the client chooses.
+    """
+
+    def __init__(self):
+        self.wait_seconds = 0
+
+    def allow_request(self, request, view):
+        if request.method != 'POST':
+            return True
+        limits = get_ingest_limits()
+        records = request.data if isinstance(request.data, list) else [request.data]
+        cost = len([record for record in records if isinstance(record, dict)])
+        if cost:
+            bucket = TokenBucket(
+                key=self.get_key(request), rate=limits['RATE'], burst=limits['BURST'])
+            self.wait_seconds = bucket.consume(cost)
+        return not self.wait_seconds
+
+    def get_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user.{request.user.pk}'
+        return f'ident.{self.get_ident(request)}'
+
+    def wait(self):
+        return get_retry_after(self.wait_seconds)
+
+
+class IngestConcurrencyLimit:
+
+    """Counts the ingest requests being processed, all producers,
+    in the cache.
+
+    The counter expires `timeout` seconds after the last request
+    was admitted so a crashed worker does not hold a slot for good.
+    The cache must be shared by all server processes.
+    """
+
+    key = f'{KEY_PREFIX}.concurrency'
+    timeout = 300
+
+    def __init__(self, limit=None):
+        self.limit = limit
+
+    def acquire(self):
+        cache.add(self.key, 0, timeout=self.timeout)
+        try:
+            count = cache.incr(self.key)
+        except ValueError:
+            cache.set(self.key, 1, timeout=self.timeout)
+            count = 1
+        self.refresh(count)
+        if count > self.limit:
+            self.release()
+            return False
+        return True
+
+    def refresh(self, count=None):
+        """Restarts the timeout of the counter.
+
+        `cache.touch` is new in Django 2.1. On Django 2.0 the counter
+        is set again with its timeout, which may lose an increment
+        made by a concurrent request in between.
+        """
+        if hasattr(cache, 'touch'):
+            cache.touch(self.key, self.timeout)
+        else:
+            cache.set(self.key, count, timeout=self.timeout)
+
+    def release(self):
+        try:
+            cache.decr(self.key)
+        except ValueError:
+            pass
+
+
+class IngestLimitMixin:
+
+    """Adds the per-producer rate limit and the global ingest
+    concurrency limit to POSTs of an APIView.
+
+    Requests over a limit get 429 with Retry-After, see
+    `get_retry_after`.
+    """
+
+    throttle_classes = (ProducerRateThrottle,)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.ingest_slot = None
+        if request.method == 'POST':
+            slot = IngestConcurrencyLimit(limit=get_ingest_limits()['CONCURRENCY'])
+            if not slot.acquire():
+                raise Throttled(wait=get_retry_after())
+            self.ingest_slot = slot
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, 'ingest_slot', None):
+            self.ingest_slot.release()
+            self.ingest_slot = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,5 +1,5 @@
 from .deserialize import deserialize
-from .serialize import serialize
+from .serialize import serialize, get_digest
 from .transaction_deserializer import (
     TransactionDeserializer, TransactionDeserializerError,
     CustomTransactionDeserializer)
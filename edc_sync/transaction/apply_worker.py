@@ -0,0 +1,210 @@
+import logging
+import threading
+
+from time import perf_counter
+
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError
+from edc_base.utils import get_utcnow
+
+from ..progress import ProgressReporter
+from .claims import Claimer
+from .transaction_deserializer import TransactionDeserializer
+
+logger = logging.getLogger('edc_sync')
+
+KEY_PREFIX = 'edc_sync.apply_worker'
+STATS_TIMEOUT = 60 * 5
+PROGRESS_JOB_PREFIX = 'apply'
+
+
+def get_progress_job(name=None):
+    """Returns the progress job of an apply worker, see
+    ProgressReporter.
+    """
+    return f'{PROGRESS_JOB_PREFIX}.{name}'
+
+
+def get_worker_stats():
+    """Returns a list of the stats last published by the running
+    apply workers, see ApplyWorker.publish.
+    """
+    names = cache.get(f'{KEY_PREFIX}.names') or []
+    stats = cache.get_many([f'{KEY_PREFIX}.{name}' for name in names])
+    return [stats[key] for key in sorted(stats)]
+
+
+def is_missing_reference(error=None):
+    """Returns True if the error, or one it was raised from, is
+    a reference to an instance that does not exist, e.g. not yet
+    applied.
+    """
+    while error:
+        if isinstance(error, (ObjectDoesNotExist, IntegrityError)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class ApplyWorker:
+
+    """Applies unconsumed incoming transactions continuously.
+
+    Each loop fetches up to `chunk_size` transactions that are not
+    consumed, ignored or in error, higher priority lanes first and
+    in timestamp order, and applies them with the
+    TransactionDeserializer. When there is nothing to apply the
+    worker sleeps, doubling the delay from `min_idle` up to
+    `max_idle` seconds.
+
+    If a chunk fails, its transactions are applied one by one and
+    the one that fails is flagged as an error so the queue moves on;
+    the later transactions of its tx_pk wait (see Claimer). A
+    transaction that refers to an instance not applied yet, e.g.
+    by another worker, is deferred for `reference_retry_seconds`
+    instead, until it is older than `max_reference_wait` seconds.
+
+    Transactions are claimed before they are applied (see Claimer) so
+    several workers can share the queue.
+
+    `stop` (e.g. from a SIGTERM handler) lets the current chunk
+    finish and ends `run`.
+
+    Progress is published as one job per worker for the whole run,
+    see `get_progress_job`.
+
+    Usage:
+        worker = ApplyWorker(override_role=NODE_SERVER)
+        worker.run()
+    """
+
+    chunk_size = 500
+    min_idle = 0.5
+    max_idle = 30.0
+    reference_retry_seconds = 30
+    max_reference_wait = 60 * 60
+
+    def __init__(self, using=None, chunk_size=None, min_idle=None, max_idle=None,
+                 tx_deserializer=None, lease_seconds=None, **deserializer_options):
+        self.using = using
+        self.chunk_size = chunk_size or self.chunk_size
+        self.min_idle = min_idle or self.min_idle
+        self.max_idle = max_idle or self.max_idle
+        self.claimer = Claimer(using=using, lease_seconds=lease_seconds)
+        self.name = self.claimer.name
+        self.progress = ProgressReporter(job=get_progress_job(self.name))
+        self.tx_deserializer = tx_deserializer or TransactionDeserializer(
+            using=using, progress=self.progress, on_flush=self.claimer.renew,
+            **deserializer_options)
+        self.stopping = threading.Event()
+        self.applied_count = 0
+        self.error_count = 0
+        self.lag_seconds = 0
+        self.rows_per_second = 0
+        self.started = None
+
+    @property
+    def queryset(self):
+        """Returns the transactions claimed by this worker.
+        """
+        return self.claimer.claimed()
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self):
+        """Applies chunks until stopped.
+        """
+        self.started = get_utcnow()
+        idle = self.min_idle
+        logger.info(f'Apply worker {self.name} started.')
+        while not self.stopping.is_set():
+            applied = self.apply_chunk()
+            self.publish()
+            if applied:
+                idle = self.min_idle
+            else:
+                self.stopping.wait(idle)
+                idle = min(self.max_idle, idle * 2)
+        self.publish()
+        self.progress.finish()
+        logger.info(f'Apply worker {self.name} stopped. '
+                    f'Applied {self.applied_count} transactions.')
+
+    def apply_chunk(self):
+        """Applies the next chunk and returns the number of
+        transactions applied or, if none could be applied, the
+        number flagged as errors.
+
+        `lag_seconds` is the time since the first transaction of the
+        chunk was received.
+        """
+        transactions = self.claimer.claim(limit=self.chunk_size)
+        pks = list(transactions.values_list('pk', 'created'))
+        if not pks:
+            self.lag_seconds = 0
+            return 0
+        self.lag_seconds = (get_utcnow() - pks[0][1]).total_seconds()
+        start = perf_counter()
+        try:
+            self.tx_deserializer.deserialize_transactions(transactions=transactions)
+        except Exception as e:
+            logger.exception(f'Apply worker {self.name}: chunk failed. Got {e}.')
+            self.apply_one_by_one(transactions)
+        finally:
+            self.claimer.release()
+        applied = self.tx_deserializer.consumed_count + self.tx_deserializer.skipped_count
+        self.applied_count += applied
+        elapsed = perf_counter() - start
+        self.rows_per_second = applied / elapsed if elapsed else 0
+        return applied or len(pks)
+
+    def apply_one_by_one(self, transactions=None):
+        consumed_count = self.tx_deserializer.consumed_count
+        skipped_count = self.tx_deserializer.skipped_count
+        failed = set()
+        for transaction in list(transactions):
+            if transaction.tx_pk in failed:
+                continue
+            try:
+                self.tx_deserializer.deserialize_transactions(
+                    transactions=self.queryset.filter(pk=transaction.pk))
+            except Exception as e:
+                failed.add(transaction.tx_pk)
+                self.failed(transaction, e)
+            consumed_count += self.tx_deserializer.consumed_count
+            skipped_count += self.tx_deserializer.skipped_count
+        self.tx_deserializer.summary.save()
+        self.tx_deserializer.consumed_count = consumed_count
+        self.tx_deserializer.skipped_count = skipped_count
+
+    def failed(self, transaction=None, error=None):
+        """Defers a transaction that refers to an instance not
+        applied yet or flags it as an error.
+        """
+        age = (get_utcnow() - transaction.created).total_seconds()
+        if is_missing_reference(error) and age < self.max_reference_wait:
+            self.claimer.defer(
+                tx_pks=[transaction.tx_pk], seconds=self.reference_retry_seconds)
+        else:
+            self.tx_deserializer.quarantine(transaction, error)
+            self.error_count += 1
+
+    def publish(self):
+        """Publishes the worker's stats to the cache for the metrics
+        endpoint, see `metrics.collect_apply_workers`.
+        """
+        names_key = f'{KEY_PREFIX}.names'
+        names = list(cache.get_many(
+            [f'{KEY_PREFIX}.{name}' for name in cache.get(names_key) or []]))
+        names = [key[len(KEY_PREFIX) + 1:] for key in names]
+        if self.name not in names:
+            cache.set(names_key, names + [self.name], timeout=None)
+        cache.set(f'{KEY_PREFIX}.{self.name}', dict(
+            worker=self.name,
+            applied=self.applied_count,
+            errors=self.error_count,
+            rows_per_second=self.rows_per_second,
+            lag_seconds=self.lag_seconds,
+            stopped=self.stopping.is_set()), timeout=STATS_TIMEOUT)
@@ -0,0 +1,208 @@
+import json
+import mmap
+import struct
+import zlib
+
+from ..outgoing_log import Record, save_incoming_transactions
+
+
+MAGIC = b'EDCSYNC1'
+FOOTER_MAGIC = b'EDCSYNCF'
+VERSION = 1
+HEADER = struct.Struct('>8sHI')
+BLOCK = struct.Struct('>I')
+TRAILER = struct.Struct('>Q8s')
+
+
+class BatchFileError(Exception):
+    pass
+
+
+class BatchFileWriter:
+
+    """Writes transactions to an indexed batch file.
+
+    Layout:
+        header: magic, version, length of the json header, json header;
+        blocks: length of the compressed block, zlib compressed
+            records (see outgoing_log.Record);
+        footer: zlib compressed json index, one entry per record of
+            [tx_name, tx_pk, timestamp, block offset, position in block];
+        trailer: offset of the footer, footer magic.
+
+    Usage:
+        with BatchFileWriter(filename, header=dict(batch_id=...)) as writer:
+            for obj in outgoing_transactions:
+                writer.add(obj)
+    """
+
+    block_size = 1024 * 1024
+
+    def __init__(self, filename=None, header=None, block_size=None):
+        self.filename = filename
+        self.header = header or {}
+        self.block_size = block_size or self.block_size
+        self.index = []
+        self.block = []
+        self.block_length = 0
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.filename, 'wb')
+        header = json.dumps(self.header).encode()
+        self.f.write(HEADER.pack(MAGIC, VERSION, len(header)))
+        self.f.write(header)
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.f.close()
+
+    def add(self, obj=None):
+        """Adds a Record or an OutgoingTransaction.
+        """
+        record = obj if isinstance(obj, Record) else Record.from_outgoing_transaction(obj)
+        data = record.encode()
+        self.block.append((record, data))
+        self.block_length += len(data)
+        if self.block_length >= self.block_size:
+            self.write_block()
+
+    def write_block(self):
+        if self.block:
+            offset = self.f.tell()
+            data = zlib.compress(b''.join(data for _, data in self.block))
+            self.f.write(BLOCK.pack(len(data)))
+            self.f.write(data)
+            for position, (record, _) in enumerate(self.block):
+                self.index.append(
+                    [record.tx_name, record.tx_pk, record.timestamp,
+                     offset, position])
+            self.block = []
+            self.block_length = 0
+
+    def close(self):
+        self.write_block()
+        footer_offset = self.f.tell()
+        self.f.write(zlib.compress(json.dumps(self.index).encode()))
+        self.f.write(TRAILER.pack(footer_offset, FOOTER_MAGIC))
+        self.f.close()
+
+
+class BatchFileReader:
+
+    """Reads an indexed batch file memory-mapped. Only the footer
+    index and the blocks of the records read are decompressed.
+
+    Usage:
+        with BatchFileReader(filename) as reader:
+            record = reader.find(tx_pk='...')[0]
+            for record in reader.records(start=1000):
+                ...
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.f = None
+        self.buffer = None
+        self.header = None
+        self.index = None
+        self.cached_block = (None, None)
+
+    def __enter__(self):
+        self.f = open(self.filename, 'rb')
+        self.buffer = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_length = HEADER.unpack_from(self.buffer, 0)
+            footer_offset, footer_magic = TRAILER.unpack_from(
+                self.buffer, len(self.buffer) - TRAILER.size)
+        except struct.error as e:
+            self.close()
+            raise BatchFileError(f'Invalid batch file {self.filename}. Got {e}.')
+        if magic != MAGIC or footer_magic != FOOTER_MAGIC or version != VERSION:
+            self.close()
+            raise BatchFileError(
+                f'Invalid batch file {self.filename}. Got version {version}.')
+        self.header = json.loads(
+            self.buffer[HEADER.size:HEADER.size + header_length].decode())
+        self.index = json.loads(zlib.decompress(
+            self.buffer[footer_offset:len(self.buffer) - TRAILER.size]).decode())
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def close(self):
+        self.buffer.close()
+        self.f.close()
+
+    def block(self, offset=None):
+        """Returns the list of records of the block at `offset`.
+        """
+        if self.cached_block[0] != offset:
+            length, = BLOCK.unpack_from(self.buffer, offset)
+            start = offset + BLOCK.size
+            data = zlib.decompress(self.buffer[start:start + length])
+            records, position = [], 0
+            while position < len(data):
+                record, position = Record.decode(buffer=data, offset=position)
+                records.append(record)
+            self.cached_block = (offset, records)
+        return self.cached_block[1]
+
+    def get(self, position=None):
+        """Returns the record at `position` in the file.
+        """
+        *_, offset, block_position = self.index[position]
+        record = self.block(offset)[block_position]
+        record.seq = position
+        return record
+
+    def records(self, start=None):
+        """Yields records from position `start`, e.g. to resume an
+        import.
+        """
+        for position in range(start or 0, len(self.index)):
+            yield self.get(position)
+
+    def find(self, tx_name=None, tx_pk=None, timestamp=None):
+        """Returns the records matching the given index values.
+        """
+        return [
+            self.get(position) for position, (name, pk, ts, *_) in enumerate(self.index)
+            if (tx_name is None or name == tx_name)
+            and (tx_pk is None or pk == str(tx_pk))
+            and (timestamp is None or ts == timestamp)]
+
+
+class BatchFileImporter:
+
+    """Saves the records of an indexed batch file as incoming
+    transactions.
+    """
+
+    batch_size = 500
+
+    def __init__(self, using=None, batch_size=None):
+        self.using = using
+        self.batch_size = batch_size or self.batch_size
+
+    def import_batch_file(self, filename=None, start=None):
+        """Imports records from position `start` and returns the
+        number of incoming transactions created.
+        """
+        imported_count = 0
+        with BatchFileReader(filename) as reader:
+            batch = []
+            for record in reader.records(start=start):
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    imported_count += save_incoming_transactions(batch, using=self.using)
+                    batch = []
+            imported_count += save_incoming_transactions(batch, using=self.using)
+        return imported_count
@@ -0,0 +1,98 @@
+import time
+
+
+class BatchSizeTuner:
+
+    """Adapts the number of transactions per request to keep the
+    round trip near `target_seconds` (AIMD).
+
+    The batch size grows by `step` after each round trip faster
+    than the target and is multiplied by `backoff` after a slower
+    round trip or a failure. Round trip time and throughput are
+    kept as moving averages.
+
+    If `fixed`, the batch size is measured but never changed.
+    """
+
+    min_batch_size = 10
+    max_batch_size = 1000
+    target_seconds = 5.0
+    step = 10
+    backoff = 0.5
+    smoothing = 0.3
+
+    def __init__(self, batch_size=None, target_seconds=None, fixed=None):
+        self.batch_size = batch_size or 100
+        self.target_seconds = target_seconds or self.target_seconds
+        self.fixed = fixed
+        self.round_trip_seconds = None
+        self.bytes_per_second = None
+        self.failures = 0
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(batch_size={self.batch_size}, '
+                f'target_seconds={self.target_seconds})')
+
+    def completed(self, seconds=None, size=None, bytes=None):
+        """Records a successful round trip of `size` transactions
+        and `bytes` bytes.
+        """
+        self.round_trip_seconds = self.average(self.round_trip_seconds, seconds)
+        if seconds:
+            self.bytes_per_second = self.average(self.bytes_per_second, bytes / seconds)
+        if seconds > self.target_seconds:
+            self.decrease()
+        elif size >= self.batch_size:
+            self.increase()
+
+    def failed(self):
+        """Records a failed round trip, e.g. a timeout.
+        """
+        self.failures += 1
+        self.decrease()
+
+    def increase(self):
+        if not self.fixed:
+            self.batch_size = min(self.max_batch_size, self.batch_size + self.step)
+
+    def decrease(self):
+        if not self.fixed:
+            self.batch_size = max(
+                self.min_batch_size, int(self.batch_size * self.backoff))
+
+    def average(self, current=None, value=None):
+        if current is None:
+            return value
+        return current + self.smoothing * (value - current)
+
+
+class Throttle:
+
+    """Spaces requests so that the bytes sent to a host do not
+    exceed `max_bytes_per_second` on average.
+
+    Usage:
+        throttle = Throttle(max_bytes_per_second=50000)
+        throttle.wait()
+        started = throttle.clock()
+        ... send body ...
+        throttle.sent(len(body), started)
+    """
+
+    def __init__(self, max_bytes_per_second=None, clock=None, sleep=None):
+        self.max_bytes_per_second = max_bytes_per_second
+        self.clock = clock or time.monotonic
+        self.sleep = sleep or time.sleep
+        self.available_at = None
+
+    def wait(self):
+        """Sleeps until the next request may be sent.
+        """
+        if self.max_bytes_per_second and self.available_at:
+            delay = self.available_at - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+
+    def sent(self, nbytes=None, started=None):
+        if self.max_bytes_per_second:
+            self.available_at = started + nbytes / self.max_bytes_per_second
@@ -0,0 +1,127 @@
+from django.apps import apps as django_apps
+from django.db import router, transaction as db_transaction
+from django.db.models.deletion import DO_NOTHING, PROTECT, ProtectedError
+
+from ..dependency_graph import sort_by_dependency, get_registered_models, get_parent_models
+from ..site_sync_models import site_sync_models
+
+
+class BulkDelete:
+
+    """Applies DELETE transactions in batches.
+
+    Transactions are grouped by tx_name and deleted children first
+    using the FK graph of the registered models, with one
+    `DELETE ... WHERE id IN (...)` per model per chunk and without
+    collecting cascades or sending signals.
+
+    Instances referred to by a PROTECTed FK are passed to `quarantine`.
+    Instances referred to by any other FK not itself being deleted
+    fall back to `obj.delete()` so the cascade is applied as before.
+    """
+
+    chunk_size = 500
+
+    def __init__(self, using=None, quarantine=None, consume=None, chunk_size=None,
+                 stage=None):
+        self.using = using
+        self.stage = stage
+        self.quarantine = quarantine
+        self.consume = consume
+        self.chunk_size = chunk_size or self.chunk_size
+        self.pending = {}
+
+    def __contains__(self, tx_pk):
+        return any(tx_pk in group for group in self.pending.values())
+
+    def blocks(self, model=None):
+        """Returns True if deletes are pending for `model` or for a
+        model it refers to or that refers to it, in which case they
+        must be applied before an insert or update of `model`, e.g.
+        a re-entered instance with the natural key of a deleted one.
+        """
+        for tx_name in self.pending:
+            pending_model = django_apps.get_model(tx_name)
+            if (pending_model is model
+                    or pending_model in get_parent_models(model)
+                    or model in get_parent_models(pending_model)):
+                return True
+        return False
+
+    def add(self, transaction=None):
+        self.pending.setdefault(transaction.tx_name, {}).update(
+            {transaction.tx_pk: transaction})
+
+    def apply(self):
+        """Deletes all pending instances and empties the buffer.
+        """
+        groups = {django_apps.get_model(tx_name): group
+                  for tx_name, group in self.pending.items()}
+        models = sort_by_dependency(
+            get_registered_models(site_sync_models.registry) + list(groups))
+        for model in reversed(models):
+            if model in groups:
+                with self.stage('delete', model._meta.label_lower):
+                    self.delete(model=model, group=groups[model], groups=groups)
+        self.pending = {}
+
+    def delete(self, model=None, group=None, groups=None):
+        db = self.using or router.db_for_write(model)
+        pks = list(group)
+        for index in range(0, len(pks), self.chunk_size):
+            chunk = pks[index:index + self.chunk_size]
+            protected, cascaded = self.get_referenced(
+                model=model, pks=chunk, groups=groups, using=db)
+            for pk in protected:
+                self.quarantine(
+                    group[pk], f'Cannot delete {model._meta.label_lower} {pk}. '
+                    'Referenced through a protected foreign key.')
+            for pk in cascaded - protected:
+                try:
+                    with db_transaction.atomic(using=db):
+                        model._base_manager.using(db).filter(pk=pk).delete()
+                except ProtectedError as e:
+                    self.quarantine(group[pk], str(e))
+                else:
+                    self.consume(group[pk])
+            fast_pks = [pk for pk in chunk if pk not in protected | cascaded]
+            if fast_pks:
+                with db_transaction.atomic(using=db):
+                    self.delete_m2m(model=model, pks=fast_pks, using=db)
+                    model._base_manager.using(db).filter(
+                        pk__in=fast_pks)._raw_delete(db)
+                for pk in fast_pks:
+                    self.consume(group[pk])
+
+    def get_referenced(self, model=None, pks=None, groups=None, using=None):
+        """Returns a tuple of sets of pks, (protected, cascaded), for
+        instances referred to by rows that are not being deleted.
+        """
+        protected, cascaded = set(), set()
+        for rel in model._meta.related_objects:
+            if rel.many_to_many or rel.on_delete is DO_NOTHING:
+                continue
+            queryset = rel.related_model._base_manager.using(using).filter(
+                **{f'{rel.field.name}__in': pks})
+            deleting = groups.get(rel.related_model)
+            if deleting:
+                queryset = queryset.exclude(pk__in=list(deleting))
+            referenced = set(
+                queryset.values_list(rel.field.attname, flat=True).distinct())
+            if rel.on_delete is PROTECT:
+                protected.update(referenced)
+            else:
+                cascaded.update(referenced)
+        return protected, cascaded
+
+    def delete_m2m(self, model=None, pks=None, using=None):
+        """Deletes rows in m2m through tables that refer to the
+        instances being deleted.
+        """
+        for field in model._meta.many_to_many:
+            field.remote_field.through._base_manager.using(using).filter(
+                **{f'{field.m2m_field_name()}__in': pks})._raw_delete(using)
+        for rel in model._meta.related_objects:
+            if rel.many_to_many:
+                rel.field.remote_field.through._base_manager.using(using).filter(
+                    **{f'{rel.field.m2m_reverse_field_name()}__in': pks})._raw_delete(using)
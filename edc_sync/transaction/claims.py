@@ -0,0 +1,160 @@
+import os
+import socket
+
+from datetime import timedelta
+
+from django.apps import apps as django_apps
+from django.db import connections, router, transaction as db_transaction
+from django.db.models import Count, Q
+from edc_base.utils import get_utcnow
+
+
+DEFERRED = 'deferred'
+
+
+def get_worker_name():
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+class Claimer:
+
+    """Claims pending incoming transactions for one worker with a
+    lease so that several workers, on one host or several, can share
+    the queue without applying a transaction twice.
+
+    All pending transactions of a tx_pk are claimed together and a
+    tx_pk held by another worker is skipped, so the transactions of
+    an instance are applied by one worker in timestamp order.
+
+    A claim expires after `lease_seconds`; the transactions can then
+    be claimed by another worker, e.g. if the worker died. A worker
+    renews its claims while it applies them (see `renew`). A claim
+    takes at most `limit` transactions unless the first tx_pk alone
+    has more.
+
+    Transactions flagged as errors are only claimed if `retry_errors`.
+    Otherwise the later transactions of their tx_pks are not claimed
+    either, so an instance is not updated past a quarantined
+    transaction.
+
+    Transactions of a tx_pk can be deferred for some seconds (see
+    `defer`), e.g. until the instance they refer to is applied.
+
+    On backends that support it the candidates are selected with
+    `SELECT ... FOR UPDATE SKIP LOCKED`, otherwise the conditional
+    UPDATE decides which worker gets a row.
+
+    Usage:
+        claimer = Claimer()
+        transactions = claimer.claim(limit=500)
+        ... apply ...
+        claimer.release()
+    """
+
+    lease_seconds = 300
+
+    def __init__(self, name=None, using=None, lease_seconds=None, retry_errors=None):
+        self.name = name or get_worker_name()
+        self.using = using
+        self.lease_seconds = lease_seconds or self.lease_seconds
+        self.retry_errors = retry_errors
+
+    @property
+    def model(self):
+        return django_apps.get_model('edc_sync', 'IncomingTransaction')
+
+    @property
+    def db(self):
+        return self.using or router.db_for_write(self.model)
+
+    def pending(self, queryset=None):
+        queryset = self.model.objects.using(self.db) if queryset is None else queryset
+        queryset = queryset.filter(is_consumed=False, is_ignored=False)
+        return queryset if self.retry_errors else queryset.filter(is_error=False)
+
+    def claimable(self, queryset=None, now=None):
+        return queryset.filter(
+            Q(claim_expires__isnull=True) | Q(claim_expires__lte=now) | Q(claimed_by=self.name))
+
+    def exclude_quarantined(self, queryset=None):
+        """Excludes the tx_pks with a pending transaction flagged as an
+        error, unless `retry_errors`.
+        """
+        if self.retry_errors:
+            return queryset
+        return queryset.exclude(tx_pk__in=self.model.objects.using(self.db).filter(
+            is_consumed=False, is_ignored=False, is_error=True).values('tx_pk'))
+
+    def cap(self, tx_pks=None, limit=None):
+        """Returns the first of the ordered `tx_pks` whose pending
+        transactions add up to at most `limit`, at least one.
+        """
+        if not limit:
+            return tx_pks
+        counts = dict(self.pending().filter(tx_pk__in=tx_pks).order_by().values(
+            'tx_pk').annotate(count=Count('id')).values_list('tx_pk', 'count'))
+        capped, count = [], 0
+        for tx_pk in tx_pks:
+            count += counts.get(tx_pk, 0)
+            if capped and count > limit:
+                break
+            capped.append(tx_pk)
+        return capped
+
+    def held_by_others(self, tx_pks=None, now=None):
+        return set(self.pending().filter(
+            tx_pk__in=tx_pks, claim_expires__gt=now).exclude(
+                claimed_by=self.name).values_list('tx_pk', flat=True).distinct())
+
+    def claim(self, queryset=None, limit=None):
+        """Claims up to `limit` pending transactions of `queryset`,
+        higher lanes first and in timestamp order, plus the other
+        pending transactions of their tx_pks, and returns the
+        claimed transactions of `queryset`.
+        """
+        now = get_utcnow()
+        candidates = self.exclude_quarantined(
+            self.claimable(self.pending(queryset), now)).order_by('-priority', 'timestamp')
+        with db_transaction.atomic(using=self.db):
+            if limit and connections[self.db].features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            tx_pks = candidates.values_list('tx_pk', flat=True)
+            tx_pks = set(self.cap(
+                list(dict.fromkeys(tx_pks[:limit] if limit else tx_pks)), limit))
+            tx_pks -= self.held_by_others(tx_pks, now)
+            self.claimable(self.pending().filter(tx_pk__in=tx_pks), now).update(
+                claimed_by=self.name,
+                claim_expires=now + timedelta(seconds=self.lease_seconds))
+        split = self.held_by_others(tx_pks, now)
+        if split:
+            self.release(tx_pks=split)
+        return self.claimed(queryset)
+
+    def claimed(self, queryset=None):
+        """Returns the pending transactions of `queryset` claimed by
+        this worker with a lease that has not expired.
+        """
+        return self.pending(queryset).filter(
+            claimed_by=self.name, claim_expires__gt=get_utcnow()).order_by(
+                '-priority', 'timestamp')
+
+    def renew(self):
+        """Extends the lease of this worker's claims.
+        """
+        return self.pending().filter(claimed_by=self.name).update(
+            claim_expires=get_utcnow() + timedelta(seconds=self.lease_seconds))
+
+    def defer(self, tx_pks=None, seconds=None):
+        """Releases this worker's claims on the transactions of
+        `tx_pks` and keeps any worker from claiming them for `seconds`.
+        """
+        return self.pending().filter(claimed_by=self.name, tx_pk__in=tx_pks).update(
+            claimed_by=DEFERRED, claim_expires=get_utcnow() + timedelta(seconds=seconds))
+
+    def release(self, tx_pks=None):
+        """Releases this worker's claims on pending transactions.
+        """
+        queryset = self.pending().filter(claimed_by=self.name)
+        if tx_pks is not None:
+            queryset = queryset.filter(tx_pk__in=tx_pks)
+        return queryset.update(claimed_by=None, claim_expires=None)
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from uuid import UUID, uuid5
+
+from ..constants import INSERT, UPDATE, DELETE
+
+
+HISTORY_ID_NAMESPACE = UUID('5c9f4f7e-8a0d-4b7e-9a37-6f1e0d2b8c41')
+
+HISTORY_TYPES = {INSERT: '+', UPDATE: '~', DELETE: '-'}
+
+
+def get_history_id(transaction=None):
+    """Returns a history_id derived from the transaction so that
+    re-applying a transaction updates the same historical record.
+    """
+    return uuid5(
+        HISTORY_ID_NAMESPACE,
+        f'{transaction.tx_name}:{transaction.tx_pk}:'
+        f'{transaction.timestamp}:{transaction.action}')
+
+
+def get_history_date(obj=None, transaction=None):
+    history_date = getattr(obj, 'modified', None)
+    if not history_date:
+        history_date = datetime.strptime(
+            transaction.timestamp, '%Y%m%d%H%M%S%f').replace(tzinfo=timezone.utc)
+    return history_date
+
+
+def derive_historical_objects(model=None, items=None):
+    """Returns a list of unsaved historical model instances for a
+    list of (transaction, obj) of `model`.
+    """
+    historical_model = model.history.model
+    attnames = set(field.attname for field in historical_model._meta.concrete_fields)
+    objs = []
+    for transaction, obj in items:
+        values = {field.attname: getattr(obj, field.attname)
+                  for field in model._meta.concrete_fields
+                  if field.attname in attnames}
+        values.update(
+            history_id=get_history_id(transaction),
+            history_date=get_history_date(obj=obj, transaction=transaction),
+            history_type=HISTORY_TYPES.get(transaction.action, '~'))
+        objs.append(historical_model(**values))
+    return objs
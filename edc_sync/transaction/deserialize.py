@@ -1,14 +1,33 @@
 from django.core import serializers
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.python import Deserializer as PythonDeserializer
 
 
-def deserialize(json_text=None):
+def deserialize(json_text=None, json_data=None):
     """Returns a generator of deserialized objects.
 
     Wraps django deserialize with defaults for JSON
     and natural keys.
+
+    If `json_data`, the already decoded list of objects, is
+    given `json_text` is ignored.
     """
+    if json_data is not None:
+        return deserialize_python(json_data)
     return serializers.deserialize(
         "json", json_text,
         ensure_ascii=True,
         use_natural_foreign_keys=True,
         use_natural_primary_keys=False)
+
+
+def deserialize_python(json_data=None):
+    """Deserializes decoded JSON raising DeserializationError
+    as the JSON deserializer does.
+    """
+    try:
+        yield from PythonDeserializer(json_data)
+    except (GeneratorExit, DeserializationError):
+        raise
+    except Exception as e:
+        raise DeserializationError() from e
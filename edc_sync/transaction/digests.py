@@ -0,0 +1,67 @@
+from django.apps import apps as django_apps
+from django.db.models import F, OuterRef, Subquery
+from edc_base.utils import get_utcnow
+
+from ..constants import DELETE
+
+DUPLICATE = 'duplicate'
+
+
+def get_last_digests(keys=None, using=None, chunk_size=None, applied=None,
+                     **filters):
+    """Returns a dictionary of {(tx_name, tx_pk): tx_digest} of the
+    last incoming transaction of each instance in `keys`, a list of
+    (tx_name, tx_pk).
+
+    One row is read per instance, the one with the latest timestamp.
+
+    The digest of an instance last deleted is None. If `applied`,
+    so is the digest of an instance whose last transaction is not
+    consumed, e.g. pending or quarantined, since it may never be
+    applied.
+    """
+    IncomingTransaction = django_apps.get_model(
+        'edc_sync', 'IncomingTransaction')
+    manager = IncomingTransaction.objects.using(using)
+    chunk_size = chunk_size or 500
+    keys = set((tx_name, str(tx_pk)) for tx_name, tx_pk in keys or [])
+    tx_pks = list(set(tx_pk for _, tx_pk in keys))
+    last_timestamp = manager.filter(
+        tx_name=OuterRef('tx_name'), tx_pk=OuterRef('tx_pk'), **filters).order_by(
+            '-timestamp').values('timestamp')[:1]
+    last_digests = {}
+    for index in range(0, len(tx_pks), chunk_size):
+        rows = manager.filter(
+            tx_pk__in=tx_pks[index:index + chunk_size], **filters).annotate(
+                last_timestamp=Subquery(last_timestamp)).filter(
+                    timestamp=F('last_timestamp')).values_list(
+                        'tx_name', 'tx_pk', 'action', 'tx_digest', 'is_consumed')
+        for tx_name, tx_pk, action, tx_digest, is_consumed in rows:
+            key = (tx_name, str(tx_pk))
+            if key in keys:
+                last_digests[key] = (
+                    None if action == DELETE or (applied and not is_consumed)
+                    else tx_digest)
+    return last_digests
+
+
+def is_duplicate(tx_name=None, tx_pk=None, tx_digest=None, action=None,
+                 last_digests=None):
+    """Returns True if the transaction is an insert or update with
+    the same digest as the last one of the instance.
+    """
+    return bool(
+        tx_digest and action != DELETE
+        and last_digests.get((tx_name, str(tx_pk))) == tx_digest)
+
+
+def get_duplicate_transaction(**fields):
+    """Returns an unsaved incoming transaction that records a
+    duplicate accepted at ingest: consumed, ignored and without its
+    payload, so its key is known to reconciliation.
+    """
+    IncomingTransaction = django_apps.get_model(
+        'edc_sync', 'IncomingTransaction')
+    return IncomingTransaction(
+        tx=b'', is_consumed=True, is_ignored=True,
+        consumed_datetime=get_utcnow(), consumer=DUPLICATE, **fields)
@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 from django.core import serializers
 
 
@@ -7,3 +10,17 @@ def serialize(objects=None):
         ensure_ascii=True,
         use_natural_foreign_keys=True,
         use_natural_primary_keys=False)
+
+
+def get_digest(json_text=None, exclude_fields=None):
+    """Returns the sha256 hex digest of serialized objects ignoring
+    `exclude_fields`, e.g. audit fields that change on every save.
+    """
+    exclude_fields = exclude_fields or []
+    objects = [
+        dict(model=obj.get('model'), pk=obj.get('pk'), fields={
+            k: v for k, v in obj.get('fields', {}).items()
+            if k not in exclude_fields})
+        for obj in json.loads(json_text)]
+    return hashlib.sha256(
+        json.dumps(objects, sort_keys=True).encode()).hexdigest()
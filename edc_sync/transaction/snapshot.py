@@ -0,0 +1,308 @@
+import json
+import socket
+
+from contextlib import ExitStack
+from uuid import uuid4
+
+from django.apps import apps as django_apps
+from django.core.serializers.base import DeserializationError
+from django.db import connections, transaction as db_transaction
+from django.db.models import Max
+from django_crypto_fields.constants import LOCAL_MODE
+from django_crypto_fields.cryptor import Cryptor
+from edc_base.utils import get_utcnow
+
+from ..constants import INSERT
+from ..dependency_graph import get_registered_models, sort_by_dependency
+from ..outgoing_log import Record
+from ..parsers import get_parsers_by_model
+from ..producer_summary import rebuild
+from ..routers import get_transaction_using
+from ..site_sync_models import site_sync_models
+from .batch_file import BatchFileReader, BatchFileWriter
+from .deserialize import deserialize
+from .upsert import bulk_insert
+
+SNAPSHOT = 'snapshot'
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotWriter:
+
+    """Writes the current state of the models registered with
+    site_sync_models to an indexed batch file (see BatchFileWriter),
+    one INSERT record per instance, parents first.
+
+    The rows are preceded by one record without payload per
+    transaction the state reflects (see `covered`), so the loader
+    knows exactly which transactions not to apply again, whatever
+    order they arrive in. The header has, per producer, the
+    timestamp of the last transaction covered, for information.
+
+    Rows and covered transactions are read in one transaction,
+    REPEATABLE READ on PostgreSQL. If the transaction log is in
+    another database (see EDC_SYNC_TRANSACTION_DATABASES) the covered
+    transactions are read first; transactions applied in between are
+    applied again after the load, which leaves the same state.
+
+    Usage:
+        header = SnapshotWriter(using='default').dump('snapshot.edcsync')
+    """
+
+    def __init__(self, using=None):
+        self.using = using or 'default'
+        self.transaction_using = get_transaction_using(self.using)
+        self.producer = f'{socket.gethostname()}-{self.using}'
+
+    @property
+    def models(self):
+        return sort_by_dependency(get_registered_models(site_sync_models.registry))
+
+    @property
+    def incoming(self):
+        IncomingTransaction = django_apps.get_model('edc_sync', 'IncomingTransaction')
+        return IncomingTransaction.objects.using(self.transaction_using).filter(
+            is_consumed=True)
+
+    @property
+    def outgoing(self):
+        OutgoingTransaction = django_apps.get_model('edc_sync', 'OutgoingTransaction')
+        return OutgoingTransaction.objects.using(self.transaction_using).filter(
+            producer=self.producer)
+
+    def get_positions(self):
+        """Returns {producer: timestamp} of the last transaction
+        covered of each producer.
+        """
+        positions = dict(self.incoming.order_by().values('producer').annotate(
+            timestamp=Max('timestamp')).values_list('producer', 'timestamp'))
+        timestamp = self.outgoing.aggregate(timestamp=Max('timestamp'))['timestamp']
+        if timestamp:
+            positions[self.producer] = max(timestamp, positions.get(self.producer, ''))
+        return positions
+
+    def covered(self):
+        """Yields a record without payload for each transaction the
+        state reflects: the consumed incoming transactions and this
+        host's outgoing transactions.
+        """
+        fields = [field for field in Record.meta_fields if field != 'using']
+        for queryset in [self.incoming, self.outgoing]:
+            for values in queryset.order_by().values(*fields).iterator():
+                yield Record(tx=b'', **{
+                    field: None if value is None else str(value)
+                    for field, value in values.items()})
+
+    def dump(self, filename=None):
+        """Writes the snapshot and returns its header.
+        """
+        with ExitStack() as stack:
+            for using in dict.fromkeys([self.transaction_using, self.using]):
+                stack.enter_context(db_transaction.atomic(using=using))
+                connection = connections[using]
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            models = self.models
+            header = dict(
+                format=SNAPSHOT,
+                snapshot_id=str(uuid4()),
+                producer=self.producer,
+                timestamp=get_utcnow().strftime('%Y%m%d%H%M%S%f'),
+                positions=self.get_positions(),
+                models=[model._meta.label_lower for model in models])
+            with BatchFileWriter(filename, header=header) as writer:
+                for record in self.covered():
+                    writer.add(record)
+                for model in models:
+                    for instance in model._base_manager.using(
+                            self.using).order_by('pk').iterator():
+                        writer.add(self.to_record(instance, header['timestamp']))
+        return header
+
+    def to_record(self, instance=None, timestamp=None):
+        wrapped_instance = site_sync_models.get_wrapped_instance(instance)
+        tx_name = instance._meta.label_lower
+        return Record(
+            tx=wrapped_instance.encrypted_json(),
+            tx_name=tx_name,
+            tx_pk=str(getattr(instance, wrapped_instance.primary_key_field.name)),
+            tx_digest=wrapped_instance.tx_digest,
+            timestamp=timestamp,
+            producer=self.producer,
+            action=INSERT,
+            priority=site_sync_models.get_priority(tx_name),
+            using=self.using)
+
+
+class SnapshotLoader:
+
+    """Loads a snapshot written by SnapshotWriter into an empty
+    database.
+
+    Rows are written with multi-row INSERTs (see `bulk_insert`), no
+    signals are sent and constraint checks are deferred to the end
+    of the load. Nothing is written if the load fails.
+
+    The transactions covered by the snapshot are saved as consumed
+    incoming transactions without payload, or consumed if already
+    received, so they are accepted without being saved when received
+    later (see IncomingTransactionBatchView). All other transactions
+    are applied as usual, e.g. by the apply_transactions command,
+    whatever their timestamp. The snapshot's positions are saved as
+    SnapshotPosition.
+
+    Usage:
+        header = SnapshotLoader(using='default').load('snapshot.edcsync')
+    """
+
+    batch_size = 500
+
+    def __init__(self, using=None, batch_size=None):
+        self.using = using or 'default'
+        self.transaction_using = get_transaction_using(self.using)
+        self.batch_size = batch_size or self.batch_size
+        edc_sync_app_config = django_apps.get_app_config('edc_sync')
+        self.json_parsers = list(edc_sync_app_config.custom_json_parsers)
+        self.parsers_by_model = get_parsers_by_model(
+            edc_sync_app_config.custom_field_parsers)
+        self.loaded_count = 0
+        self.covered_count = 0
+
+    def load(self, filename=None):
+        """Loads the snapshot and returns its header.
+        """
+        self.loaded_count = 0
+        self.covered_count = 0
+        with BatchFileReader(filename) as reader:
+            header = reader.header
+            models = self.get_models(header, filename)
+            connection = connections[self.using]
+            with ExitStack() as stack:
+                for using in dict.fromkeys([self.transaction_using, self.using]):
+                    stack.enter_context(db_transaction.atomic(using=using))
+                with connection.constraint_checks_disabled():
+                    self.load_records(reader)
+                connection.check_constraints(
+                    table_names=[model._meta.db_table for model in models])
+                self.save_positions(header)
+        rebuild(using=self.transaction_using)
+        return header
+
+    def get_models(self, header=None, filename=None):
+        """Returns the models of the snapshot or raises if it is not
+        a snapshot or the models have rows.
+        """
+        if header.get('format') != SNAPSHOT:
+            raise SnapshotError(f'Not a snapshot. Got {filename}.')
+        try:
+            models = [django_apps.get_model(label) for label in header['models']]
+        except LookupError as e:
+            raise SnapshotError(f'Unknown model in snapshot. Got {e}.') from e
+        for model in models:
+            if model._base_manager.using(self.using).exists():
+                raise SnapshotError(
+                    f'Snapshots load into an empty database. '
+                    f'Got {model._meta.label_lower} has rows.')
+        return models
+
+    def load_records(self, reader=None):
+        """Saves the covered transactions and inserts the rows, one
+        model at a time in batches of `batch_size`.
+        """
+        pending, covered = [], []
+        for record in reader.records():
+            if not record.tx:
+                covered.append(record)
+                if len(covered) >= self.batch_size:
+                    self.save_covered(covered)
+                continue
+            if pending and (len(pending) >= self.batch_size
+                            or pending[-1].object.__class__._meta.label_lower
+                            != record.tx_name):
+                self.insert(pending)
+            try:
+                pending.append(self.deserialize(record))
+            except DeserializationError:
+                if not pending:
+                    raise
+                self.insert(pending)
+                pending.append(self.deserialize(record))
+        self.insert(pending)
+        self.save_covered(covered)
+
+    def deserialize(self, record=None):
+        """Returns the deserialized object of a record, running the
+        custom parsers as TransactionDeserializer does.
+        """
+        json_text = Cryptor().aes_decrypt(record.tx, LOCAL_MODE)
+        for json_parser in self.json_parsers:
+            json_text = json_parser(json_text)
+        try:
+            json_data = json.loads(json_text)
+        except (TypeError, ValueError) as e:
+            raise DeserializationError(e) from e
+        for obj in json_data:
+            for field_parser in self.parsers_by_model.get(obj.get('model'), []):
+                field_parser(obj['fields'])
+        return next(deserialize(json_data=json_data))
+
+    def insert(self, pending=None):
+        """Inserts a list of deserialized objects of one model and
+        their m2m rows and empties the list.
+        """
+        if pending:
+            model = pending[0].object.__class__
+            bulk_insert(model=model, objs=[deserialized.object for deserialized in pending],
+                        using=self.using)
+            for attr in {attr for deserialized in pending for attr in deserialized.m2m_data}:
+                field = model._meta.get_field(attr)
+                through = field.remote_field.through
+                through._base_manager.using(self.using).bulk_create([
+                    through(**{f'{field.m2m_field_name()}_id': deserialized.object.pk,
+                               f'{field.m2m_reverse_field_name()}_id': value})
+                    for deserialized in pending
+                    for value in deserialized.m2m_data.get(attr, [])])
+            self.loaded_count += len(pending)
+            del pending[:]
+
+    def save_covered(self, records=None):
+        """Saves a list of covered transactions as consumed incoming
+        transactions, or consumes those already received, and empties
+        the list.
+        """
+        if records:
+            IncomingTransaction = django_apps.get_model('edc_sync', 'IncomingTransaction')
+            manager = IncomingTransaction.objects.using(self.transaction_using)
+            ids = [record.id for record in records]
+            now = get_utcnow()
+            manager.filter(pk__in=ids, is_consumed=False).update(
+                is_consumed=True, consumed_datetime=now, consumer=SNAPSHOT)
+            existing = set(str(pk) for pk in manager.filter(
+                pk__in=ids).values_list('pk', flat=True))
+            manager.bulk_create([
+                IncomingTransaction(
+                    id=record.id, tx=b'', tx_name=record.tx_name, tx_pk=record.tx_pk,
+                    tx_digest=record.tx_digest, timestamp=record.timestamp,
+                    producer=record.producer, action=record.action,
+                    priority=record.priority, is_consumed=True,
+                    consumed_datetime=now, consumer=SNAPSHOT)
+                for record in records if record.id not in existing])
+            self.covered_count += len(records)
+            del records[:]
+
+    def save_positions(self, header=None):
+        """Saves the positions of the snapshot.
+        """
+        SnapshotPosition = django_apps.get_model('edc_sync', 'SnapshotPosition')
+        for producer, timestamp in header.get('positions', {}).items():
+            SnapshotPosition.objects.using(self.transaction_using).update_or_create(
+                producer=producer,
+                defaults=dict(
+                    timestamp=timestamp,
+                    snapshot_id=header['snapshot_id'],
+                    loaded_datetime=get_utcnow()))
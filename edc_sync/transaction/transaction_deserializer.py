@@ -1,46 +1,122 @@
 from django_crypto_fields.constants import LOCAL_MODE
 from edc_device.constants import NODE_SERVER, CENTRAL_SERVER
-from edc_sync.models import IncomingTransaction
-from edc_sync_files.transaction.file_archiver import FileArchiver
+import json
 import socket
 
+from contextlib import contextmanager, ExitStack
+from itertools import islice
+from time import perf_counter
+
 from django.apps import apps as django_apps
+from django.core.serializers.base import DeserializationError
+from django.db import router, transaction as db_transaction
 from django_crypto_fields.cryptor import Cryptor
 
 from ..constants import DELETE
+from ..dependency_graph import sort_by_dependency
+from ..metrics import decrypt_seconds, deserialize_seconds, save_seconds, delete_seconds
+from ..metrics import applied_transactions_total, apply_rows_per_second
+from ..metrics import duplicate_transactions_total
+from ..parsers import get_parsers_by_model
+from ..producer_summary import SummaryUpdater
+from ..progress import ProgressReporter
+from ..site_sync_models import site_sync_models
+from .bulk_delete import BulkDelete
+from .claims import Claimer
+from .derived_history import derive_historical_objects
 from .deserialize import deserialize
+from .digests import get_last_digests, is_duplicate
+from .upsert import upsert
 
 
 class TransactionDeserializerError(Exception):
     pass
 
 
-def save(obj=None, m2m_data=None):
+def save(obj=None, m2m_data=None, using=None):
     """Saves a deserialized model object.
 
     Uses save_base to avoid running code in model.save() and
     to avoid triggering signals (if raw=True).
     """
     m2m_data = {} if m2m_data is None else m2m_data
-    obj.save_base(raw=True)
+    obj.save_base(raw=True, using=using)
     for attr, values in m2m_data.items():
         for value in values:
             getattr(obj, attr).add(value)
 
 
+def bulk_save(objects=None, using=None):
+    """Saves a list of deserialized (obj, m2m_data) tuples.
+
+    Objects are grouped by model and each group is written with a
+    multi-row upsert keyed on the primary key. If the same pk appears
+    more than once the last object wins. Falls back to `save` per
+    object if the backend has no upsert statement.
+
+    Groups are written parents first (see `sort_by_dependency`) in
+    one transaction so a child never refers to a parent not yet
+    written.
+    """
+    groups = {}
+    for obj, m2m_data in objects or []:
+        groups.setdefault(obj.__class__, {}).update({obj.pk: (obj, m2m_data)})
+    if not groups:
+        return
+    models = sort_by_dependency(list(groups))
+    with db_transaction.atomic(using=using or router.db_for_write(models[0])):
+        for model in models:
+            db = using or router.db_for_write(model)
+            items = groups[model].values()
+            if upsert(model=model, objs=[obj for obj, _ in items], using=db):
+                for obj, m2m_data in items:
+                    obj._state.db = db
+                    obj._state.adding = False
+                    for attr, values in (m2m_data or {}).items():
+                        for value in values:
+                            getattr(obj, attr).add(value)
+            else:
+                for obj, m2m_data in items:
+                    save(obj=obj, m2m_data=m2m_data, using=db)
+
+
 def aes_decrypt(cipher_text):
     return Cryptor().aes_decrypt(cipher_text, LOCAL_MODE)
 
 
 class TransactionDeserializer:
 
-    def __init__(self, using=None, allow_self=None, override_role=None, **kwargs):
+    batch_size = 500
+
+    histograms = dict(
+        decrypt=decrypt_seconds,
+        deserialize=deserialize_seconds,
+        save=save_seconds,
+        delete=delete_seconds)
+
+    def __init__(self, using=None, allow_self=None, override_role=None,
+                 batch_size=None, profiler=None, progress=None, on_flush=None,
+                 **kwargs):
         app_config = django_apps.get_app_config('edc_device')
+        edc_sync_app_config = django_apps.get_app_config('edc_sync')
+        self.json_parsers = list(edc_sync_app_config.custom_json_parsers)
+        self.parsers_by_model = get_parsers_by_model(
+            edc_sync_app_config.custom_field_parsers)
         self.aes_decrypt = aes_decrypt
         self.deserialize = deserialize
         self.save = save
+        self.bulk_save = bulk_save
         self.allow_self = allow_self
         self.using = using
+        self.batch_size = batch_size or self.batch_size
+        self.consumed_count = 0
+        self.skipped_count = 0
+        self.applied_digests = {}
+        self.profiler = profiler
+        self.progress = progress
+        self.owns_progress = progress is None
+        self.on_flush = on_flush
+        self.summary = SummaryUpdater()
         if not app_config.is_server:
             if override_role not in [NODE_SERVER, CENTRAL_SERVER]:
                 raise TransactionDeserializerError(
@@ -48,50 +124,286 @@ class TransactionDeserializer:
                     f'Got override_role={override_role}, device={app_config.device_id}, '
                     f'device_role={app_config.device_role}.')
 
-    def deserialize_transactions(self, transactions=None, deserialize_only=None):
+    def validate(self, transactions=None):
+        """Returns a ValidationResult of the decrypted payloads and
+        FK references of the transactions without writing anything.
+        """
+        from .transaction_validator import TransactionValidator
+        return TransactionValidator(
+            tx_deserializer=self, using=self.using).validate(transactions)
+
+    def deserialize_transactions(self, transactions=None, deserialize_only=None,
+                                 validate=None):
         """Deserializes the encrypted serialized model instances, tx, in a queryset
         of transactions.
 
         Note: each transaction instance contains encrypted JSON text
         that represents just ONE model instance.
+
+        Inserts and updates are buffered and written in batches of
+        `batch_size` (see `bulk_save`). The buffer is flushed whenever
+        a natural key cannot be resolved, since the referenced instance
+        may still be in the buffer.
+
+        Deletes are collected and applied at the end, children first
+        (see `BulkDelete`), or earlier if a later transaction refers
+        to a pk pending delete or is an insert or update of a model
+        with deletes pending or related to one by FK.
+
+        An insert or update with the same digest as the last one
+        applied for the instance is flagged as consumed without being
+        applied. Transactions covered by a loaded snapshot are
+        consumed by the load (see `snapshot`).
+
+        If `validate`, the transactions are validated first (see
+        `TransactionValidator`) and nothing is written if any payload
+        is bad or any reference does not resolve.
+
+        Progress per producer is published as job 'deserialize' (see
+        `ProgressReporter`) and finished at the end of the call, unless
+        a `progress` reporter was given, which the caller finishes,
+        e.g. at the end of a run of several calls.
         """
 
+        self.check_or_raise(transactions, validate=validate)
+        start = perf_counter()
+        self.consumed_count = 0
+        self.skipped_count = 0
+        self.applied_digests = {}
+        if self.owns_progress:
+            self.progress = None if deserialize_only else ProgressReporter(job='deserialize')
+        pending = []
+        bulk_delete = BulkDelete(
+            using=self.using, quarantine=self.quarantine,
+            consume=self.consume, chunk_size=self.batch_size,
+            stage=self.stage)
+        for transaction in self.with_applied_digests(transactions):
+            if self.should_skip(transaction):
+                if not deserialize_only:
+                    self.skip(transaction)
+                continue
+            if transaction.action == DELETE and not deserialize_only:
+                bulk_delete.add(transaction=transaction)
+                self.applied_digests[(transaction.tx_name, str(transaction.tx_pk))] = None
+                continue
+            if (transaction.tx_pk in bulk_delete
+                    or bulk_delete.blocks(django_apps.get_model(transaction.tx_name))):
+                self.flush(pending)
+                bulk_delete.apply()
+            deserialized = self.deserialize_transaction(transaction, pending)
+            if not deserialize_only:
+                self.buffer(transaction, deserialized, pending)
+        self.flush(pending)
+        bulk_delete.apply()
+        self.finish(start)
+
+    def check_or_raise(self, transactions=None, validate=None):
+        """Raises if the transactions include this host's own and
+        `allow_self` is not set or, if `validate`, if they are not
+        valid.
+        """
         if not self.allow_self and transactions.filter(
                 producer=socket.gethostname()).exists():
             raise TransactionDeserializerError(
                 f'Not deserializing own transactions. Got '
                 f'allow_self=False, hostname={socket.gethostname()}')
-        for transaction in transactions:
+        if validate:
+            result = self.validate(transactions)
+            if not result.is_valid:
+                raise TransactionDeserializerError(result.report())
+
+    def finish(self, start=None):
+        """Saves the summaries, ends the progress job and sets the
+        apply rate of the run started at `start`.
+        """
+        self.summary.save()
+        if self.progress and self.owns_progress:
+            self.progress.finish()
+        elapsed = perf_counter() - start
+        if self.consumed_count and elapsed:
+            apply_rows_per_second.set(self.consumed_count / elapsed)
+
+    def should_skip(self, transaction=None):
+        """Returns True if the transaction is an insert or update with
+        the digest last applied for its instance.
+        """
+        return is_duplicate(transaction.tx_name, transaction.tx_pk,
+                            transaction.tx_digest, transaction.action,
+                            self.applied_digests)
+
+    def deserialize_transaction(self, transaction=None, pending=None):
+        """Returns the deserialized object of a transaction.
+
+        If a natural key does not resolve the buffer is flushed and
+        the transaction deserialized again.
+        """
+        with self.stage('decrypt', transaction.tx_name):
             json_text = self.aes_decrypt(cipher_text=transaction.tx)
-            json_text = self.custom_parser(json_text)
-            deserialized = next(self.deserialize(json_text=json_text))
-            if not deserialize_only:
-                if transaction.action == DELETE:
-                    deserialized.object.delete()
-                else:
-                    self.save(
-                        obj=deserialized.object,
-                        m2m_data=deserialized.m2m_data)
-                transaction.is_consumed = True
-                transaction.save()
+        with self.stage('deserialize', transaction.tx_name):
+            if self.json_parsers:
+                json_text = self.custom_parser(json_text)
+            json_data = self.decode(json_text)
+            self.field_parser(json_data)
+            try:
+                return next(self.deserialize(json_data=json_data))
+            except DeserializationError:
+                if not pending:
+                    raise
+                self.flush(pending)
+                return next(self.deserialize(json_data=json_data))
+
+    def buffer(self, transaction=None, deserialized=None, pending=None):
+        """Adds a deserialized object to the buffer, flushing it when
+        full.
+        """
+        pending.append((transaction, deserialized))
+        self.applied_digests[(transaction.tx_name, str(transaction.tx_pk))] = (
+            transaction.tx_digest)
+        if len(pending) >= self.batch_size:
+            self.flush(pending)
+
+    def with_applied_digests(self, transactions=None):
+        """Yields the transactions, loading the digests last applied
+        for their instances in chunks of `batch_size`.
+        """
+        iterator = iter(transactions)
+        while True:
+            chunk = list(islice(iterator, self.batch_size))
+            if not chunk:
+                break
+            keys = [(tx.tx_name, tx.tx_pk) for tx in chunk
+                    if tx.tx_digest and (tx.tx_name, str(tx.tx_pk)) not in self.applied_digests]
+            if keys:
+                self.applied_digests.update(
+                    {key: value for key, value in get_last_digests(
+                        keys=keys, is_consumed=True).items()
+                     if key not in self.applied_digests})
+            yield from chunk
+
+    def skip(self, transaction=None):
+        """Flags a duplicate transaction as consumed without applying
+        it.
+        """
+        self.summary.consumed(transaction)
+        transaction.is_consumed = True
+        transaction.is_error = False
+        transaction.save()
+        self.skipped_count += 1
+        duplicate_transactions_total.inc(model=transaction.tx_name, stage='apply')
+
+    def flush(self, pending=None):
+        """Saves the buffered deserialized objects, flags their
+        transactions as consumed and empties the buffer.
+
+        For models registered with `derive_history` the historical
+        records are derived and saved in bulk as well.
+
+        `on_flush`, if given, is called after each flush, e.g. to
+        renew a claim (see ApplyWorker).
+        """
+        if pending:
+            groups = {}
+            for transaction, deserialized in pending:
+                groups.setdefault(
+                    deserialized.object.__class__, []).append((transaction, deserialized))
+            models = sort_by_dependency(list(groups))
+            with db_transaction.atomic(using=self.using or router.db_for_write(models[0])):
+                for model in models:
+                    self.save_group(model, groups[model])
+            for transaction, _ in pending:
+                self.consume(transaction)
+            del pending[:]
+            self.summary.save()
+            if self.on_flush:
+                self.on_flush()
+
+    def save_group(self, model=None, group=None):
+        """Saves the buffered objects of one model and, if the model
+        is registered with `derive_history`, their historical records.
+        """
+        with self.stage('save', model._meta.label_lower):
+            self.bulk_save(
+                objects=[(deserialized.object, deserialized.m2m_data)
+                         for _, deserialized in group],
+                using=self.using)
+            if hasattr(model, 'history') and site_sync_models.derives_history(model):
+                historical_objs = derive_historical_objects(
+                    model=model, items=[(transaction, deserialized.object)
+                                        for transaction, deserialized in group])
+                self.bulk_save(
+                    objects=[(obj, None) for obj in historical_objs],
+                    using=self.using)
+
+    def consume(self, transaction=None):
+        """Flags a transaction as consumed, clearing `is_error` if it
+        was retried.
+        """
+        self.summary.consumed(transaction)
+        transaction.is_consumed = True
+        transaction.is_error = False
+        transaction.save()
+        self.consumed_count += 1
+        applied_transactions_total.inc(
+            model=transaction.tx_name, action=transaction.action)
+        if self.profiler:
+            self.profiler.progress(self.consumed_count)
+        if self.progress:
+            self.progress.add(
+                host=transaction.producer, count=1, bytes=len(transaction.tx or ''))
+
+    @contextmanager
+    def stage(self, name=None, tx_name=None):
+        """Times a stage of the run for a model in the metrics
+        and, if set, the profiler.
+        """
+        with ExitStack() as stack:
+            stack.enter_context(self.histograms[name].time(model=tx_name))
+            if self.profiler:
+                stack.enter_context(self.profiler.stage(name, tx_name))
+            yield
+
+    def quarantine(self, transaction=None, error=None):
+        """Flags a transaction as an error, leaving it unconsumed,
+        instead of aborting the run.
+        """
+        self.summary.error(transaction)
+        transaction.is_error = True
+        transaction.error = str(error)[:1000]
+        transaction.save()
 
     def custom_parser(self, json_text=None):
         """Runs json_text thru custom parsers.
         """
-        app_config = django_apps.get_app_config('edc_sync')
-        for json_parser in app_config.custom_json_parsers:
+        for json_parser in self.json_parsers:
             json_text = json_parser(json_text)
         return json_text
 
+    def decode(self, json_text=None):
+        """Returns the decoded JSON text.
+        """
+        try:
+            return json.loads(json_text)
+        except (TypeError, ValueError) as e:
+            raise DeserializationError(e) from e
+
+    def field_parser(self, json_data=None):
+        """Runs the fields of each decoded object thru the custom
+        field parsers registered for its model, if any.
+        """
+        if self.parsers_by_model:
+            for obj in json_data:
+                for field_parser in self.parsers_by_model.get(obj.get('model'), []):
+                    field_parser(obj['fields'])
+
 
 class CustomTransactionDeserializer(TransactionDeserializer):
 
-    file_archiver_cls = FileArchiver
+    file_archiver_cls = None
 
     def __init__(self,
                  using=None, allow_self=None, override_role=None,
                  order_by=None, model=None, batch=None, producer=None,
-                 **options):
+                 validate=None, dry_run=None, **options):
         super().__init__(**options)
         self.allow_self = allow_self
         self.aes_decrypt = aes_decrypt
@@ -99,6 +411,7 @@ class CustomTransactionDeserializer(TransactionDeserializer):
         self.override_role = override_role
         self.save = save
         self.using = using
+        self.validation_result = None
         """ Find how inherit parent properties.
         """
         filters = {}
@@ -109,16 +422,32 @@ class CustomTransactionDeserializer(TransactionDeserializer):
         if producer:
             filters.update({'producer': producer})
         if filters:
+            claimer = None
             try:
-                transactions = IncomingTransaction.objects.filter(
-                    **filters).order_by(*order_by.split(','))
-                self.deserialize_transactions(transactions=transactions)
+                transactions = django_apps.get_model(
+                    'edc_sync', 'IncomingTransaction').objects.filter(**filters)
+                if dry_run:
+                    self.validation_result = self.validate(
+                        transactions.order_by(*order_by.split(',')))
+                    return
+                claimer = Claimer(using=using, retry_errors=True)
+                transactions = claimer.claim(queryset=transactions).order_by(
+                    *order_by.split(','))
+                self.deserialize_transactions(
+                    transactions=transactions, validate=validate)
             except TransactionDeserializerError as e:
                 raise TransactionDeserializerError(e) from e
             else:
-                obj = self.file_archiver_cls(
+                file_archiver_cls = self.file_archiver_cls
+                if not file_archiver_cls:
+                    from edc_sync_files.transaction.file_archiver import FileArchiver
+                    file_archiver_cls = FileArchiver
+                obj = file_archiver_cls(
                     src_path=django_apps.get_app_config(
                         'edc_sync').pending_folder,
                     dst_path=django_apps.get_app_config(
                         'edc_sync').archive_folder)
                 obj.archive(filename=f'{batch}.json')
+            finally:
+                if claimer:
+                    claimer.release()
@@ -0,0 +1,224 @@
+import gzip
+import requests
+
+from time import perf_counter
+from urllib.parse import urlparse
+
+from django.apps import apps as django_apps
+from edc_base.utils import get_utcnow
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+from rest_framework.renderers import JSONRenderer
+
+from ..outgoing_log import outgoing_transactions_or_raise
+from ..progress import ProgressReporter
+from ..queue_version import bump, OUTGOING
+from ..serializers import OutgoingTransactionSerializer
+from .batch_tuner import BatchSizeTuner, Throttle
+
+
+class TransactionPusherError(Exception):
+    pass
+
+
+class TransactionPusherServerError(TransactionPusherError):
+    pass
+
+
+class TransactionPusherThrottled(TransactionPusherError):
+
+    def __init__(self, message=None, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TransactionPusher:
+
+    """Pushes pending outgoing transactions to the server's
+    batch ingest API.
+
+    Transactions are read in batches, POSTed gzip compressed over
+    one persistent (keep-alive) `requests.Session` and flagged as
+    consumed by the server once acknowledged.
+
+    Unless `batch_size` is given, the batch size is tuned to the
+    link, starting from `initial_batch_size` (see BatchSizeTuner).
+    If `max_bytes_per_second`, requests are spaced to stay under
+    the cap (see Throttle). A batch that times out, fails to
+    connect or gets a 5xx is retried smaller up to `max_retries`
+    times.
+
+    If the server answers 429, the pusher waits for Retry-After and
+    retries smaller, up to `max_throttled_retries` times in a row.
+
+    Usage:
+        pusher = TransactionPusher(
+            url='http://server:8000/edc_sync/api/incomingtransaction-batch/',
+            token='...')
+        pusher.push()
+    """
+
+    default_batch_size = 100
+    max_retries = 3
+    max_throttled_retries = 10
+    retried_errors = (ConnectionError, Timeout, TransactionPusherServerError)
+    timeout = 60
+    url_template = 'http://{hostname}:{port}/edc_sync/api/incomingtransaction-batch/'
+
+    def __init__(self, url=None, token=None, using=None, batch_size=None,
+                 timeout=None, session=None, initial_batch_size=None,
+                 max_bytes_per_second=None, target_seconds=None):
+        outgoing_transactions_or_raise()
+        self.url = url
+        self.using = using or 'default'
+        self.timeout = timeout or self.timeout
+        self.session = session or self.get_session(token=token)
+        self.tuner = BatchSizeTuner(
+            batch_size=batch_size or initial_batch_size or self.default_batch_size,
+            target_seconds=target_seconds, fixed=bool(batch_size))
+        self.throttle = Throttle(max_bytes_per_second=max_bytes_per_second)
+        self.pushed_count = 0
+        self.progress = None
+
+    @classmethod
+    def from_host(cls, host=None, **kwargs):
+        """Returns a pusher for a `Server` host model instance
+        using the host's bytes per second cap and last tuned
+        batch size.
+        """
+        kwargs.setdefault('initial_batch_size', host.batch_size)
+        kwargs.setdefault('max_bytes_per_second', host.max_bytes_per_second)
+        return cls(url=cls.url_template.format(
+            hostname=host.hostname, port=host.port), **kwargs)
+
+    @property
+    def batch_size(self):
+        return self.tuner.batch_size
+
+    def get_session(self, token=None):
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        session.headers.update({
+            'Authorization': f'Token {token}',
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip'})
+        return session
+
+    @property
+    def pending(self):
+        """Returns the pending transactions, higher priority lanes
+        first.
+        """
+        OutgoingTransaction = django_apps.get_model(
+            'edc_sync', 'OutgoingTransaction')
+        return OutgoingTransaction.objects.using(self.using).filter(
+            is_consumed_server=False).order_by('-priority', 'timestamp')
+
+    def push(self):
+        """Pushes batches until there are no pending transactions
+        and returns the number of transactions pushed.
+
+        Progress is published as job 'push' (see `ProgressReporter`).
+        """
+        self.progress = ProgressReporter(job='push')
+        retries = throttled_retries = 0
+        while True:
+            batch = list(self.pending[:self.batch_size])
+            if not batch:
+                break
+            try:
+                accepted = self.post(batch)
+            except self.retried_errors:
+                retries += 1
+                if retries > self.max_retries:
+                    raise
+                continue
+            except TransactionPusherThrottled as e:
+                throttled_retries += 1
+                if throttled_retries > self.max_throttled_retries:
+                    raise
+                self.throttle.sleep(e.retry_after)
+                continue
+            retries = throttled_retries = 0
+            if not accepted:
+                raise TransactionPusherError(
+                    f'Server accepted none of {len(batch)} transactions. '
+                    f'Got url={self.url}.')
+            self.consume(accepted)
+        self.progress.finish()
+        return self.pushed_count
+
+    def send(self, batch=None):
+        """POSTs a batch, retrying as `push` does on connection
+        errors, timeouts, 5xx and 429, and returns the pks acknowledged.
+        """
+        retries = throttled_retries = 0
+        while True:
+            try:
+                return self.post(batch)
+            except self.retried_errors:
+                retries += 1
+                if retries > self.max_retries:
+                    raise
+            except TransactionPusherThrottled as e:
+                throttled_retries += 1
+                if throttled_retries > self.max_throttled_retries:
+                    raise
+                self.throttle.sleep(e.retry_after)
+
+    def post(self, batch=None):
+        """POSTs a batch and returns the pks acknowledged by
+        the server.
+
+        The round trip is recorded by the tuner; connection errors,
+        timeouts, 5xx and 429 count as failures.
+        """
+        data = OutgoingTransactionSerializer(batch, many=True).data
+        body = gzip.compress(JSONRenderer().render(data))
+        self.throttle.wait()
+        started = self.throttle.clock()
+        start = perf_counter()
+        try:
+            response = self.session.post(self.url, data=body, timeout=self.timeout)
+        except (ConnectionError, Timeout):
+            self.tuner.failed()
+            raise
+        finally:
+            self.throttle.sent(len(body), started)
+        if response.status_code == 429:
+            self.tuner.failed()
+            raise TransactionPusherThrottled(
+                f'Server is throttling. Got url={self.url}.',
+                retry_after=self.get_retry_after(response))
+        if response.status_code >= 500:
+            self.tuner.failed()
+            raise TransactionPusherServerError(
+                f'Server error {response.status_code}. Got url={self.url}.')
+        response.raise_for_status()
+        self.tuner.completed(
+            seconds=perf_counter() - start, size=len(batch), bytes=len(body))
+        accepted = response.json().get('accepted', [])
+        if self.progress:
+            self.progress.add(
+                host=urlparse(self.url).netloc, count=len(accepted), bytes=len(body))
+        return accepted
+
+    def get_retry_after(self, response=None):
+        try:
+            return max(1, int(response.headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return 1
+
+    def consume(self, accepted=None):
+        OutgoingTransaction = django_apps.get_model(
+            'edc_sync', 'OutgoingTransaction')
+        queryset = OutgoingTransaction.objects.using(self.using).filter(
+            pk__in=accepted)
+        producers = set(queryset.values_list('producer', flat=True).distinct())
+        self.pushed_count += queryset.update(
+            is_consumed_server=True,
+            consumed_datetime=get_utcnow(),
+            consumer=self.url)
+        for producer in producers:
+            bump(OUTGOING, producer=producer)
@@ -0,0 +1,210 @@
+import inspect
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps as django_apps
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db.models import Q
+
+from ..constants import DELETE
+
+
+def get_natural_key_fields(model=None):
+    """Returns the list of field names of the natural key of a model
+    inferred from the arguments of `get_by_natural_key`, or None
+    if they are not all concrete non-relation fields of the model.
+    """
+    try:
+        method = model._default_manager.get_by_natural_key
+    except AttributeError:
+        return None
+    names = [name for name, param in inspect.signature(method).parameters.items()
+             if param.kind == param.POSITIONAL_OR_KEYWORD]
+    fields = {field.name: field for field in model._meta.concrete_fields}
+    if not names or any(name not in fields or fields[name].is_relation
+                        for name in names):
+        return None
+    return names
+
+
+def freeze(value):
+    """Returns a hashable natural key.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class ValidationResult:
+
+    def __init__(self):
+        self.count = 0
+        self.bad_payloads = {}
+        self.unresolved = {}
+
+    @property
+    def is_valid(self):
+        return not self.bad_payloads and not self.unresolved
+
+    def report(self):
+        lines = [f'Validated {self.count} transactions. '
+                 f'{len(self.bad_payloads)} bad payloads, '
+                 f'{len(self.unresolved)} unresolved references.']
+        for transaction, error in self.bad_payloads.items():
+            lines.append(f'  bad payload {transaction.tx_name} {transaction.pk}: {error}')
+        for (label, key), transactions in sorted(
+                self.unresolved.items(), key=lambda item: str(item[0])):
+            lines.append(
+                f'  unresolved {label} {list(key) if isinstance(key, tuple) else key} '
+                f'referred to by {len(transactions)} transactions, e.g. '
+                f'{transactions[0].tx_name} {transactions[0].pk}')
+        return '\n'.join(lines)
+
+
+class TransactionValidator:
+
+    """Validates a batch of incoming transactions before any write.
+
+    Decrypts and decodes every transaction in parallel (threads),
+    collects every FK and m2m reference, by natural key or pk, and
+    resolves them against the batch itself and then the DB with one
+    query per referenced model.
+
+    Natural keys are looked up by the fields named in the
+    arguments of the model manager's `get_by_natural_key`. If those
+    are not plain fields of the model, each key is looked up with
+    `get_by_natural_key`.
+
+    Usage:
+        validator = TransactionValidator(tx_deserializer=tx_deserializer)
+        result = validator.validate(transactions)
+        if not result.is_valid:
+            print(result.report())
+    """
+
+    max_workers = 4
+    chunk_size = 250
+
+    def __init__(self, tx_deserializer=None, using=None, max_workers=None):
+        self.tx_deserializer = tx_deserializer
+        self.using = using
+        self.max_workers = max_workers or self.max_workers
+
+    def validate(self, transactions=None):
+        result = ValidationResult()
+        transactions = [tx for tx in transactions if tx.action != DELETE]
+        result.count = len(transactions)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            decoded = list(executor.map(self.decode, transactions))
+        batch_pks, batch_keys, references = {}, {}, {}
+        for transaction, json_data, error in decoded:
+            if error:
+                result.bad_payloads.update({transaction: error})
+                continue
+            for obj in json_data:
+                try:
+                    model = django_apps.get_model(obj['model'])
+                    fields = obj['fields']
+                except (KeyError, LookupError, TypeError, ValueError) as e:
+                    result.bad_payloads.update({transaction: f'{e.__class__.__name__}: {e}'})
+                    break
+                label = model._meta.label_lower
+                batch_pks.setdefault(label, set()).add(str(obj.get('pk')))
+                names = get_natural_key_fields(model)
+                if names and all(name in fields for name in names):
+                    batch_keys.setdefault(label, set()).add(
+                        freeze([fields[name] for name in names]))
+                for related_model, value in self.get_references(model, fields):
+                    references.setdefault(
+                        related_model._meta.label_lower, {}).setdefault(
+                            freeze(value), []).append(transaction)
+        for label, keys in references.items():
+            model = django_apps.get_model(label)
+            pending = {key: txs for key, txs in keys.items()
+                       if key not in batch_keys.get(label, set())
+                       and str(key) not in batch_pks.get(label, set())}
+            for key in self.unresolved(model, list(pending)):
+                result.unresolved.update({(label, key): pending[key]})
+        return result
+
+    def decode(self, transaction=None):
+        """Returns a tuple of (transaction, json_data, error).
+        """
+        tx_deserializer = self.tx_deserializer
+        try:
+            json_text = tx_deserializer.aes_decrypt(cipher_text=transaction.tx)
+            if tx_deserializer.json_parsers:
+                json_text = tx_deserializer.custom_parser(json_text)
+            json_data = json.loads(json_text)
+            tx_deserializer.field_parser(json_data)
+        except Exception as e:
+            return transaction, None, f'{e.__class__.__name__}: {e}'
+        return transaction, json_data, None
+
+    def get_references(self, model=None, fields=None):
+        """Yields (related model, natural key or pk) for the FK and
+        m2m values of a decoded object.
+        """
+        for field in model._meta.concrete_fields:
+            if field.is_relation and field.related_model:
+                value = fields.get(field.name)
+                if value is not None:
+                    yield field.related_model, value
+        for field in model._meta.many_to_many:
+            for value in fields.get(field.name) or []:
+                yield field.related_model, value
+
+    def unresolved(self, model=None, keys=None):
+        """Returns the keys, natural keys (tuples) or pks, not found
+        in the DB.
+        """
+        manager = model._default_manager.using(self.using)
+        natural_keys = [key for key in keys if isinstance(key, tuple)]
+        pks = [key for key in keys if not isinstance(key, tuple)]
+        missing = self.unresolved_pks(manager, pks)
+        names = get_natural_key_fields(model)
+        if names:
+            for index in range(0, len(natural_keys), self.chunk_size):
+                missing.extend(self.unresolved_natural_keys(
+                    manager, names, natural_keys[index:index + self.chunk_size]))
+        else:
+            for key in natural_keys:
+                try:
+                    manager.get_by_natural_key(*key)
+                except (ObjectDoesNotExist, TypeError):
+                    missing.append(key)
+        return missing
+
+    def unresolved_pks(self, manager=None, pks=None):
+        """Returns the pks not found, one query per chunk.
+        """
+        found = set()
+        for index in range(0, len(pks), self.chunk_size):
+            found.update(str(pk) for pk in manager.filter(
+                pk__in=pks[index:index + self.chunk_size]).values_list('pk', flat=True))
+        return [pk for pk in pks if str(pk) not in found]
+
+    def unresolved_natural_keys(self, manager=None, names=None, natural_keys=None):
+        """Returns the natural keys not found, looked up by the
+        natural key fields `names` in one query.
+        """
+        fields = [manager.model._meta.get_field(name) for name in names]
+        missing, chunk = [], {}
+        for key in natural_keys:
+            try:
+                if len(key) != len(names):
+                    raise ValidationError('Wrong number of values.')
+                chunk.update({tuple(
+                    field.to_python(value)
+                    for field, value in zip(fields, key)): key})
+            except ValidationError:
+                missing.append(key)
+        if chunk:
+            q = Q()
+            for key in chunk:
+                q |= Q(**dict(zip(names, key)))
+            found = set(manager.filter(q).values_list(*names))
+            missing.extend(key for python_key, key in chunk.items()
+                           if python_key not in found)
+        return missing
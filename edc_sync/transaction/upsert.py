@@ -0,0 +1,104 @@
+from django.db import connections
+
+
+def get_upsert_template(model=None, connection=None):
+    """Returns a tuple of (insert sql, conflict sql) for a multi-row
+    INSERT ... ON CONFLICT keyed on the primary key, or None if the
+    backend has no such statement.
+    """
+    qn = connection.ops.quote_name
+    fields = model._meta.local_concrete_fields
+    pk_column = qn(model._meta.pk.column)
+    columns = [qn(field.column) for field in fields]
+    update_columns = [
+        qn(field.column) for field in fields if not field.primary_key]
+    insert_sql = 'INSERT INTO {table} ({columns}) VALUES '.format(
+        table=qn(model._meta.db_table), columns=', '.join(columns))
+    if connection.vendor == 'postgresql' or (
+            connection.vendor == 'sqlite'
+            and connection.Database.sqlite_version_info >= (3, 24, 0)):
+        conflict_sql = ' ON CONFLICT ({pk}) DO UPDATE SET {updates}'.format(
+            pk=pk_column,
+            updates=', '.join(f'{c} = EXCLUDED.{c}' for c in update_columns))
+    elif connection.vendor == 'mysql':
+        # fires on a clash with any unique index, see `upsert`
+        conflict_sql = ' ON DUPLICATE KEY UPDATE {updates}'.format(
+            updates=', '.join(f'{c} = VALUES({c})' for c in update_columns))
+    else:
+        return None
+    return insert_sql, conflict_sql
+
+
+def upsert(model=None, objs=None, using=None):
+    """Writes model instances with one multi-row upsert per chunk.
+
+    Values are prepared as for a raw save, that is, field `pre_save`
+    hooks (e.g. hostname_modified, revision) are not called.
+
+    Only a clash on the primary key updates a row; a clash on any
+    other unique constraint raises IntegrityError, as `save` does.
+    MySQL's ON DUPLICATE KEY fires on any unique index, so for a
+    model with other unique constraints new rows are inserted with a
+    plain multi-row INSERT and existing rows are saved one by one.
+
+    Returns False, without writing, if the backend is not supported.
+    """
+    connection = connections[using]
+    template = get_upsert_template(model=model, connection=connection)
+    if not template:
+        return False
+    insert_sql, conflict_sql = template
+    if connection.vendor == 'mysql' and has_other_unique(model):
+        existing = set(model._base_manager.using(using).filter(
+            pk__in=[obj.pk for obj in objs]).values_list('pk', flat=True))
+        execute_rows(model=model, objs=[obj for obj in objs if obj.pk not in existing],
+                     connection=connection, insert_sql=insert_sql)
+        for obj in objs:
+            if obj.pk in existing:
+                obj.save_base(raw=True, using=using)
+        return True
+    execute_rows(model=model, objs=objs, connection=connection,
+                 insert_sql=insert_sql, conflict_sql=conflict_sql)
+    return True
+
+
+def has_other_unique(model=None):
+    """Returns True if the model has a unique constraint other than
+    the primary key.
+    """
+    return bool(model._meta.unique_together) or any(
+        field.unique and not field.primary_key
+        for field in model._meta.local_concrete_fields)
+
+
+def bulk_insert(model=None, objs=None, using=None):
+    """Inserts model instances with one multi-row INSERT per chunk,
+    values prepared as for a raw save (see `upsert`). Signals are
+    not sent.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    insert_sql = 'INSERT INTO {table} ({columns}) VALUES '.format(
+        table=qn(model._meta.db_table),
+        columns=', '.join(
+            qn(field.column) for field in model._meta.local_concrete_fields))
+    execute_rows(model=model, objs=objs, connection=connection,
+                 insert_sql=insert_sql)
+
+
+def execute_rows(model=None, objs=None, connection=None, insert_sql=None,
+                 conflict_sql=None):
+    fields = model._meta.local_concrete_fields
+    row_sql = '({})'.format(', '.join(['%s'] * len(fields)))
+    batch_size = max(connection.ops.bulk_batch_size(fields, objs), 1)
+    with connection.cursor() as cursor:
+        for index in range(0, len(objs), batch_size):
+            chunk = objs[index:index + batch_size]
+            params = []
+            for obj in chunk:
+                params.extend(
+                    field.get_db_prep_save(
+                        getattr(obj, field.attname), connection=connection)
+                    for field in fields)
+            sql = insert_sql + ', '.join([row_sql] * len(chunk)) + (conflict_sql or '')
+            cursor.execute(sql, params)
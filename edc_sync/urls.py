@@ -4,9 +4,10 @@ from rest_framework.authtoken.views import obtain_auth_token
 from rest_framework.routers import DefaultRouter
 
 from .admin import edc_sync_admin
-from .views import DumpToUsbView, HomeView, RenderView
+from .views import DumpToUsbView, HomeView, RenderView, MetricsView
 from .views import OutgoingTransactionViewSet, IncomingTransactionViewSet
-from .views import TransactionCountView, SyncReportView
+from .views import TransactionCountView, SyncReportView, IncomingTransactionBatchView
+from .views import ReconciliationView, ProgressStreamView, IngestLimitsView
 
 
 router = DefaultRouter()
@@ -19,6 +20,16 @@ urlpatterns = [
     url(r'^admin/', edc_sync_admin.urls),
     url(r'^api/transaction-count/$',
         TransactionCountView.as_view(), name='transaction-count'),
+    url(r'^api/incomingtransaction-batch/$',
+        IncomingTransactionBatchView.as_view(), name='incomingtransaction-batch'),
+    url(r'^api/ingest-limits/$',
+        IngestLimitsView.as_view(), name='ingest-limits'),
+    url(r'^api/reconcile/$',
+        ReconciliationView.as_view(), name='reconcile'),
+    url(r'^progress/$',
+        ProgressStreamView.as_view(), name='progress'),
+    url(r'^api/metrics/$',
+        MetricsView.as_view(), name='metrics'),
     url(r'^dump-to-usb/$',
         DumpToUsbView.as_view(), name='dump-to-usb'),
     url(r'^sync-report/$',
@@ -1,5 +1,10 @@
 from .dump_to_usb_view import DumpToUsbView
 from .home_view import HomeView
+from .incoming_transaction_batch_view import IncomingTransactionBatchView
+from .ingest_limits_view import IngestLimitsView
+from .metrics_view import MetricsView
+from .progress_stream_view import ProgressStreamView
+from .reconciliation_view import ReconciliationView
 from .render_view import RenderView
 from .sync_report_view import SyncReportView
 # from .sync_report_client_view import SyncReportClientViews
@@ -11,13 +11,13 @@ from django.views.decorators.cache import never_cache
 from django.views.generic.base import TemplateView
 from edc_base.view_mixins import EdcBaseViewMixin
 from edc_navbar import NavbarViewMixin
-from edc_sync_files.action_handler import ActionHandler, ActionHandlerError
 
 from ..admin import edc_sync_admin
+from ..constants import CLIENT
 from ..edc_sync_view_mixin import EdcSyncViewMixin
 from ..site_sync_models import site_sync_models
+from ..transaction.apply_worker import get_progress_job, get_worker_stats
 
-app_config = django_apps.get_app_config('edc_sync_files')
 logger = logging.getLogger('edc_sync')
 
 
@@ -26,7 +26,7 @@ logger = logging.getLogger('edc_sync')
 class HomeView(EdcBaseViewMixin, NavbarViewMixin, EdcSyncViewMixin, TemplateView):
 
     template_name = 'edc_sync/home.html'
-    action_handler_cls = ActionHandler
+    action_handler_cls = None
 
     navbar_name = 'edc_sync'
     navbar_selected_item = 'synchronization'
@@ -38,7 +38,10 @@ class HomeView(EdcBaseViewMixin, NavbarViewMixin, EdcSyncViewMixin, TemplateView
     @property
     def action_handler(self):
         if not self._action_handler:
-            self._action_handler = self.action_handler_cls(
+            from edc_sync_files.action_handler import ActionHandler
+            action_handler_cls = self.action_handler_cls or ActionHandler
+            app_config = django_apps.get_app_config('edc_sync_files')
+            self._action_handler = action_handler_cls(
                 src_path=app_config.outgoing_folder,
                 dst_tmp=app_config.tmp_folder,
                 dst_path=app_config.incoming_folder,
@@ -66,12 +69,15 @@ class HomeView(EdcBaseViewMixin, NavbarViewMixin, EdcSyncViewMixin, TemplateView
                 'edc_sync_files').remote_host,
             pending_files=self.action_handler.pending_filenames,
             recently_sent_files=self.action_handler.sent_history[0:20],
-            site_models=site_sync_models.site_models)
+            site_models=site_sync_models.site_models,
+            progress_jobs=json.dumps(self.progress_jobs))
         return context
 
     def get(self, request, *args, **kwargs):
-        context = self.get_context_data(**kwargs)
+        """Answers AJAX actions without building the page context.
+        """
         if request.is_ajax():
+            from edc_sync_files.action_handler import ActionHandlerError
             action = request.GET.get('action')
             try:
                 self.action_handler.action(label=action)
@@ -83,7 +89,18 @@ class HomeView(EdcBaseViewMixin, NavbarViewMixin, EdcSyncViewMixin, TemplateView
                 response_data = self.action_handler.data
             return HttpResponse(
                 json.dumps(response_data), content_type='application/json')
-        return self.render_to_response(context)
+        return self.render_to_response(self.get_context_data(**kwargs))
+
+    @property
+    def progress_jobs(self):
+        """Returns the jobs whose progress is streamed to the page,
+        see ProgressStreamView.
+        """
+        if self.device_role == CLIENT:
+            return ['push']
+        return ['deserialize'] + [
+            get_progress_job(stats['worker']) for stats in get_worker_stats()
+            if not stats.get('stopped')]
 
     @property
     def cors_origin_whitelist(self):
@@ -0,0 +1,129 @@
+import gzip
+
+from io import BytesIO
+from uuid import UUID
+
+from django.db import transaction
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..constants import PRIORITY_NORMAL
+from ..metrics import api_batch_size, duplicate_transactions_total
+from ..models import IncomingTransaction
+from ..producer_summary import collect_received
+from ..routers import get_transaction_using
+from ..serializers import IncomingTransactionSerializer
+from ..throttling import IngestLimitMixin
+from ..transaction.digests import get_duplicate_transaction, get_last_digests, is_duplicate
+
+
+class GzipJSONParser(JSONParser):
+    """
+    A JSON parser that accepts a gzip compressed body if the
+    request has header `Content-Encoding: gzip`.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        if request and request.META.get('HTTP_CONTENT_ENCODING') == 'gzip':
+            stream = BytesIO(gzip.decompress(stream.read()))
+        return super().parse(
+            stream, media_type=media_type, parser_context=parser_context)
+
+
+class IncomingTransactionBatchView(IngestLimitMixin, APIView):
+    """
+    A view that accepts a batch of outgoing transactions from a
+    producer and saves them as incoming transactions.
+
+    Returns the pks of the outgoing transactions accepted so the
+    producer can flag them as consumed. Incoming transactions keep
+    the producer's pk, so a batch sent again after a lost response
+    is accepted without being saved twice. Transactions with the same
+    digest as the last one received for the instance, if already
+    applied, are accepted and recorded as ignored duplicates without their payload (see
+    `get_duplicate_transaction`).
+
+    Answers 429 with Retry-After when a producer exceeds its rate or
+    too many batches are being ingested, see IngestLimitMixin.
+    """
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (GzipJSONParser,)
+    renderer_classes = (JSONRenderer,)
+
+    def post(self, request):
+        accepted, rejected, duplicates = [], {}, []
+        records = request.data if isinstance(request.data, list) else []
+        api_batch_size.observe(
+            len(records), resource='incomingtransaction', method='POST')
+        last_digests = get_last_digests(
+            keys=[(record.get('tx_name'), record.get('tx_pk')) for record in records
+                  if isinstance(record, dict) and record.get('tx_digest')],
+            applied=True)
+        existing = self.get_existing(records)
+        with transaction.atomic(using=get_transaction_using()), collect_received():
+            for record in records:
+                if str(record.get('pk')) in existing:
+                    accepted.append(record.get('pk'))
+                    continue
+                if is_duplicate(record.get('tx_name'), record.get('tx_pk'),
+                                record.get('tx_digest'), record.get('action'),
+                                last_digests):
+                    duplicate_transactions_total.inc(
+                        model=record.get('tx_name'), stage='ingest')
+                    duplicates.append(self.to_duplicate(record))
+                    accepted.append(record.get('pk'))
+                    existing.add(str(record.get('pk')))
+                    continue
+                serializer = IncomingTransactionSerializer(
+                    data=self.to_incoming(record))
+                if serializer.is_valid():
+                    serializer.save(id=record.get('pk'))
+                    accepted.append(record.get('pk'))
+                    existing.add(str(record.get('pk')))
+                    last_digests[(record.get('tx_name'), str(record.get('tx_pk')))] = None
+                else:
+                    rejected.update({record.get('pk'): serializer.errors})
+            IncomingTransaction.objects.bulk_create(duplicates)
+        return Response(
+            {'accepted': accepted, 'rejected': rejected},
+            status=status.HTTP_200_OK)
+
+    def get_existing(self, records):
+        """Returns the set of pks, as str, of the records already
+        received.
+        """
+        pks = []
+        for record in records:
+            try:
+                pks.append(UUID(str(record.get('pk'))))
+            except (AttributeError, ValueError):
+                pass
+        return set(str(pk) for pk in IncomingTransaction.objects.filter(
+            pk__in=pks).values_list('pk', flat=True))
+
+    def to_duplicate(self, record):
+        return get_duplicate_transaction(
+            id=record.get('pk'), tx_name=record.get('tx_name'),
+            tx_pk=record.get('tx_pk'), tx_digest=record.get('tx_digest'),
+            timestamp=record.get('timestamp'), producer=record.get('producer'),
+            action=record.get('action'),
+            priority=record.get('priority', PRIORITY_NORMAL))
+
+    def to_incoming(self, record):
+        """Returns an outgoing transaction as an incoming transaction.
+        """
+        record = {k: v for k, v in record.items() if k not in [
+            'using', 'is_consumed_middleman', 'is_consumed_server']}
+        record.update(
+            is_consumed=False,
+            consumed_datetime=None,
+            consumer=None)
+        return record
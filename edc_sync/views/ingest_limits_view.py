@@ -0,0 +1,24 @@
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..throttling import get_ingest_limits, get_apply_queue_depth, get_retry_after
+
+
+class IngestLimitsView(APIView):
+    """
+    A view that returns the ingest limits and the current apply
+    queue depth so producers can pace themselves.
+    """
+    renderer_classes = (JSONRenderer,)
+
+    def get(self, request):
+        limits = get_ingest_limits()
+        content = {
+            'rate': limits['RATE'],
+            'burst': limits['BURST'],
+            'concurrency': limits['CONCURRENCY'],
+            'apply_queue_depth': get_apply_queue_depth(),
+            'retry_after': get_retry_after()}
+        return Response(content, status=status.HTTP_200_OK)
@@ -0,0 +1,14 @@
+from django.http.response import HttpResponse
+from django.views.generic.base import View
+
+from ..metrics import site_metrics
+
+
+class MetricsView(View):
+    """
+    A view that returns sync metrics in the Prometheus text format.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            site_metrics.render(), content_type=site_metrics.content_type)
@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.generic.base import View
+
+from ..progress import get_progress, RUNNING
+
+
+@method_decorator(login_required, name='dispatch')
+class ProgressStreamView(View):
+
+    """Streams the progress of one or more jobs as server-sent
+    events over one connection.
+
+    GET ?job=<push|deserialize|apply.<worker>>&job=...
+
+    Each event is a JSON object of {job: progress} for the jobs whose
+    progress changed. The stream ends with an `idle` event as soon as
+    no job is running, or after `max_duration` seconds. Clients
+    should close the EventSource then and poll with ?format=json,
+    which returns {job: progress} once, until a job is running again.
+    """
+
+    poll_interval = 1.0
+    max_duration = 300
+    heartbeat_interval = 15
+
+    def get(self, request, *args, **kwargs):
+        jobs = request.GET.getlist('job')
+        if request.GET.get('format') == 'json':
+            return JsonResponse(self.get_progress(jobs))
+        response = StreamingHttpResponse(
+            self.events(jobs), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @staticmethod
+    def get_progress(jobs=None):
+        return {job: get_progress(job) for job in jobs or []}
+
+    def events(self, jobs=None):
+        deadline = time.monotonic() + self.max_duration
+        last_sent = {}
+        last_event = time.monotonic()
+        while time.monotonic() < deadline:
+            progress = self.get_progress(jobs)
+            changed = {job: data for job, data in progress.items()
+                       if data and data != last_sent.get(job)}
+            if changed:
+                last_sent.update(changed)
+                last_event = time.monotonic()
+                yield f'data: {json.dumps(changed)}\n\n'
+            elif time.monotonic() - last_event >= self.heartbeat_interval:
+                last_event = time.monotonic()
+                yield ': heartbeat\n\n'
+            if not any(data and data.get('status') == RUNNING
+                       for data in progress.values()):
+                yield 'event: idle\ndata: {}\n\n'
+                break
+            time.sleep(self.poll_interval)
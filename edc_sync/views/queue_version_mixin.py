@@ -0,0 +1,57 @@
+import hashlib
+import time
+
+from django.http import HttpResponseNotModified
+
+from ..queue_version import get_version
+
+
+class QueueVersionMixin:
+
+    """A mixin for API views whose response depends only on the
+    transaction queues in `queue_kinds`.
+
+    Sets an ETag from the queue versions and returns 304 if it matches
+    If-None-Match. With `?wait=<seconds>` (long-poll) a matching
+    request is held until the queue changes or `wait` expires.
+
+    Query param `producer` scopes the version to one producer.
+    """
+
+    queue_kinds = []
+    max_wait = 30
+    poll_interval = 0.5
+
+    def get_etag(self, request):
+        producer = request.query_params.get('producer')
+        versions = [str(get_version(kind, producer)) for kind in self.queue_kinds]
+        digest = hashlib.md5(
+            ':'.join(versions + [request.get_full_path()]).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def get_wait(self, request):
+        try:
+            wait = float(request.query_params.get('wait') or 0)
+        except ValueError:
+            wait = 0
+        return min(max(wait, 0), self.max_wait)
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        """Returns 304 if the client's ETag is current, after waiting
+        up to `wait` seconds for a change, else the handler's response
+        with a new ETag.
+        """
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        etag = self.get_etag(request)
+        if if_none_match == etag:
+            deadline = time.monotonic() + self.get_wait(request)
+            while etag == if_none_match and time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                etag = self.get_etag(request)
+            if etag == if_none_match:
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+        response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
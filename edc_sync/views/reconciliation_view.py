@@ -0,0 +1,30 @@
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..reconciliation import get_server_tree
+
+
+class ReconciliationView(APIView):
+    """
+    A view that returns the children of nodes of the hash tree of
+    a producer's incoming transactions.
+
+    GET ?producer=<producer>&prefix=<prefix>[&prefix=<prefix>...]
+    """
+
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (JSONRenderer,)
+
+    def get(self, request):
+        producer = request.query_params.get('producer')
+        prefixes = request.query_params.getlist('prefix') or ['']
+        tree = get_server_tree(producer=producer, prefixes=prefixes)
+        content = {
+            'producer': producer,
+            'nodes': {prefix: tree.children(prefix) for prefix in prefixes}}
+        return Response(content, status=status.HTTP_200_OK)
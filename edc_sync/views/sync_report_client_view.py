@@ -89,7 +89,14 @@ class Report:
             self.report_data.append(data)
 
     def synced_files(self, hostname):
+        """Returns the times of the files received from the host
+        today, last first.
+
+        Reads the file import history of the host, not the
+        transaction queue.
+        """
         producer = '{}-default'.format(hostname)
-        return [p for p in self.imported_history_model.objects.filter(
+        return list(self.imported_history_model.objects.filter(
             producer=producer,
-            created__date=datetime.today().date()).order_by('-created')]
+            created__date=datetime.today().date()).order_by(
+                '-created').values_list('created', flat=True))
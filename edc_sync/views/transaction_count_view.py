@@ -1,5 +1,6 @@
 import socket
 
+from django.db.models import Count
 from rest_framework import status
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
@@ -7,24 +8,48 @@ from rest_framework.views import APIView
 
 from ..models import (
     OutgoingTransaction, IncomingTransaction)
+from ..queue_version import INCOMING, OUTGOING
+from .queue_version_mixin import QueueVersionMixin
 
 
-class TransactionCountView(APIView):
+class TransactionCountView(QueueVersionMixin, APIView):
     """
     A view that returns the count  of transactions.
+
+    Supports If-None-Match and long-poll with ?wait=<seconds>, see
+    QueueVersionMixin. Filter by ?producer=<producer>.
+
+    Includes the pending count per priority lane.
     """
     renderer_classes = (JSONRenderer,)
+    queue_kinds = [OUTGOING, INCOMING]
 
     def get(self, request):
+        return self.conditional_response(request, self.get_counts)
+
+    def get_counts(self, request):
+        filters = {}
+        if request.query_params.get('producer'):
+            filters.update(producer=request.query_params.get('producer'))
         outgoingtransaction_count = OutgoingTransaction.objects.filter(
-            is_consumed_server=False).count()
+            is_consumed_server=False, **filters).count()
         outgoingtransaction_middleman_count = OutgoingTransaction.objects.filter(
             is_consumed_server=False,
-            is_consumed_middleman=False).count()
+            is_consumed_middleman=False, **filters).count()
         incomingtransaction_count = IncomingTransaction.objects.filter(
-            is_consumed=False, is_ignored=False).count()
+            is_consumed=False, is_ignored=False, **filters).count()
         content = {'outgoingtransaction_count': outgoingtransaction_count,
                    'outgoingtransaction_middleman_count': outgoingtransaction_middleman_count,
                    'incomingtransaction_count': incomingtransaction_count,
+                   'outgoingtransaction_lanes': self.get_lanes(OutgoingTransaction.objects.filter(
+                       is_consumed_server=False, **filters)),
+                   'incomingtransaction_lanes': self.get_lanes(IncomingTransaction.objects.filter(
+                       is_consumed=False, is_ignored=False, **filters)),
                    'hostname': socket.gethostname()}
         return Response(content, status=status.HTTP_200_OK)
+
+    def get_lanes(self, queryset=None):
+        """Returns a dictionary of {priority: pending count}.
+        """
+        return {row['priority']: row['count'] for row in queryset.order_by().values(
+            'priority').annotate(count=Count('id'))}
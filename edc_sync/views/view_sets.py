@@ -2,14 +2,20 @@ from rest_framework import viewsets
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import (
     api_view, authentication_classes, permission_classes)
+from rest_framework.exceptions import APIException
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 
+from ..metrics import api_batch_size
 from ..models import (
     OutgoingTransaction, IncomingTransaction)
+from ..outgoing_log import OutgoingLogError, outgoing_transactions_or_raise
+from ..queue_version import INCOMING, OUTGOING
 from ..serializers import (
     OutgoingTransactionSerializer, IncomingTransactionSerializer)
+from ..throttling import IngestLimitMixin
+from .queue_version_mixin import QueueVersionMixin
 
 
 @api_view(['GET'])
@@ -23,21 +29,72 @@ def api_root(request, format=None):
                                        request=request, format=format)})
 
 
-class OutgoingTransactionViewSet(viewsets.ModelViewSet):
+class OutgoingLogUnavailable(APIException):
+    status_code = 503
+    default_detail = 'Outgoing transactions are not saved on this host.'
+
+
+class BatchSizeViewSetMixin:
+
+    """Observes the number of transactions per request.
+    """
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            api_batch_size.observe(
+                len(page), resource=self.resource_name, method='GET')
+        return page
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        api_batch_size.observe(
+            1, resource=self.resource_name, method='POST')
+
+    @property
+    def resource_name(self):
+        return self.queryset.model._meta.model_name
+
+
+class QueueVersionViewSetMixin(QueueVersionMixin):
+
+    """Adds ETag and long-poll support to the list action.
+
+    With `?producer=<producer>` only the transactions of that producer
+    are listed, matching the producer scoped ETag.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def filter_producer(self, queryset):
+        producer = self.request.query_params.get('producer')
+        return queryset.filter(producer=producer) if producer else queryset
+
+
+class OutgoingTransactionViewSet(BatchSizeViewSetMixin, QueueVersionViewSetMixin,
+                                 viewsets.ModelViewSet):
 
     queryset = OutgoingTransaction.objects.all()
     serializer_class = OutgoingTransactionSerializer
+    queue_kinds = [OUTGOING]
 
     def filter_queryset(self, queryset):
-        return self.queryset.filter(
-            is_consumed_server=False).order_by('timestamp')
+        try:
+            outgoing_transactions_or_raise()
+        except OutgoingLogError as e:
+            raise OutgoingLogUnavailable(str(e)) from e
+        return self.filter_producer(self.queryset.filter(
+            is_consumed_server=False)).order_by('-priority', 'timestamp')
 
 
-class IncomingTransactionViewSet(viewsets.ModelViewSet):
+class IncomingTransactionViewSet(IngestLimitMixin, BatchSizeViewSetMixin,
+                                 QueueVersionViewSetMixin, viewsets.ModelViewSet):
 
     queryset = IncomingTransaction.objects.all()
     serializer_class = IncomingTransactionSerializer
+    queue_kinds = [INCOMING]
 
     def filter_queryset(self, queryset):
-        return self.queryset.filter(
-            is_consumed=False, is_ignored=False).order_by('timestamp')
+        return self.filter_producer(self.queryset.filter(
+            is_consumed=False, is_ignored=False)).order_by('-priority', 'timestamp')